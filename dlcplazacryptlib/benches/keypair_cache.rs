@@ -0,0 +1,33 @@
+// Copyright (c) 2025-present Cadena Bitcoin
+// Distributed under the MIT software license, see the accompanying
+// file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+// Benchmark: per-signature cost of Schnorr signing with nonce,
+// deriving the child key every time (before) vs. using the cached child keypair (after).
+// Usage: cargo bench
+
+use criterion::{black_box, criterion_group, criterion_main, Criterion};
+use dlcplazacryptlib::bench_api;
+
+const DUMMY_ENTROPY_STR: &str = "0000000000000000000000000000000000000000000000000000000000000000";
+const NETWORK_SIGNET: &str = "signet";
+const MSG: &str = "Outcome:btcusd1741474920:3:7";
+const NONCE_SEC_HEX: &str = "0123450000000000006897528962743076432965432697856340567500000100";
+
+fn bench_sign_schnorr_with_nonce(c: &mut Criterion) {
+    let _xpub = bench_api::init_with_entropy(DUMMY_ENTROPY_STR, NETWORK_SIGNET).unwrap();
+
+    let mut group = c.benchmark_group("sign_schnorr_with_nonce");
+    group.bench_function("derive_each_time", |b| {
+        b.iter(|| {
+            bench_api::sign_schnorr_with_nonce_uncached(black_box(MSG), NONCE_SEC_HEX, 0).unwrap()
+        })
+    });
+    group.bench_function("cached_keypair", |b| {
+        b.iter(|| bench_api::sign_schnorr_with_nonce(black_box(MSG), NONCE_SEC_HEX, 0).unwrap())
+    });
+    group.finish();
+}
+
+criterion_group!(benches, bench_sign_schnorr_with_nonce);
+criterion_main!(benches);
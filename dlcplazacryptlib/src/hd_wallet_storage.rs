@@ -132,24 +132,4 @@ impl HDWalletStorage {
         let address = Address::p2wpkh(&ck, self.network());
         Ok(address)
     }
-
-    pub(crate) fn verify_child_public_key_intern(
-        &self,
-        index: u32,
-        pubkey: &PublicKey,
-        print_entity: &str,
-    ) -> Result<bool, String> {
-        let keypair = self.get_child_keypair(index)?;
-        // verify pubkey
-        if &keypair.public_key() != pubkey {
-            return Err(format!(
-                "{} mismatch, index {}, {} vs. {}",
-                print_entity,
-                index,
-                pubkey,
-                keypair.public_key()
-            ));
-        }
-        Ok(true)
-    }
 }
@@ -114,6 +114,24 @@ fn create_deterministic_nonce_intern(
     Ok((sk, pk.to_string()))
 }
 
+fn create_deterministic_nonces_intern(
+    requests: &[(String, u32)],
+) -> Result<Vec<Vec<(String, String)>>, String> {
+    let nonces = global_lib()
+        .read()
+        .unwrap()
+        .create_deterministic_nonces(requests)?;
+    Ok(nonces
+        .into_iter()
+        .map(|event_nonces| {
+            event_nonces
+                .into_iter()
+                .map(|(sk, pk)| (sk, pk.to_string()))
+                .collect()
+        })
+        .collect())
+}
+
 // Schnorr signing with nonce
 fn sign_schnorr_with_nonce_intern(
     msg: &str,
@@ -129,6 +147,65 @@ fn sign_schnorr_with_nonce_intern(
     Ok(sig.to_string())
 }
 
+// Schnorr signing with nonce, deriving the child key for each signature (no keypair cache)
+fn sign_schnorr_with_nonce_uncached_intern(
+    msg: &str,
+    nonce_sec_hex: &str,
+    index: u32,
+) -> Result<String, String> {
+    let nonce_sec_bin = <[u8; 32]>::from_hex(&nonce_sec_hex)
+        .map_err(|e| format!("Error in nonce hex string {}", e))?;
+    let sig = global_lib()
+        .read()
+        .unwrap()
+        .sign_schnorr_with_nonce_uncached(msg, &nonce_sec_bin, index)?;
+    Ok(sig.to_string())
+}
+
+fn parse_nonce_secs_hex(nonce_secs_hex: &[String]) -> Result<Vec<[u8; 32]>, String> {
+    let mut nonce_secs = Vec::with_capacity(nonce_secs_hex.len());
+    for i in 0..nonce_secs_hex.len() {
+        let nonce_sec = <[u8; 32]>::from_hex(&nonce_secs_hex[i])
+            .map_err(|e| format!("Error in nonce hex string, element {} {}", i, e))?;
+        nonce_secs.push(nonce_sec);
+    }
+    Ok(nonce_secs)
+}
+
+// Schnorr signing of all the digit messages of an outcome, each with its nonce
+fn sign_outcome_digits_intern(
+    msgs: &[String],
+    nonce_secs_hex: &[String],
+    index: u32,
+) -> Result<Vec<String>, String> {
+    let nonce_secs = parse_nonce_secs_hex(nonce_secs_hex)?;
+    let sigs = global_lib()
+        .read()
+        .unwrap()
+        .sign_schnorr_multi_with_nonce(msgs, &nonce_secs, index)?;
+    Ok(sigs.iter().map(|s| s.to_string()).collect())
+}
+
+// Schnorr signing of the digit messages of several outcomes.
+// Each element is a pair of the digit messages and the nonces of an outcome.
+fn sign_outcome_digits_multi_intern(
+    outcomes: &[(Vec<String>, Vec<String>)],
+    index: u32,
+) -> Result<Vec<Vec<String>>, String> {
+    let mut events = Vec::with_capacity(outcomes.len());
+    for (msgs, nonce_secs_hex) in outcomes.iter() {
+        events.push((msgs.clone(), parse_nonce_secs_hex(nonce_secs_hex)?));
+    }
+    let sigss = global_lib()
+        .read()
+        .unwrap()
+        .sign_schnorr_multi_events_with_nonce(&events, index)?;
+    Ok(sigss
+        .iter()
+        .map(|sigs| sigs.iter().map(|s| s.to_string()).collect())
+        .collect())
+}
+
 pub fn combine_pubkeys_intern(keys_hex: &str) -> Result<String, String> {
     let keys_split: Vec<_> = keys_hex.split(" ").collect();
     let mut keys = Vec::<PublicKey>::with_capacity(keys_split.len());
@@ -594,6 +671,19 @@ pub fn create_deterministic_nonce(
         .map_err(|e| PyErr::new::<PyException, _>(e))
 }
 
+/// Create nonce values deterministically, for several events at once.
+/// Input: list of (event_id, digit count) pairs. Returns, for each event, the list of (secret, public) nonces.
+/// Computed in parallel, with the GIL released.
+#[cfg(feature = "with-pyo3")]
+#[pyfunction]
+pub fn create_deterministic_nonces(
+    py: Python<'_>,
+    requests: Vec<(String, u32)>,
+) -> PyResult<Vec<Vec<(String, String)>>> {
+    py.allow_threads(|| create_deterministic_nonces_intern(&requests))
+        .map_err(|e| PyErr::new::<PyException, _>(e))
+}
+
 /// Sign a message using Schnorr, with a nonce, using a child key
 #[cfg(feature = "with-pyo3")]
 #[pyfunction]
@@ -602,6 +692,33 @@ pub fn sign_schnorr_with_nonce(msg: String, nonce_sec_hex: String, index: u32) -
         .map_err(|e| PyErr::new::<PyException, _>(e))
 }
 
+/// Sign all the digit messages of an outcome using Schnorr, each with its nonce, using a child key.
+/// Returns the signatures, in the same order.
+#[cfg(feature = "with-pyo3")]
+#[pyfunction]
+pub fn sign_outcome_digits(
+    py: Python<'_>,
+    msgs: Vec<String>,
+    nonce_secs_hex: Vec<String>,
+    index: u32,
+) -> PyResult<Vec<String>> {
+    py.allow_threads(|| sign_outcome_digits_intern(&msgs, &nonce_secs_hex, index))
+        .map_err(|e| PyErr::new::<PyException, _>(e))
+}
+
+/// Sign the digit messages of several outcomes, as sign_outcome_digits().
+/// Input: list of (digit messages, nonces) pairs. Returns the signatures for each outcome.
+#[cfg(feature = "with-pyo3")]
+#[pyfunction]
+pub fn sign_outcome_digits_multi(
+    py: Python<'_>,
+    outcomes: Vec<(Vec<String>, Vec<String>)>,
+    index: u32,
+) -> PyResult<Vec<Vec<String>>> {
+    py.allow_threads(|| sign_outcome_digits_multi_intern(&outcomes, index))
+        .map_err(|e| PyErr::new::<PyException, _>(e))
+}
+
 /// Combine a number of public keys into one
 #[cfg(feature = "with-pyo3")]
 #[pyfunction]
@@ -699,6 +816,27 @@ pub fn create_final_cet_sigs(
     .map_err(|e| PyErr::new::<PyException, _>(e))
 }
 
+// ##### Entry points for the benchmarks (benches/), not part of the API
+
+#[doc(hidden)]
+pub mod bench_api {
+    pub fn init_with_entropy(entropy: &str, network: &str) -> Result<String, String> {
+        super::init_with_entropy_intern(entropy, network)
+    }
+
+    pub fn sign_schnorr_with_nonce(msg: &str, nonce_sec_hex: &str, index: u32) -> Result<String, String> {
+        super::sign_schnorr_with_nonce_intern(msg, nonce_sec_hex, index)
+    }
+
+    pub fn sign_schnorr_with_nonce_uncached(
+        msg: &str,
+        nonce_sec_hex: &str,
+        index: u32,
+    ) -> Result<String, String> {
+        super::sign_schnorr_with_nonce_uncached_intern(msg, nonce_sec_hex, index)
+    }
+}
+
 #[cfg(feature = "with-pyo3")]
 #[pymodule]
 fn dlcplazacryptlib(_py: Python, m: &Bound<'_, PyModule>) -> PyResult<()> {
@@ -711,7 +849,10 @@ fn dlcplazacryptlib(_py: Python, m: &Bound<'_, PyModule>) -> PyResult<()> {
     m.add_function(wrap_pyfunction!(verify_public_key, m)?)?;
     m.add_function(wrap_pyfunction!(sign_hash_ecdsa, m)?)?;
     m.add_function(wrap_pyfunction!(create_deterministic_nonce, m)?)?;
+    m.add_function(wrap_pyfunction!(create_deterministic_nonces, m)?)?;
     m.add_function(wrap_pyfunction!(sign_schnorr_with_nonce, m)?)?;
+    m.add_function(wrap_pyfunction!(sign_outcome_digits, m)?)?;
+    m.add_function(wrap_pyfunction!(sign_outcome_digits_multi, m)?)?;
     m.add_function(wrap_pyfunction!(combine_pubkeys, m)?)?;
     m.add_function(wrap_pyfunction!(combine_seckeys, m)?)?;
     m.add_function(wrap_pyfunction!(create_cet_adaptor_sigs, m)?)?;
@@ -16,11 +16,21 @@ use bitcoin::secp256k1::{All, PublicKey, SecretKey};
 use bitcoin::Address;
 use secp256k1_zkp::schnorr::Signature as SchnorrSignature;
 use secp256k1_zkp::{EcdsaAdaptorSignature, Scalar};
-use std::sync::{OnceLock, RwLock};
+use std::collections::HashMap;
+use std::sync::{Mutex, OnceLock, RwLock};
+use std::thread;
+
+/// Max number of derived child keypairs kept in the cache
+const KEYPAIR_CACHE_MAX_ENTRIES: usize = 64;
+
+/// Below this many events, batch nonce creation is done on the calling thread
+const NONCE_BATCH_PARALLEL_MIN_EVENTS: usize = 64;
 
 pub(crate) struct Lib {
     hd_wallet_storage: Option<HDWalletStorage>,
     secp: Secp256k1<All>,
+    // Derived child keypairs, by index. Erased on (re)init.
+    keypair_cache: Mutex<HashMap<u32, Keypair>>,
 }
 
 impl Lib {
@@ -28,6 +38,7 @@ impl Lib {
         Self {
             hd_wallet_storage: None,
             secp: Secp256k1::new(),
+            keypair_cache: Mutex::new(HashMap::new()),
         }
     }
 
@@ -42,6 +53,7 @@ impl Lib {
         }
         let hd_wallet_storage =
             HDWalletStorage::new_from_secret_file(path_for_secret_file, encryption_password)?;
+        self.clear_keypair_cache();
         self.hd_wallet_storage = Some(hd_wallet_storage);
         Ok(())
     }
@@ -53,6 +65,7 @@ impl Lib {
         network: &str,
     ) -> Result<(), String> {
         let hd_wallet = HDWalletStorage::new_with_entropy(entropy, network)?;
+        self.clear_keypair_cache();
         self.hd_wallet_storage = Some(hd_wallet);
         Ok(())
     }
@@ -66,7 +79,21 @@ impl Lib {
         }
     }
 
+    /// Return a child keypair, derived on first use, later taken from the cache
     fn get_child_keypair(&self, index: u32) -> Result<Keypair, String> {
+        if let Some(kp) = self.keypair_cache.lock().unwrap().get(&index) {
+            return Ok(*kp);
+        }
+        let kp = self.derive_child_keypair(index)?;
+        let mut cache = self.keypair_cache.lock().unwrap();
+        if cache.len() < KEYPAIR_CACHE_MAX_ENTRIES {
+            cache.insert(index, kp);
+        }
+        Ok(kp)
+    }
+
+    /// Derive a child keypair (no caching)
+    fn derive_child_keypair(&self, index: u32) -> Result<Keypair, String> {
         if let Some(hd_wallet) = &self.hd_wallet_storage {
             hd_wallet.get_child_keypair(index)
         } else {
@@ -74,13 +101,19 @@ impl Lib {
         }
     }
 
+    /// Erase and drop all cached child keypairs
+    fn clear_keypair_cache(&self) {
+        let mut cache = self.keypair_cache.lock().unwrap();
+        for (_index, kp) in cache.iter_mut() {
+            kp.non_secure_erase();
+        }
+        cache.clear();
+    }
+
     /// Return a child public key
     pub(crate) fn get_child_public_key(&self, index: u32) -> Result<PublicKey, String> {
-        if let Some(hd_wallet) = &self.hd_wallet_storage {
-            hd_wallet.get_child_public_key(index)
-        } else {
-            Err("Library not initialized!".to_string())
-        }
+        let keypair = self.get_child_keypair(index)?;
+        Ok(keypair.public_key())
     }
 
     /// Return a child address
@@ -98,11 +131,18 @@ impl Lib {
         pubkey: &PublicKey,
         print_entity: &str,
     ) -> Result<bool, String> {
-        if let Some(hd_wallet) = &self.hd_wallet_storage {
-            hd_wallet.verify_child_public_key_intern(index, pubkey, print_entity)
-        } else {
-            Err("Library not initialized!".to_string())
+        let keypair = self.get_child_keypair(index)?;
+        // verify pubkey
+        if &keypair.public_key() != pubkey {
+            return Err(format!(
+                "{} mismatch, index {}, {} vs. {}",
+                print_entity,
+                index,
+                pubkey,
+                keypair.public_key()
+            ));
         }
+        Ok(true)
     }
 
     /// Verify a child public key
@@ -140,6 +180,57 @@ impl Lib {
         Ok((hash.to_lower_hex_string(), publickey))
     }
 
+    /// Create nonce values deterministically, for several events at once.
+    /// Input is a list of (event ID, digit count) pairs, output contains the nonces for each event,
+    /// for digit indices 0..count, same as create_deterministic_nonce().
+    /// Larger batches are computed in parallel, split across the available cores.
+    pub(crate) fn create_deterministic_nonces(
+        &self,
+        requests: &[(String, u32)],
+    ) -> Result<Vec<Vec<(String, PublicKey)>>, String> {
+        let threads = thread::available_parallelism()
+            .map(|n| n.get())
+            .unwrap_or(1);
+        if threads <= 1 || requests.len() < NONCE_BATCH_PARALLEL_MIN_EVENTS {
+            return self.create_deterministic_nonces_seq(requests);
+        }
+        let chunk_size = (requests.len() + threads - 1) / threads;
+        let chunk_results: Vec<Result<Vec<Vec<(String, PublicKey)>>, String>> =
+            thread::scope(|s| {
+                let handles: Vec<_> = requests
+                    .chunks(chunk_size)
+                    .map(|chunk| s.spawn(move || self.create_deterministic_nonces_seq(chunk)))
+                    .collect();
+                handles
+                    .into_iter()
+                    .map(|h| {
+                        h.join()
+                            .map_err(|_| "Nonce creation thread panicked".to_string())
+                            .and_then(|r| r)
+                    })
+                    .collect()
+            });
+        let mut nonces = Vec::with_capacity(requests.len());
+        for r in chunk_results {
+            nonces.extend(r?);
+        }
+        Ok(nonces)
+    }
+
+    fn create_deterministic_nonces_seq(
+        &self,
+        requests: &[(String, u32)],
+    ) -> Result<Vec<Vec<(String, PublicKey)>>, String> {
+        requests
+            .iter()
+            .map(|(event_id, count)| {
+                (0..*count)
+                    .map(|i| self.create_deterministic_nonce(event_id, i))
+                    .collect()
+            })
+            .collect()
+    }
+
     /// Sign a message using Schnorr, using a child key
     pub(crate) fn sign_schnorr_with_nonce(
         &self,
@@ -151,6 +242,64 @@ impl Lib {
         sign_schnorr_with_nonce_sec(&self.secp, &kp, msg, nonce_sec)
     }
 
+    /// Same as sign_schnorr_with_nonce(), but derives the child key every time (for comparison)
+    pub(crate) fn sign_schnorr_with_nonce_uncached(
+        &self,
+        msg: &str,
+        nonce_sec: &[u8; 32],
+        index: u32,
+    ) -> Result<SchnorrSignature, String> {
+        let kp = self.derive_child_keypair(index)?;
+        sign_schnorr_with_nonce_sec(&self.secp, &kp, msg, nonce_sec)
+    }
+
+    /// Sign several messages using Schnorr, each with its own nonce, using a child key.
+    /// The child key is derived only once.
+    pub(crate) fn sign_schnorr_multi_with_nonce(
+        &self,
+        msgs: &[String],
+        nonce_secs: &[[u8; 32]],
+        index: u32,
+    ) -> Result<Vec<SchnorrSignature>, String> {
+        let kp = self.get_child_keypair(index)?;
+        Self::sign_schnorr_multi_with_keypair(&self.secp, &kp, msgs, nonce_secs)
+    }
+
+    /// Sign the messages of several events (each a list of messages with their nonces),
+    /// using a child key, derived only once.
+    pub(crate) fn sign_schnorr_multi_events_with_nonce(
+        &self,
+        events: &[(Vec<String>, Vec<[u8; 32]>)],
+        index: u32,
+    ) -> Result<Vec<Vec<SchnorrSignature>>, String> {
+        let kp = self.get_child_keypair(index)?;
+        events
+            .iter()
+            .map(|(msgs, nonce_secs)| {
+                Self::sign_schnorr_multi_with_keypair(&self.secp, &kp, msgs, nonce_secs)
+            })
+            .collect()
+    }
+
+    fn sign_schnorr_multi_with_keypair(
+        secp: &Secp256k1<All>,
+        kp: &Keypair,
+        msgs: &[String],
+        nonce_secs: &[[u8; 32]],
+    ) -> Result<Vec<SchnorrSignature>, String> {
+        if msgs.len() != nonce_secs.len() {
+            return Err(format!(
+                "Number of messages and nonces differ, {} vs. {}",
+                msgs.len(),
+                nonce_secs.len()
+            ));
+        }
+        msgs.iter()
+            .zip(nonce_secs.iter())
+            .map(|(msg, nonce_sec)| sign_schnorr_with_nonce_sec(secp, kp, msg, nonce_sec))
+            .collect()
+    }
+
     pub(crate) fn combine_seckeys(secrets: &Vec<SecretKey>) -> Result<SecretKey, String> {
         if secrets.len() == 0 {
             return Err("At least one key is required".to_string());
@@ -256,6 +405,12 @@ impl Lib {
     }
 }
 
+impl Drop for Lib {
+    fn drop(&mut self) {
+        self.clear_keypair_cache();
+    }
+}
+
 pub(crate) fn global_lib() -> &'static RwLock<Lib> {
     static GLOBAL_LIB: OnceLock<RwLock<Lib>> = OnceLock::new();
     GLOBAL_LIB.get_or_init(|| RwLock::new(Lib::new_empty()))
@@ -5,8 +5,10 @@
 use crate::adaptor_signature::verify_ecdsa_signature;
 use crate::{
     combine_pubkeys_intern, combine_seckeys_intern, create_deterministic_nonce_intern,
+    create_deterministic_nonces_intern,
     get_public_key_intern, init_with_entropy, init_with_entropy_intern, keypair_from_sec_key_hex,
-    sign_schnorr_with_nonce_intern, verify_public_key_intern, Lib,
+    sign_outcome_digits_intern, sign_outcome_digits_multi_intern, sign_schnorr_with_nonce_intern,
+    verify_public_key_intern, Lib,
 };
 use bitcoin::hex::FromHex;
 use bitcoin::secp256k1::PublicKey;
@@ -143,6 +145,30 @@ fn test_create_deterministic_nonce() {
     assert_ne!(pk1, pk2);
 }
 
+#[test]
+fn test_create_deterministic_nonces() {
+    // enough events to be computed in parallel
+    let mut requests = Vec::new();
+    for i in 0..100 {
+        requests.push((format!("event{:03}", i), (i % 8) as u32));
+    }
+    let nonces = create_deterministic_nonces_intern(&requests).unwrap();
+    assert_eq!(nonces.len(), requests.len());
+    for (i, (event_id, count)) in requests.iter().enumerate() {
+        assert_eq!(nonces[i].len(), *count as usize);
+        for j in 0..*count {
+            let expected = create_deterministic_nonce_intern(event_id, j).unwrap();
+            assert_eq!(nonces[i][j as usize], expected);
+        }
+    }
+
+    // small batch, sequential
+    let nonces2 = create_deterministic_nonces_intern(&requests[0..3]).unwrap();
+    assert_eq!(nonces2, nonces[0..3].to_vec());
+
+    assert_eq!(create_deterministic_nonces_intern(&[]).unwrap().len(), 0);
+}
+
 #[test]
 fn test_sign_schnorr_with_nonce() {
     let _xpub = init_with_entropy_intern(DUMMY_ENTROPY_STR, DEFAULT_NETWORK).unwrap();
@@ -164,6 +190,77 @@ fn test_sign_schnorr_with_nonce() {
     assert_eq!(sig3.to_string(), "4578740620e7a2c56eabea07c835dba35e832115930d023d0a7778652fbbf7d97a9f4a207dcb1456f1b0f57c4856085c32c79f4efce81cd276c272190aab5e3c");
 }
 
+#[test]
+fn test_sign_schnorr_keypair_cache() {
+    let mut lib = Lib::new_empty();
+    let _ = lib
+        .init_with_entropy(&dummy_entropy(), DEFAULT_NETWORK)
+        .unwrap();
+    let msg = "This is a message";
+    let nonce = <[u8; 32]>::from_hex("0123450000000000006897528962743076432965432697856340567500000100").unwrap();
+    let expected_sig = "ff4cb99e0a9be8ec7dea1e51904cf22f71717c19fc3e7dcbc8346eb28bebffbb892c4c41e05c2383efda00f5acc9c7f3622d88a90630cd62d49db598c8ce10b9";
+
+    // first use derives, second is served from the cache, both same as uncached
+    let sig1 = lib.sign_schnorr_with_nonce(msg, &nonce, 0).unwrap();
+    let sig2 = lib.sign_schnorr_with_nonce(msg, &nonce, 0).unwrap();
+    let sig3 = lib.sign_schnorr_with_nonce_uncached(msg, &nonce, 0).unwrap();
+    assert_eq!(sig1.to_string(), expected_sig);
+    assert_eq!(sig2.to_string(), expected_sig);
+    assert_eq!(sig3.to_string(), expected_sig);
+    let pubkey = lib.get_child_public_key(0).unwrap();
+
+    // reinit with different entropy, cached key must not be used any more
+    let _ = lib
+        .init_with_entropy(&dummy_bytes32(1).to_vec(), DEFAULT_NETWORK)
+        .unwrap();
+    let sig4 = lib.sign_schnorr_with_nonce(msg, &nonce, 0).unwrap();
+    assert_ne!(sig4.to_string(), expected_sig);
+    assert_eq!(
+        sig4.to_string(),
+        lib.sign_schnorr_with_nonce_uncached(msg, &nonce, 0).unwrap().to_string()
+    );
+    assert_ne!(lib.get_child_public_key(0).unwrap(), pubkey);
+}
+
+#[test]
+fn test_sign_outcome_digits() {
+    let _xpub = init_with_entropy_intern(DUMMY_ENTROPY_STR, DEFAULT_NETWORK).unwrap();
+
+    let msgs: Vec<String> = (0..7)
+        .map(|i| format!("Outcome:btcusd1741474920:{}:{}", i, i + 1))
+        .collect();
+    let nonce_secs: Vec<String> = (0..7)
+        .map(|i| create_deterministic_nonce_intern("btcusd1741474920", i).unwrap().0)
+        .collect();
+    let sigs = sign_outcome_digits_intern(&msgs, &nonce_secs, 0).unwrap();
+    assert_eq!(sigs.len(), 7);
+    // Same as signing one-by-one
+    for i in 0..7 {
+        assert_eq!(
+            sigs[i],
+            sign_schnorr_with_nonce_intern(&msgs[i], &nonce_secs[i], 0).unwrap()
+        );
+    }
+
+    // Multiple outcomes
+    let sigss = sign_outcome_digits_multi_intern(
+        &vec![
+            (msgs.clone(), nonce_secs.clone()),
+            (msgs[0..3].to_vec(), nonce_secs[0..3].to_vec()),
+        ],
+        0,
+    )
+    .unwrap();
+    assert_eq!(sigss.len(), 2);
+    assert_eq!(sigss[0], sigs);
+    assert_eq!(sigss[1], sigs[0..3].to_vec());
+
+    // negative test, count mismatch
+    assert!(sign_outcome_digits_intern(&msgs, &nonce_secs[0..6].to_vec(), 0).is_err());
+    // negative test, invalid nonce
+    assert!(sign_outcome_digits_intern(&msgs[0..1].to_vec(), &vec!["nothex".to_string()], 0).is_err());
+}
+
 fn create_dummy_pubkey(index: u8) -> PublicKey {
     let sechex = format!(
         "012345000000000000689752896274307643296543269785634056750000000{}",
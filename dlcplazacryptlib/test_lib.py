@@ -24,6 +24,11 @@ nonce1_pub = nonce1_arr[1]
 print('Nonce 1 (pub, sec)', nonce1_pub, nonce1_sec)
 nonce2_arr = dlcplazacryptlib.create_deterministic_nonce(event_id, 2)
 
+# Batch: all 3 nonces of the event, and 2 of another, in one call
+nonces_batch = dlcplazacryptlib.create_deterministic_nonces([(event_id, 3), ("event002", 2)])
+assert(list(nonces_batch[0][2]) == list(nonce2_arr))
+print('Nonces (batch)', len(nonces_batch), len(nonces_batch[0]), len(nonces_batch[1]))
+
 # Sign the event id with nonce1
 sig = dlcplazacryptlib.sign_schnorr_with_nonce(event_id, nonce1_sec, 0)
 print('Signature:  ', sig)
@@ -34,6 +39,11 @@ print('Sign again: ', dlcplazacryptlib.sign_schnorr_with_nonce(event_id, nonce1_
 # Sign with different nonce
 print('Sign with other nonce: ', dlcplazacryptlib.sign_schnorr_with_nonce(event_id, nonce2_arr[0], 0))
 
+# Sign several messages at once
+sigs = dlcplazacryptlib.sign_outcome_digits([event_id, event_id], [nonce1_sec, nonce2_arr[0]], 0)
+assert(sigs[0] == sig)
+print('Signatures (batch): ', sigs)
+
 nonces_pub = nonce0_pub + " " + nonce1_pub + " " + nonce2_arr[1]
 print("Combining pub nonces:", nonces_pub)
 combined_nonce_pub = dlcplazacryptlib.combine_pubkeys(nonces_pub)
@@ -0,0 +1,42 @@
+from db import DB_KEY_FORMAT_BLOB, DB_KEY_FORMAT_HEX, LATEST_DB_VERSION, db_convert_key_format, db_get_key_format, db_get_version
+from db_infra import get_db_file, print_current_db_version
+
+import os
+import sqlite3
+import sys
+import time
+
+
+# Convert the nonces, signatures and public keys in the DB to hex strings or to raw bytes (BLOBs), then VACUUM.
+# Usage: python __convert_db_keys.py blob|hex
+key_format = DB_KEY_FORMAT_BLOB
+if len(sys.argv) >= 2:
+    key_format = sys.argv[1].lower()
+if key_format not in [DB_KEY_FORMAT_BLOB, DB_KEY_FORMAT_HEX]:
+    print(f"Invalid key format '{key_format}', use {DB_KEY_FORMAT_BLOB} or {DB_KEY_FORMAT_HEX}")
+    sys.exit(1)
+
+dbfile = get_db_file(db_file_name="ora.db", data_dir=".", create_mode=False)
+print_current_db_version(dbfile)
+
+conn = sqlite3.connect(dbfile)
+if db_get_version(conn) < LATEST_DB_VERSION:
+    print(f"DB version is older than v{LATEST_DB_VERSION}, update it first with __setup_db.py")
+    sys.exit(1)
+cursor = conn.cursor()
+print(f"Current key format: {db_get_key_format(cursor)}, size {os.path.getsize(dbfile)} bytes")
+cursor.close()
+
+print(f"Convert keys to {key_format} '{dbfile}'. Stop the server first! Press Y to continue")
+input = input()
+if input.upper() != "Y":
+    print(f"Aborting")
+    sys.exit(1)
+
+t0 = time.perf_counter()
+cnt = db_convert_key_format(conn, key_format)
+print(f"Converted {cnt} rows in {round(time.perf_counter() - t0, 1)} s, vacuuming ...")
+conn.execute("VACUUM")
+conn.close()
+
+print(f"DB keys converted to {key_format}, size {os.path.getsize(dbfile)} bytes  {dbfile}")
@@ -1,11 +1,17 @@
-from db import db_setup
-from db_infra import get_db_file, get_db_update_versions_from_args, print_current_db_version
+from db import LATEST_DB_VERSION, db_setup_from_to
+from db_infra import get_current_db_version, get_db_file, get_db_update_versions_from_args, print_current_db_version
 
+import os
 import sqlite3
 import sys
 
 
-[vto, vfrom] = get_db_update_versions_from_args(1)
+# An existing DB is updated from its current version to the latest; if there is none, a new one is created.
+# Usage: python __setup_db.py [from_version to_version]  (from_version 0: create a new DB)
+current_version = 0
+if os.path.exists("./ora.db"):
+    current_version = get_current_db_version("./ora.db") or 0
+[vto, vfrom] = get_db_update_versions_from_args(LATEST_DB_VERSION, current_version)
 dbfile = get_db_file(db_file_name="ora.db", data_dir=".", create_mode=(vfrom==0))
 
 print_current_db_version(dbfile)
@@ -22,7 +28,7 @@ conn = sqlite3.connect(dbfile)
 cursor = conn.cursor()
 cursor.execute("PRAGMA foreign_keys = TRUE")
 cursor.close()
-db_setup(conn)
+db_setup_from_to(conn, vfrom, vto)
 conn.close()
 
 print_current_db_version(dbfile)
@@ -0,0 +1,220 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+# Benchmark: the API under load, sync handlers (on Starlette's thread pool, as before) vs. async handlers
+# over the async facade (DB reads on a fixed reader pool, prices from the async fetcher).
+# The server (uvicorn) runs in a separate process, with the price sources on local stub servers.
+# A local load generator keeps many concurrent keep-alive connections busy, with a mix of
+# settled events, event lists, status and prices.
+# Usage: python bench_api_load.py [connections] [requests_per_connection]
+
+from oracle import Oracle
+from oracle_async import AsyncOracle, API_PRICE_PREF_MAX_AGE_SECS
+from price import PriceSource
+from price_binance import BinancePriceSource
+from price_bitstamp import BitstampPriceSource
+from price_fetcher import AsyncPriceFetcher
+from price_kraken import KrakenPriceSource
+from response_cache import etag_matches
+from test_common import PriceStubServer, PriceSourceMockConstant, initialize_cryptlib_direct, recreate_empty_db_file
+
+from fastapi import FastAPI, Header, Response
+import asyncio
+import multiprocessing
+import resource
+import socket
+import sys
+import time
+import uvicorn
+
+
+DATA_DIR = "/tmp"
+NOW = 1762988400
+HOT_EVENTS = 100
+
+
+def prepare(public_key: str) -> list[str]:
+    recreate_empty_db_file(DATA_DIR + "/ora.db")
+    o = Oracle(public_key, data_dir_override=DATA_DIR, price_source_override=PriceSourceMockConstant(98765))
+    o.horizon_days = 1
+    ec = o.create_event_class("btcusd", "BTCUSD", 7, 0, 600, 0, public_key, NOW - 2 * 86400)
+    o.load_event_classes([ec])
+    o._create_past_outcomes_time(NOW, event_too_old_threshold=100_000_000)
+    event_ids = o.get_event_ids_filter(NOW - 2 * 86400, NOW, "BTCUSD")[:HOT_EVENTS]
+    o.close()
+    return event_ids
+
+
+# The parts of the app used by the handlers
+class BenchApp:
+    def __init__(self, oracle: Oracle):
+        self.oracle = oracle
+
+    def get_price_stats(self):
+        return self.oracle.price_source.get_stats()
+
+
+def create_app(mode: str, o: Oracle) -> FastAPI:
+    app = FastAPI()
+    if mode == "sync":
+        # As before: sync handlers, run on the thread pool
+        @app.get("/api/v0/oracle/oracle_status")
+        def api_oracle_status():
+            return o.get_oracle_status()
+
+        @app.get("/api/v0/event/event/{event_id}")
+        def api_event(event_id: str, if_none_match: str | None = Header(default=None)):
+            resp = o.get_event_response_by_id(event_id)
+            headers = {"ETag": resp.etag, "Cache-Control": resp.cache_control}
+            if etag_matches(if_none_match, resp.etag):
+                return Response(status_code=304, headers=headers)
+            return Response(content=resp.body, media_type="application/json", headers=headers)
+
+        @app.get("/api/v0/event/events")
+        def api_events(start_time: int = 0, end_time: int = 0, definition: str = None):
+            return o.get_events_filter(start_time, end_time, definition)
+
+        @app.get("/api/v0/price_info/current/{symbol}")
+        def api_price_current(symbol: str):
+            return o.price_source.get_price_info(symbol, pref_max_age=API_PRICE_PREF_MAX_AGE_SECS)
+    else:
+        ao = AsyncOracle(BenchApp(o))
+
+        @app.get("/api/v0/oracle/oracle_status")
+        async def api_oracle_status():
+            return await ao.get_oracle_status()
+
+        @app.get("/api/v0/event/event/{event_id}")
+        async def api_event(event_id: str, if_none_match: str | None = Header(default=None)):
+            resp = await ao.get_event_response_by_id(event_id)
+            headers = {"ETag": resp.etag, "Cache-Control": resp.cache_control}
+            if etag_matches(if_none_match, resp.etag):
+                return Response(status_code=304, headers=headers)
+            return Response(content=resp.body, media_type="application/json", headers=headers)
+
+        @app.get("/api/v0/event/events")
+        async def api_events(start_time: int = 0, end_time: int = 0, definition: str = None):
+            return await ao.get_events_filter(start_time, end_time, definition)
+
+        @app.get("/api/v0/price_info/current/{symbol}")
+        async def api_price_current(symbol: str):
+            return await ao.get_current_price_info(symbol)
+    return app
+
+
+def serve(mode: str, port: int):
+    _xpub, public_key = initialize_cryptlib_direct()
+    stubs = [PriceStubServer(98760), PriceStubServer(98770), PriceStubServer(98780)]
+
+    def create_sources(fetcher):
+        return [
+            BitstampPriceSource(fetcher, url_root=stubs[0].url + "/bitstamp/"),
+            BinancePriceSource(False, fetcher, url_root_override=stubs[1].url + "/binance?symbol="),
+            KrakenPriceSource(fetcher, url_root_override=stubs[2].url + "/kraken?pair="),
+        ]
+    o = Oracle(public_key, data_dir_override=DATA_DIR, price_source_override=PriceSource(AsyncPriceFetcher(), create_sources))
+    uvicorn.run(create_app(mode, o), host="127.0.0.1", port=port, log_level="warning", access_log=False, backlog=4096)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def request_paths(event_ids: list[str]) -> list[str]:
+    paths = []
+    for i, eid in enumerate(event_ids):
+        paths.append(f"/api/v0/event/event/{eid}")
+        if i % 4 == 0:
+            t = NOW - 86400 + i * 600
+            paths.append(f"/api/v0/event/events?start_time={t}&end_time={t + 6 * 3600}&definition=btcusd")
+        if i % 4 == 1:
+            paths.append("/api/v0/oracle/oracle_status")
+        if i % 4 == 2:
+            paths.append("/api/v0/price_info/current/BTCUSD")
+    return paths
+
+
+# One keep-alive connection, sending requests one after the other; returns the latencies
+async def client_conn(port: int, paths: list[str], offset: int, count: int) -> list[float]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    latencies = []
+    for i in range(count):
+        path = paths[(offset + i) % len(paths)]
+        t0 = time.perf_counter()
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        head = await reader.readuntil(b"\r\n\r\n")
+        if not head.startswith(b"HTTP/1.1 200"):
+            raise Exception(f"Unexpected response, {path}, {head[:40]}")
+        length = 0
+        for line in head.split(b"\r\n"):
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - t0)
+    writer.close()
+    return latencies
+
+
+async def load(port: int, paths: list[str], connections: int, per_conn: int) -> tuple[float, list[float]]:
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*map(lambda c: client_conn(port, paths, c * 7, per_conn), range(connections)))
+    elapsed = time.perf_counter() - t0
+    latencies = sorted([l for r in results for l in r])
+    return (elapsed, latencies)
+
+
+def wait_for_server(port: int):
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise Exception(f"Server did not start, port {port}")
+
+
+def bench_mode(mode: str, paths: list[str], connections: int, per_conn: int) -> float:
+    port = free_port()
+    proc = multiprocessing.Process(target=serve, args=(mode, port), daemon=True)
+    proc.start()
+    try:
+        wait_for_server(port)
+        # Warm up the caches and the connections
+        asyncio.run(load(port, paths, 10, len(paths) // 10 + 1))
+        elapsed, latencies = asyncio.run(load(port, paths, connections, per_conn))
+    finally:
+        proc.terminate()
+        proc.join()
+    rate = len(latencies) / elapsed
+
+    def percentile(p: float) -> float:
+        return round(latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000, 1)
+    print(f"  {mode:6} {round(rate):7} req/s   latency p50 {percentile(50):7} ms  p99 {percentile(99):7} ms  max {round(latencies[-1] * 1000, 1):7} ms")
+    return rate
+
+
+def bench(connections: int, per_conn: int):
+    # Each connection needs a descriptor on both sides
+    _soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    _xpub, public_key = initialize_cryptlib_direct()
+    paths = request_paths(prepare(public_key))
+    print(f"{connections} concurrent connections, {per_conn} requests each, {len(paths)} distinct requests")
+    r_sync = bench_mode("sync", paths, connections, per_conn)
+    r_async = bench_mode("async", paths, connections, per_conn)
+    print(f"  speedup: {round(r_async / r_sync, 2)}x")
+
+
+if __name__ == "__main__":
+    connections = 1000
+    per_conn = 20
+    if len(sys.argv) >= 2:
+        connections = int(sys.argv[1])
+    if len(sys.argv) >= 3:
+        per_conn = int(sys.argv[2])
+    bench(connections, per_conn)
@@ -0,0 +1,97 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+# Benchmark: serving hot settled events, dict re-encoded by FastAPI on each request vs. pre-serialized bytes with ETag,
+# and conditional requests (304). Through the in-process test client, and the handlers alone.
+# Usage: python bench_event_api.py [requests]
+
+from oracle import Oracle
+from response_cache import etag_matches
+from test_common import PriceSourceMockConstant, initialize_cryptlib_direct, recreate_empty_db_file
+
+from fastapi import FastAPI, Header, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+import random
+import sys
+import time
+
+
+DATA_DIR = "/tmp"
+HOT_EVENTS = 100
+
+
+def prepare(public_key: str) -> tuple[Oracle, list[str]]:
+    recreate_empty_db_file(DATA_DIR + "/ora.db")
+    o = Oracle(public_key, data_dir_override=DATA_DIR, price_source_override=PriceSourceMockConstant(98765))
+    o.horizon_days = 1
+    now = 1762988400
+    ec = o.create_event_class("btcusd", "BTCUSD", 7, 0, 600, 0, public_key, now - 2 * 86400)
+    o.load_event_classes([ec])
+    o._create_past_outcomes_time(now, event_too_old_threshold=100_000_000)
+    event_ids = o.get_event_ids_filter(now - 2 * 86400, now, "BTCUSD")[:HOT_EVENTS]
+    assert(len(event_ids) == HOT_EVENTS)
+    assert(o.get_event_by_id(event_ids[0])["has_outcome"])
+    return (o, event_ids)
+
+
+def create_app(o: Oracle) -> FastAPI:
+    app = FastAPI()
+
+    # As before: the info dict, encoded by FastAPI
+    @app.get("/old/{event_id}")
+    def api_event_old(event_id: str):
+        return o.get_event_by_id(event_id)
+
+    @app.get("/new/{event_id}")
+    def api_event_new(event_id: str, if_none_match: str | None = Header(default=None)):
+        resp = o.get_event_response_by_id(event_id)
+        headers = {"ETag": resp.etag, "Cache-Control": resp.cache_control}
+        if etag_matches(if_none_match, resp.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=resp.body, media_type="application/json", headers=headers)
+
+    return app
+
+
+def timed(name: str, fn, args: list) -> float:
+    t0 = time.perf_counter()
+    for a in args:
+        fn(*a)
+    t1 = time.perf_counter()
+    rate = len(args) / (t1 - t0)
+    print(f"  {name:28} {round(rate):9} req/s  {round((t1 - t0) / len(args) * 1e6, 1):9} us / req")
+    return rate
+
+
+def bench(request_count: int):
+    _xpub, public_key = initialize_cryptlib_direct()
+    o, event_ids = prepare(public_key)
+    client = TestClient(app=create_app(o))
+    ids = list(map(lambda _: (random.choice(event_ids),), range(request_count)))
+    etags = {eid: o.get_event_response_by_id(eid).etag for eid in event_ids}
+    # Warm up the caches
+    for eid in event_ids:
+        client.get(f"/old/{eid}")
+
+    print(f"{HOT_EVENTS} hot settled events, {request_count} requests")
+    print(f"handlers only:")
+    r_old = timed("dict + jsonable_encoder", lambda eid: JSONResponse(jsonable_encoder(o.get_event_by_id(eid))), ids)
+    r_new = timed("pre-serialized", lambda eid: o.get_event_response_by_id(eid), ids)
+    print(f"  speedup: {round(r_new / r_old, 1)}x")
+    print(f"test client:")
+    r_old = timed("dict + jsonable_encoder", lambda eid: client.get(f"/old/{eid}"), ids)
+    r_new = timed("pre-serialized", lambda eid: client.get(f"/new/{eid}"), ids)
+    r_304 = timed("conditional, 304", lambda eid: client.get(f"/new/{eid}", headers={"If-None-Match": etags[eid]}), ids)
+    print(f"  speedup: {round(r_new / r_old, 2)}x, with 304: {round(r_304 / r_old, 2)}x")
+    print(o.get_event_info_cache_stats()["response_store"])
+    o.close()
+
+
+if __name__ == "__main__":
+    request_count = 5000
+    if len(sys.argv) >= 2:
+        request_count = int(sys.argv[1])
+    bench(request_count)
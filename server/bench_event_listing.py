@@ -0,0 +1,94 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+# Benchmark: walking all events of a year of 10-minute events.
+# Event IDs: guessed time windows under the count cap (as before) vs. keyset pages vs. one NDJSON stream.
+# Event infos: keyset pages of 100 vs. one NDJSON stream vs. all infos materialized at once.
+# Also the peak (traced) memory of each, the stream's does not grow with the number of events.
+# Usage: python bench_event_listing.py [days]
+
+from oracle import EVENT_IDS_FILTER_MAX_COUNT, EVENTS_FILTER_MAX_COUNT, Oracle
+from response_cache import json_dumps_bytes
+from test_common import PriceSourceMockConstant, initialize_cryptlib_direct, recreate_empty_db_file
+
+import sys
+import time
+import tracemalloc
+
+
+DATA_DIR = "/tmp"
+PERIOD = 600
+NOW = 1762988400
+
+
+def prepare(public_key: str, days: int) -> Oracle:
+    recreate_empty_db_file(DATA_DIR + "/ora.db")
+    o = Oracle(public_key, data_dir_override=DATA_DIR, price_source_override=PriceSourceMockConstant(98765))
+    o.horizon_days = days
+    ec = o.create_event_class("btcusd", "BTCUSD", 7, 0, PERIOD, 0, public_key, NOW)
+    o.load_event_classes([ec])
+    return o
+
+
+def timed(name: str, o: Oracle, fn) -> int:
+    o.event_info_cache.clear()
+    o.event_response_store.clear()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    count = fn()
+    elapsed = time.perf_counter() - t0
+    _cur, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {name:34} {count:7} events {round(elapsed * 1000):7} ms  peak memory {round(peak / 1e6, 2):7} MB")
+    return count
+
+
+def bench(days: int):
+    _xpub, public_key = initialize_cryptlib_direct()
+    o = prepare(public_key, days)
+    total = len(o.resolver().list_event_ids(0, 0, "BTCUSD", 0))
+    print(f"{total} events, {days} days, every {PERIOD} s")
+
+    # The client has to know the period to guess windows under the cap
+    def windows():
+        count = 0
+        window = EVENT_IDS_FILTER_MAX_COUNT * PERIOD // 2
+        t = NOW - PERIOD
+        while t <= NOW + days * 86400:
+            count += len(o.get_event_ids_filter(t, t + window - 1, "btcusd"))
+            t += window
+        return count
+
+    def pages(max_count: int, fn):
+        count = 0
+        after = None
+        while True:
+            page = fn(after)
+            count += len(page)
+            after = Oracle.next_cursor(page, max_count)
+            if after is None:
+                return count
+
+    def stream(gen) -> int:
+        count = 0
+        for chunk in gen:
+            count += chunk.count(b"\n")
+        return count
+
+    print("event IDs:")
+    timed("time windows", o, windows)
+    timed("keyset pages", o, lambda: pages(EVENT_IDS_FILTER_MAX_COUNT, lambda after: o.get_event_ids_filter(0, 0, "btcusd", after)))
+    timed("NDJSON stream", o, lambda: stream(o.iter_event_ids_ndjson(0, 0, "btcusd")))
+    print("event infos:")
+    timed("keyset pages", o, lambda: pages(EVENTS_FILTER_MAX_COUNT, lambda after: list(map(lambda e: e["event_id"], o.get_events_filter(0, 0, "btcusd", EVENTS_FILTER_MAX_COUNT, after)))))
+    timed("NDJSON stream", o, lambda: stream(o.iter_events_ndjson(0, 0, "btcusd")))
+    timed("all at once, materialized", o, lambda: len(json_dumps_bytes(o.get_events_by_ids(o.resolver().list_event_ids(0, 0, "BTCUSD", 0)))) and total)
+    o.close()
+
+
+if __name__ == "__main__":
+    days = 365
+    if len(sys.argv) >= 2:
+        days = int(sys.argv[1])
+    bench(days)
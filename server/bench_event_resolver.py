@@ -0,0 +1,58 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+# Benchmark: event lookups and time-range listings, from the DB vs. resolved from the event classes.
+# Usage: python bench_event_resolver.py [horizon_days]
+
+from oracle import Oracle
+from test_common import PriceSourceMockConstant, initialize_cryptlib_direct, recreate_empty_db_file
+
+import random
+import sys
+import time
+
+
+DATA_DIR = "/tmp"
+ROUNDS = 2000
+
+
+def timed(name: str, fn, args: list):
+    t0 = time.perf_counter()
+    for a in args:
+        fn(*a)
+    t1 = time.perf_counter()
+    print(f"  {name:28} {round((t1 - t0) / len(args) * 1e6, 1):9} us / call")
+
+
+def bench(horizon_days: float):
+    _xpub, public_key = initialize_cryptlib_direct()
+    recreate_empty_db_file(DATA_DIR + "/ora.db")
+    o = Oracle(public_key, data_dir_override=DATA_DIR, price_source_override=PriceSourceMockConstant(98765))
+    o.horizon_days = horizon_days
+    now = 1762988400
+    ecs = [
+        o.create_event_class("btcusd", "BTCUSD", 7, 0, 600, 0, public_key, now),
+        o.create_event_class("btceur", "BTCEUR", 7, 0, 12 * 3600, 0, public_key, now),
+    ]
+    o.load_event_classes(ecs, defer_nonces=True)
+    print(f"{o.db.events_len()} events")
+    resolver = o.resolver()
+
+    last = ecs[0].dto.repeat_last_time
+    ids = list(map(lambda _: "btcusd" + str(now + random.randrange(0, (last - now) // 600) * 600), range(ROUNDS)))
+    ranges = list(map(lambda _: now + random.randrange(0, last - now - 86400), range(ROUNDS)))
+    timed("event by ID, DB", lambda eid: o.db.events_get_by_id(eid), [(eid,) for eid in ids])
+    timed("event by ID, resolved", lambda eid: resolver.resolve(eid), [(eid,) for eid in ids])
+    timed("1 day range, DB", lambda t: o.db.events_get_ids_filter(t, t + 86400, None, 100), [(t,) for t in ranges])
+    timed("1 day range, resolved", lambda t: resolver.list_event_ids(t, t + 86400, None, 100), [(t,) for t in ranges])
+    timed("next event, DB", lambda t: o.db.events_get_ids_filter(t, 0, "BTCEUR", 1), [(t,) for t in ranges])
+    timed("next event, resolved", lambda t: resolver.list_event_ids(t, 0, "BTCEUR", 1), [(t,) for t in ranges])
+    o.close()
+
+
+if __name__ == "__main__":
+    horizon_days = 390
+    if len(sys.argv) >= 2:
+        horizon_days = float(sys.argv[1])
+    bench(horizon_days)
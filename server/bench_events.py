@@ -0,0 +1,74 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+# Benchmark: event info hydration, per-event lookups vs. batched lookup.
+# Usage: python bench_events.py
+
+from dto import DigitOutcome, EventClassDto, EventDto, Nonce, OutcomeDto
+from oracle import Oracle
+from test_common import PriceSourceMockConstant, recreate_empty_db_file
+
+import json
+import time
+
+
+DATA_DIR = "/tmp"
+PUBKEY = "0323423d31a856d8d8c8f7fe46ca984ee2cdddcd8506b805417e9c382f637149fd"
+DIGITS = 7
+
+
+# Fill an empty DB with n events, with (dummy) nonces, half of them with outcomes
+def prepare_db(n: int) -> Oracle:
+    recreate_empty_db_file(DATA_DIR + "/ora.db")
+    o = Oracle(PUBKEY, data_dir_override=DATA_DIR, price_source_override=PriceSourceMockConstant(98765))
+    period = 600
+    first_time = 1762988400
+    ec = EventClassDto("btcusd01", first_time, "BTCUSD", DIGITS, 0, "Outcome:{event_id}:{digit_index}:{digit_outcome}", first_time, period, 0, first_time + n * period, PUBKEY)
+    o.db.event_classes_insert_if_missing(ec)
+    events = []
+    nonces = []
+    for i in range(n):
+        t = first_time + i * period
+        eid = "btcusd" + str(t)
+        events.append(EventDto(eid, ec.id, ec.definition, t, f"Outcome:{eid}:{{digit_index}}:{{digit_outcome}}", -1))
+        for d in range(DIGITS):
+            nonces.append(Nonce(eid, d, f"02{i:062x}{d:02x}", f"{i:062x}{d:02x}"))
+    o.db.events_append_if_missing(events, PUBKEY)
+    o.db.nonces_insert(nonces)
+    for e in events[:n // 2]:
+        dos = []
+        for d in range(DIGITS):
+            dos.append(DigitOutcome(e.event_id, d, d, f"02{d:064x}", f"{d:0128x}", f"Outcome:{e.event_id}:{d}:{d}"))
+        o.db.digitoutcomes_insert(e.event_id, dos)
+        o.db.outcomes_insert(OutcomeDto(e.event_id, "98765", e.time + 1))
+    return o
+
+
+def bench(n: int):
+    o = prepare_db(n)
+    event_ids = o.get_event_ids_filter(0, 0, None)[:n]
+    assert len(event_ids) == n
+
+    # Measure without the event info cache
+    o.event_info_cache.clear()
+    t0 = time.perf_counter()
+    individual = list(map(lambda eid: o.get_event_by_id(eid), event_ids))
+    t1 = time.perf_counter()
+    o.event_info_cache.clear()
+    batch = o.get_events_by_ids(event_ids)
+    t2 = time.perf_counter()
+    # Again, now served from the event info cache
+    cached = o.get_events_by_ids(event_ids)
+    t3 = time.perf_counter()
+
+    # Results should be byte-identical
+    assert json.dumps(individual) == json.dumps(batch)
+    assert json.dumps(individual) == json.dumps(cached)
+    print(f"{n:6} events:  per-event {round((t1 - t0) * 1000, 1):9} ms   batched {round((t2 - t1) * 1000, 1):9} ms   speedup {round((t1 - t0) / (t2 - t1), 1)}x   cached {round((t3 - t2) * 1000, 1):9} ms")
+    o.close()
+
+
+if __name__ == "__main__":
+    for n in [100, 5000]:
+        bench(n)
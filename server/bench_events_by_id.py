@@ -0,0 +1,111 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+# Benchmark: infos of many events, one GET per event (as before) vs. one bulk POST with all IDs,
+# at 1, 100 and 1000 IDs, with cold caches (every event loaded from the DB) and warm ones.
+# Through the in-process test client, and the oracle calls alone.
+# Usage: python bench_events_by_id.py [rounds]
+
+from oracle import Oracle
+from response_cache import etag_matches
+from test_common import PriceSourceMockConstant, initialize_cryptlib_direct, recreate_empty_db_file
+
+from fastapi import Body, FastAPI, Header, Response
+from fastapi.testclient import TestClient
+import random
+import sys
+import time
+
+
+DATA_DIR = "/tmp"
+ID_COUNTS = [1, 100, 1000]
+
+
+def prepare(public_key: str) -> tuple[Oracle, list[str]]:
+    recreate_empty_db_file(DATA_DIR + "/ora.db")
+    o = Oracle(public_key, data_dir_override=DATA_DIR, price_source_override=PriceSourceMockConstant(98765))
+    o.horizon_days = 3
+    now = 1762988400
+    ec = o.create_event_class("btcusd", "BTCUSD", 7, 0, 60, 0, public_key, now - 2 * 86400)
+    o.load_event_classes([ec])
+    o._create_past_outcomes_time(now, event_too_old_threshold=100_000_000)
+    # Half settled, half not
+    event_ids = o.get_event_ids_filter(now - 1000 * 60, now + 1000 * 60, "BTCUSD")
+    assert(len(event_ids) >= 2 * max(ID_COUNTS))
+    return (o, event_ids)
+
+
+def create_app(o: Oracle) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/v0/event/event/{event_id}")
+    def api_event(event_id: str, if_none_match: str | None = Header(default=None)):
+        resp = o.get_event_response_by_id(event_id)
+        headers = {"ETag": resp.etag, "Cache-Control": resp.cache_control}
+        if etag_matches(if_none_match, resp.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=resp.body, media_type="application/json", headers=headers)
+
+    @app.post("/api/v0/event/events_by_id")
+    def api_events_by_id(event_ids: list[str] = Body()):
+        return Response(content=o.get_events_response_by_ids(event_ids), media_type="application/json")
+
+    return app
+
+
+def clear_caches(o: Oracle):
+    o.event_info_cache.clear()
+    o.event_response_store.clear()
+
+
+# Average time of one lookup of all the IDs, in ms
+def timed(o: Oracle, fn, id_lists: list[list[str]], cold: bool) -> float:
+    total = 0
+    for ids in id_lists:
+        if cold:
+            clear_caches(o)
+        t0 = time.perf_counter()
+        fn(ids)
+        total += time.perf_counter() - t0
+    return total / len(id_lists) * 1000
+
+
+def bench(rounds: int):
+    _xpub, public_key = initialize_cryptlib_direct()
+    o, event_ids = prepare(public_key)
+    client = TestClient(app=create_app(o))
+    random.seed(23)
+
+    def per_event_http(ids):
+        for eid in ids:
+            assert(client.get(f"/api/v0/event/event/{eid}").status_code == 200)
+
+    def bulk_http(ids):
+        assert(len(client.post("/api/v0/event/events_by_id", json=ids).json()) == len(ids))
+
+    def per_event_oracle(ids):
+        for eid in ids:
+            o.get_event_response_by_id(eid)
+
+    print(f"{len(event_ids)} events (half settled), {rounds} rounds, time of one lookup of all IDs")
+    print(f"  {'':22} {'IDs':>5} {'per event':>11} {'bulk':>11} {'speedup':>8}")
+    for cold in [True, False]:
+        for count in ID_COUNTS:
+            id_lists = list(map(lambda _: random.sample(event_ids, count), range(rounds)))
+            for name, old_fn, new_fn in [
+                ("test client", per_event_http, bulk_http),
+                ("oracle", per_event_oracle, o.get_events_response_by_ids),
+            ]:
+                t_old = timed(o, old_fn, id_lists, cold)
+                t_new = timed(o, new_fn, id_lists, cold)
+                label = f"{name}, {'cold' if cold else 'warm'}"
+                print(f"  {label:22} {count:5} {round(t_old, 2):8} ms {round(t_new, 2):8} ms {round(t_old / t_new, 1):7}x")
+    o.close()
+
+
+if __name__ == "__main__":
+    rounds = 10
+    if len(sys.argv) >= 2:
+        rounds = int(sys.argv[1])
+    bench(rounds)
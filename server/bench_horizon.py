@@ -0,0 +1,71 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+# Benchmark: extending the horizon of the events (with nonces), slot by slot vs. in bulk.
+# Usage: python bench_horizon.py [extend_days]
+
+from oracle import Event, EventClass, Oracle
+from test_common import PriceSourceMockConstant, initialize_cryptlib_direct, recreate_empty_db_file
+
+import sys
+import time
+
+
+DATA_DIR = "/tmp"
+
+
+def prepare(public_key: str) -> tuple[Oracle, int]:
+    recreate_empty_db_file(DATA_DIR + "/ora.db")
+    o = Oracle(public_key, data_dir_override=DATA_DIR, price_source_override=PriceSourceMockConstant(98765))
+    now = 1762988400
+    # Classes with a 1-day horizon
+    o.horizon_days = 1
+    o.load_event_classes([
+        o.create_event_class("btcusd", "BTCUSD", 7, 0, 600, 0, public_key, now),
+        o.create_event_class("btceur", "BTCEUR", 7, 0, 12 * 3600, 0, public_key, now),
+    ])
+    return (o, now)
+
+
+# The previous way: per slot an existence query, an insert and the nonces, each committed
+def extend_slot_by_slot(o: Oracle, now: int) -> int:
+    horizon = now + o.horizon_days * 86400
+    cnt = 0
+    for ec in o.db.event_classes_get_all():
+        look_from = o.db.events_get_latest_time_for_def(ec.definition)
+        first_time, last_time = Oracle.compute_event_time_range(ec.repeat_period, ec.repeat_offset, look_from, horizon)
+        for t in range(first_time, last_time + 1, ec.repeat_period):
+            if o.db.events_get_by_id(Event.event_id_from_class_and_time(ec, t)) is None:
+                ev = Event.new(event_class=EventClass(ec), time=t)
+                o.db.events_insert_if_missing(ev.dto, ec.signer_public_key)
+                o.generate_and_insert_nonces(ev)
+                cnt += 1
+    return cnt
+
+
+def extend_bulk(o: Oracle, now: int) -> int:
+    return o._create_future_events(now)[0]
+
+
+def bench(extend_days: float):
+    _xpub, public_key = initialize_cryptlib_direct()
+    results = {}
+    for name, extend in [("slot-by-slot", extend_slot_by_slot), ("bulk", extend_bulk)]:
+        o, now = prepare(public_key)
+        o.horizon_days = 1 + extend_days
+        t0 = time.perf_counter()
+        cnt = extend(o, now)
+        t1 = time.perf_counter()
+        assert o.db.events_get_ids_with_no_nonce() == []
+        o.close()
+        results[name] = t1 - t0
+        print(f"  {name:12} {cnt} events  {round(t1 - t0, 2):7} s   {round(cnt / (t1 - t0)):7} events/s")
+    print(f"  speedup {round(results['slot-by-slot'] / results['bulk'], 1)}x")
+
+
+if __name__ == "__main__":
+    extend_days = 30
+    if len(sys.argv) >= 2:
+        extend_days = float(sys.argv[1])
+    bench(extend_days)
@@ -0,0 +1,107 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+# Benchmark: DB size and read throughput with nonces, signatures and public keys stored as hex strings vs. as BLOBs.
+# Full-horizon dataset of the default event classes (10 min and 12 h), with nonces, and outcomes for the last 30 days.
+# Usage: python bench_key_format.py [horizon_days]
+
+import db as db_module
+from db import EventStorageDb
+from dto import DigitOutcome, EventDto, Nonce, OutcomeDto
+from test_common import recreate_empty_db_file
+
+import os
+import random
+import sqlite3
+import sys
+import time
+
+
+DATA_DIR = "/tmp"
+DIGITS = 7
+PAST_DAYS = 30
+ROUNDS = 2000
+
+
+def populate(dbfile: str, horizon_days: float) -> list[str]:
+    recreate_empty_db_file(dbfile)
+    conn = sqlite3.connect(dbfile)
+    cursor = conn.cursor()
+    rnd = random.Random(20)
+    pubkey_id = db_module.db_pubkey_insert_if_missing(cursor, "03" + rnd.randbytes(32).hex())
+    now = 1762988400
+    ids_with_outcome = []
+    for class_id, period in [("btcusd", 600), ("btceur", 12 * 3600)]:
+        cursor.execute("INSERT INTO EVENTCLASS (Id, Definition) VALUES (?, ?)", (class_id, class_id.upper()))
+        first = now - PAST_DAYS * 86400
+        times = list(range(first, now + int(horizon_days * 86400), period))
+        for i in range(0, len(times), 10000):
+            events = list(map(lambda t: EventDto(class_id + str(t), class_id, class_id.upper(), t, "template", pubkey_id), times[i:i + 10000]))
+            db_module.db_event_insert_many_if_missing(cursor, events)
+            nonces = []
+            for e in events:
+                for d in range(DIGITS):
+                    nonces.append(Nonce(e.event_id, d, "02" + rnd.randbytes(32).hex(), rnd.randbytes(32).hex()))
+            db_module.db_nonce_insert_many(cursor, nonces)
+            for e in filter(lambda e: e.time <= now, events):
+                db_module.db_digitoutcome_insert_list(cursor, e.event_id, [DigitOutcome(e.event_id, d, d, "02" + rnd.randbytes(32).hex(), rnd.randbytes(64).hex(), "msg") for d in range(DIGITS)])
+                db_module.db_outcome_insert(cursor, OutcomeDto(e.event_id, 98765, e.time + 2))
+                ids_with_outcome.append(e.event_id)
+            conn.commit()
+    cursor.close()
+    conn.execute("VACUUM")
+    conn.close()
+    return ids_with_outcome
+
+
+def timed(name: str, fn, args: list) -> float:
+    t0 = time.perf_counter()
+    for a in args:
+        fn(*a)
+    t1 = time.perf_counter()
+    us = (t1 - t0) / len(args) * 1e6
+    print(f"    {name:28} {round(us, 1):9} us / call")
+    return us
+
+
+def run_reads(ids: list[str]) -> dict[str, float]:
+    db = EventStorageDb(data_dir=DATA_DIR)
+    rnd = random.Random(21)
+    sample = list(map(lambda _: rnd.choice(ids), range(ROUNDS)))
+    batches = list(map(lambda _: rnd.sample(ids, 50), range(ROUNDS // 10)))
+    res = {}
+    res["nonces, by ID"] = timed("nonces, by ID", db.nonces_get, [(eid,) for eid in sample])
+    res["nonces, 50 IDs"] = timed("nonces, 50 IDs", db.nonces_get_by_ids, [(b,) for b in batches])
+    res["digit outcomes, by ID"] = timed("digit outcomes, by ID", db.digitoutcomes_get, [(eid,) for eid in sample])
+    res["digit outcomes, 50 IDs"] = timed("digit outcomes, 50 IDs", db.digitoutcomes_get_by_ids, [(b,) for b in batches])
+    res["event with pubkey, by ID"] = timed("event with pubkey, by ID", db.events_get_by_id, [(eid,) for eid in sample])
+    db.close()
+    return res
+
+
+def bench(horizon_days: float):
+    dbfile = DATA_DIR + "/ora.db"
+    ids = populate(dbfile, horizon_days)
+    results = {}
+    for key_format in [db_module.DB_KEY_FORMAT_HEX, db_module.DB_KEY_FORMAT_BLOB]:
+        if key_format != db_module.DB_KEY_FORMAT_HEX:
+            conn = sqlite3.connect(dbfile)
+            t0 = time.perf_counter()
+            cnt = db_module.db_convert_key_format(conn, key_format)
+            t1 = time.perf_counter()
+            conn.execute("VACUUM")
+            conn.close()
+            print(f"  converted {cnt} rows in {round(t1 - t0, 2)} s, VACUUM {round(time.perf_counter() - t1, 2)} s")
+        print(f"  {key_format}: size {round(os.path.getsize(dbfile) / 1e6, 1)} MB")
+        results[key_format] = run_reads(ids)
+    print(f"  speedup, hex -> blob:")
+    for name in results[db_module.DB_KEY_FORMAT_HEX]:
+        print(f"    {name:28} {round(results[db_module.DB_KEY_FORMAT_HEX][name] / results[db_module.DB_KEY_FORMAT_BLOB][name], 2):9}x")
+
+
+if __name__ == "__main__":
+    horizon_days = 390
+    if len(sys.argv) >= 2:
+        horizon_days = float(sys.argv[1])
+    bench(horizon_days)
@@ -0,0 +1,70 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+# Benchmark: creating the outcomes of a backlog of due events, one by one vs. in a batch.
+# Uses a constant mock price, and the cryptlib given (signing time is included).
+# Usage: python bench_outcome_batch.py [event_count]
+
+from oracle import EventClass, Oracle, Outcome
+from test_common import PriceSourceMockConstant, initialize_cryptlib_direct, recreate_empty_db_file
+
+import sys
+import time
+
+
+DATA_DIR = "/tmp"
+PERIOD = 60
+
+
+def prepare(public_key: str, event_count: int) -> tuple[Oracle, float]:
+    recreate_empty_db_file(DATA_DIR + "/ora.db")
+    o = Oracle(public_key, data_dir_override=DATA_DIR, price_source_override=PriceSourceMockConstant(98765))
+    # Two classes, half of the events each, all due
+    now = 1762988400
+    half = event_count // 2
+    ecs = []
+    for definition in ["BTCUSD", "BTCEUR"]:
+        first_time = now - half * PERIOD
+        ecs.append(EventClass.new(definition.lower(), first_time, definition, 7, 0, first_time, PERIOD, now - PERIOD, public_key))
+    o.load_event_classes(ecs)
+    return (o, now)
+
+
+# The previous way: per event a lookup, price, nonces, signing, and two committed inserts
+def create_one_by_one(o: Oracle, now: float) -> int:
+    cnt = 0
+    for eid in o.db.events_get_past_no_outcome(now):
+        e = o.get_event_obj_by_id(eid)
+        value = o.get_price(e.desc.definition, pref_max_age=15)
+        outcome = Outcome.create(str(value), e.dto.event_id, e.desc, now, e.signer_public_key, o.get_nonces(e))
+        o.db.digitoutcomes_insert(e.dto.event_id, outcome.digits)
+        o.db.outcomes_insert(outcome.dto)
+        cnt += 1
+    return cnt
+
+
+def create_batch(o: Oracle, now: float) -> int:
+    return o._create_past_outcomes_time(now, event_too_old_threshold=0)[0]
+
+
+def bench(event_count: int):
+    _xpub, public_key = initialize_cryptlib_direct()
+    results = {}
+    for name, create in [("one-by-one", create_one_by_one), ("batch", create_batch)]:
+        o, now = prepare(public_key, event_count)
+        t0 = time.perf_counter()
+        cnt = create(o, now)
+        t1 = time.perf_counter()
+        assert len(o.db.events_get_past_no_outcome(now)) == 0
+        o.close()
+        results[name] = t1 - t0
+        print(f"  {name:12} {cnt} outcomes  {round(t1 - t0, 2):7} s   {round(cnt / (t1 - t0)):7} outcomes/s")
+    print(f"  speedup {round(results['one-by-one'] / results['batch'], 1)}x")
+
+
+if __name__ == "__main__":
+    event_count = 10000
+    if len(sys.argv) >= 2:
+        event_count = int(sys.argv[1])
+    bench(event_count)
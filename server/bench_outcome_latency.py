@@ -0,0 +1,52 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+# Benchmark: time-to-outcome (outcome creation time minus event time) of the outcome loop, with short-period events.
+# Uses a constant mock price, the settle delay is from OUTCOME_SETTLE_SECS (dotenv) or the default.
+# Usage: python bench_outcome_latency.py [duration_secs]
+
+from oracle import EventClass, Oracle
+from test_common import PriceSourceMockConstant, initialize_cryptlib_direct, recreate_empty_db_file
+
+from datetime import datetime, UTC
+import math
+import sys
+import threading
+import time
+
+
+DATA_DIR = "/tmp"
+# Event classes: definition, period
+CLASSES = [("BTCUSD", 2), ("BTCEUR", 3)]
+
+
+def bench(duration: float):
+    _xpub, public_key = initialize_cryptlib_direct()
+    recreate_empty_db_file(DATA_DIR + "/ora.db")
+    o = Oracle(public_key, data_dir_override=DATA_DIR, price_source_override=PriceSourceMockConstant(98765))
+    # No horizon extension, only the loaded events
+    o.create_future_events = lambda max_count = 10: (0, 0)
+    now = math.ceil(datetime.now(UTC).timestamp())
+    ecs = []
+    for definition, period in CLASSES:
+        first_time = (now // period + 1) * period
+        last_time = first_time + math.ceil(duration / period) * period
+        ecs.append(EventClass.new(definition.lower(), now, definition, 7, 0, first_time, period, last_time, public_key))
+    o.load_event_classes(ecs)
+    print(f"{o.db.events_len()} events, classes {CLASSES}, settle delay {o.outcome_scheduler.settle_secs} s")
+
+    th = threading.Thread(target=o.check_outcome_loop, daemon=True)
+    th.start()
+    time.sleep(duration + o.outcome_scheduler.settle_secs + 2)
+    ls = o.outcome_scheduler.get_latency_stats()
+    ss = o.outcome_scheduler.get_stats()
+    print(f"Time-to-outcome: count {ls['count']}  p50 {ls['p50']} s  p90 {ls['p90']} s  p99 {ls['p99']} s  max {ls['max']} s")
+    print(f"Loop wakeups: {ss['wakeups']}")
+
+
+if __name__ == "__main__":
+    duration = 20
+    if len(sys.argv) >= 2:
+        duration = float(sys.argv[1])
+    bench(duration)
@@ -0,0 +1,230 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+# Benchmark: thousands of clients waiting for the outcome of an event, polling the event endpoint (as before)
+# vs. subscribed to the Server-Sent Events outcome stream.
+# The server (uvicorn) runs in a separate process; the outcome is created there on request, at the start of each round.
+# Measures the time from the outcome request to each client seeing the outcome, and the number of API requests.
+# Usage: python bench_outcome_push.py [clients] [poll_interval_secs] [rounds]
+
+from oracle import Oracle
+from oracle_async import AsyncOracle
+from response_cache import etag_matches
+from test_common import PriceSourceMockConstant, initialize_cryptlib_direct, recreate_empty_db_file
+
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+import asyncio
+import multiprocessing
+import resource
+import socket
+import sys
+import time
+import uvicorn
+
+
+DATA_DIR = "/tmp"
+NOW = 1762988400
+
+
+def prepare(public_key: str) -> list[str]:
+    recreate_empty_db_file(DATA_DIR + "/ora.db")
+    o = Oracle(public_key, data_dir_override=DATA_DIR, price_source_override=PriceSourceMockConstant(98765))
+    o.horizon_days = 3
+    ec = o.create_event_class("btcusd", "BTCUSD", 7, 0, 600, 0, public_key, NOW - 2 * 86400)
+    o.load_event_classes([ec])
+    # Future events, without outcome
+    event_ids = o.get_event_ids_filter(NOW + 600, 0, "BTCUSD")
+    o.close()
+    return event_ids
+
+
+# The parts of the app used by the handlers
+class BenchApp:
+    def __init__(self, oracle: Oracle):
+        self.oracle = oracle
+
+
+def create_app(o: Oracle) -> FastAPI:
+    app = FastAPI()
+    ao = AsyncOracle(BenchApp(o))
+    app.state.requests = 0
+
+    # As in main.py
+    @app.get("/api/v0/event/event/{event_id}")
+    async def api_event(event_id: str, if_none_match: str | None = Header(default=None)):
+        app.state.requests += 1
+        resp = await ao.get_event_response_by_id(event_id)
+        headers = {"ETag": resp.etag, "Cache-Control": resp.cache_control}
+        if etag_matches(if_none_match, resp.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=resp.body, media_type="application/json", headers=headers)
+
+    @app.get("/api/v0/event/outcome_stream")
+    async def api_outcome_stream(definition: str = None, event_id: list[str] | None = Query(default=None)):
+        app.state.requests += 1
+        sub = ao.subscribe_outcomes(definition, event_id)
+        if sub is None:
+            raise HTTPException(status_code=503, detail="Too many outcome stream subscribers")
+        return StreamingResponse(ao.iter_outcomes_sse(sub), media_type="text/event-stream")
+
+    # Create the outcome of an event now, as the outcome loop would; returns the API request count before
+    @app.post("/bench/settle/{event_id}")
+    async def bench_settle(event_id: str):
+        requests = app.state.requests
+        await asyncio.get_running_loop().run_in_executor(None, lambda: o._create_outcomes_batch([o.get_event_obj_by_id(event_id)], time.time()))
+        return {"requests": requests}
+
+    @app.get("/bench/requests")
+    async def bench_requests():
+        return {"requests": app.state.requests, "feed": o.outcome_feed.get_stats()}
+
+    return app
+
+
+def serve(port: int):
+    _xpub, public_key = initialize_cryptlib_direct()
+    o = Oracle(public_key, data_dir_override=DATA_DIR, price_source_override=PriceSourceMockConstant(98765))
+    uvicorn.run(create_app(o), host="127.0.0.1", port=port, log_level="warning", access_log=False, backlog=4096)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_server(port: int):
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise Exception(f"Server did not start, port {port}")
+
+
+# A request on a new connection, returns the body (JSON, small)
+async def request(port: int, method: str, path: str) -> bytes:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+    data = await reader.read()
+    writer.close()
+    return data.split(b"\r\n\r\n", 1)[1]
+
+
+async def api_request_count(port: int) -> int:
+    body = await request(port, "GET", "/bench/requests")
+    return int(body.split(b'"requests":')[1].split(b",")[0])
+
+
+# Poll the event until it has its outcome; returns the time it was seen
+async def poller(port: int, event_id: str, interval: float, start_delay: float) -> float:
+    await asyncio.sleep(start_delay)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    while True:
+        writer.write(f"GET /api/v0/event/event/{event_id} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = 0
+        for line in head.split(b"\r\n"):
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        body = await reader.readexactly(length)
+        if b'"has_outcome":true' in body:
+            writer.close()
+            return time.perf_counter()
+        await asyncio.sleep(interval)
+
+
+class Subscriber:
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self.buffer = b""
+
+    async def connect(self, port: int):
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+        self.writer.write(b"GET /api/v0/event/outcome_stream?definition=btcusd HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        await self.wait_for(b": subscribed")
+
+    # Read the stream until the marker is seen; returns the time it was seen
+    async def wait_for(self, marker: bytes) -> float:
+        while marker not in self.buffer:
+            data = await self.reader.read(65536)
+            if len(data) == 0:
+                raise Exception("Stream closed")
+            self.buffer += data
+        self.buffer = self.buffer[self.buffer.index(marker) + len(marker):]
+        return time.perf_counter()
+
+
+def summary(name: str, t0: float, seen: list[float], requests: int):
+    lat = sorted(map(lambda t: t - t0, seen))
+
+    def percentile(p: float) -> float:
+        return round(lat[min(len(lat) - 1, int(p / 100 * len(lat)))] * 1000, 1)
+    print(f"    {name:6} seen by {len(lat):5}  p50 {percentile(50):7} ms  p99 {percentile(99):7} ms  max {round(lat[-1] * 1000, 1):7} ms  API requests {requests:6}")
+
+
+async def run_rounds(port: int, event_ids: list[str], clients: int, interval: float, rounds: int):
+    subscribers = [Subscriber() for _i in range(clients)]
+    # Connect in batches, not to overflow the listen backlog
+    for i in range(0, clients, 500):
+        await asyncio.gather(*map(lambda s: s.connect(port), subscribers[i:i + 500]))
+    print(f"  {clients} subscribed")
+    for r in range(rounds):
+        print(f"  round {r + 1}:")
+        # Polling, the clients start at random points of the interval
+        event_id = event_ids[2 * r]
+        pollers = [asyncio.ensure_future(poller(port, event_id, interval, interval * i / clients)) for i in range(clients)]
+        await asyncio.sleep(interval)
+        t0 = time.perf_counter()
+        before = int((await request(port, "POST", f"/bench/settle/{event_id}")).split(b'"requests":')[1].split(b"}")[0])
+        seen = await asyncio.gather(*pollers)
+        summary("poll", t0, seen, await api_request_count(port) - before)
+
+        # Pushed, the subscribers are waiting
+        event_id = event_ids[2 * r + 1]
+        waits = [asyncio.ensure_future(s.wait_for(b"id: " + event_id.encode())) for s in subscribers]
+        before = await api_request_count(port)
+        t0 = time.perf_counter()
+        await request(port, "POST", f"/bench/settle/{event_id}")
+        seen = await asyncio.gather(*waits)
+        summary("push", t0, seen, await api_request_count(port) - before)
+    print(f"  feed: {(await request(port, 'GET', '/bench/requests')).decode()}")
+    for s in subscribers:
+        s.writer.close()
+
+
+def bench(clients: int, interval: float, rounds: int):
+    # Each connection needs a descriptor on both sides
+    _soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    _xpub, public_key = initialize_cryptlib_direct()
+    event_ids = prepare(public_key)
+    print(f"{clients} clients waiting for an outcome, polling every {interval} s vs. subscribed, {rounds} rounds")
+    port = free_port()
+    proc = multiprocessing.Process(target=serve, args=(port,), daemon=True)
+    proc.start()
+    try:
+        wait_for_server(port)
+        asyncio.run(run_rounds(port, event_ids, clients, interval, rounds))
+    finally:
+        proc.terminate()
+        proc.join()
+
+
+if __name__ == "__main__":
+    clients = 2000
+    interval = 1.0
+    rounds = 3
+    if len(sys.argv) >= 2:
+        clients = int(sys.argv[1])
+    if len(sys.argv) >= 3:
+        interval = float(sys.argv[2])
+    if len(sys.argv) >= 4:
+        rounds = int(sys.argv[3])
+    bench(clients, interval, rounds)
@@ -0,0 +1,108 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+# Benchmark: finding the events without outcome, LEFT JOIN anti-join on OUTCOME vs. the pending-outcome partial index.
+# A long history of events with outcome, a few past ones without, and 1 day of future events.
+# Usage: python bench_pending.py [history_events]
+
+import db as db_module
+from test_common import recreate_empty_db_file
+
+import sqlite3
+import sys
+import time
+
+
+DATA_DIR = "/tmp"
+PERIOD = 60
+PAST_PENDING = 20
+FUTURE_EVENTS = 1440
+ROUNDS = 20
+
+
+def populate(dbfile: str, history: int) -> int:
+    recreate_empty_db_file(dbfile)
+    conn = sqlite3.connect(dbfile)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO EVENTCLASS (Id, Definition) VALUES ('btcusd', 'BTCUSD')")
+    now = 1762988400
+    first = now - history * PERIOD
+    for chunk_start in range(0, history + FUTURE_EVENTS, 100000):
+        times = range(first + chunk_start * PERIOD, first + min(chunk_start + 100000, history + FUTURE_EVENTS) * PERIOD, PERIOD)
+        # The latest past ones are pending
+        has_outcome = lambda t: 1 if t <= now - PAST_PENDING * PERIOD else 0
+        cursor.executemany("""
+            INSERT INTO EVENT (EventId, ClassId, Definition, Time, StringTemplate, PublicKeyId, HasOutcome)
+            VALUES (?, 'btcusd', 'BTCUSD', ?, 'template', 1, ?)
+        """, map(lambda t: ("btcusd" + str(t), t, has_outcome(t)), times))
+        cursor.executemany("""
+            INSERT INTO OUTCOME (EventId, Value, CreatedTime) VALUES (?, 98765, ?)
+        """, map(lambda t: ("btcusd" + str(t), t + 2), filter(lambda t: has_outcome(t) == 1, times)))
+        conn.commit()
+    cursor.close()
+    conn.close()
+    return now
+
+
+# The queries before the pending-outcome index
+def old_earliest_time_without_outcome(cursor: sqlite3.Cursor, after_time: int):
+    cursor.execute("""
+        SELECT MIN(EVENT.Time)
+        FROM EVENT
+        LEFT OUTER JOIN OUTCOME ON EVENT.EventId == OUTCOME.EventId
+        WHERE OUTCOME.EventId IS NULL
+        AND EVENT.Time >= ?
+        ORDER BY EVENT.Time ASC
+    """, (after_time,))
+    return cursor.fetchall()
+
+
+def old_past_no_outcome(cursor: sqlite3.Cursor, cutoff_time: int):
+    cursor.execute("""
+        SELECT EVENT.EventId
+        FROM EVENT
+        LEFT OUTER JOIN OUTCOME ON EVENT.EventId == OUTCOME.EventId
+        WHERE Time <= ?
+        AND OUTCOME.EventId IS NULL
+        ORDER BY EVENT.Time ASC
+    """, (cutoff_time,))
+    return cursor.fetchall()
+
+
+def timed(name: str, fn) -> float:
+    t0 = time.perf_counter()
+    for _i in range(ROUNDS):
+        fn()
+    t1 = time.perf_counter()
+    us = (t1 - t0) / ROUNDS * 1e6
+    print(f"  {name:32} {round(us, 1):11} us / call")
+    return us
+
+
+def bench(history: int):
+    dbfile = DATA_DIR + "/ora.db"
+    t0 = time.perf_counter()
+    now = populate(dbfile, history)
+    print(f"{history} past events with outcome, {PAST_PENDING} past pending, {FUTURE_EVENTS} future (populated in {round(time.perf_counter() - t0, 1)} s)")
+    conn = sqlite3.connect(dbfile)
+    cursor = conn.cursor()
+    assert(len(old_past_no_outcome(cursor, now)) == PAST_PENDING)
+    assert(len(db_module.db_event_get_past_no_outcome(cursor, now)) == PAST_PENDING)
+    assert(old_earliest_time_without_outcome(cursor, 0)[0][0] == db_module.db_event_get_earliest_time_without_outcome(cursor, 0))
+
+    t_old = timed("past no outcome, anti-join", lambda: old_past_no_outcome(cursor, now))
+    t_new = timed("past no outcome, pending index", lambda: db_module.db_event_get_past_no_outcome(cursor, now))
+    print(f"  speedup: {round(t_old / t_new, 1)}x")
+    t_old = timed("earliest pending, anti-join", lambda: old_earliest_time_without_outcome(cursor, 0))
+    t_new = timed("earliest pending, pending index", lambda: db_module.db_event_get_earliest_time_without_outcome(cursor, 0))
+    print(f"  speedup: {round(t_old / t_new, 1)}x")
+    cursor.close()
+    conn.close()
+
+
+if __name__ == "__main__":
+    history = 1000000
+    if len(sys.argv) >= 2:
+        history = int(sys.argv[1])
+    bench(history)
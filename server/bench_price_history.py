@@ -0,0 +1,60 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+# Benchmark: price-at-time lookups in a full tick history, binary search vs. linear scan.
+# Usage: python bench_price_history.py [ticks]
+
+from price_history import PriceHistory, TickRingBuffer
+
+import random
+import sys
+import time
+
+
+LOOKUPS = 10000
+
+
+def linear_nearest(buf: TickRingBuffer, t: float) -> tuple[float, float]:
+    best = 0
+    for i in range(len(buf)):
+        if abs(buf.time_at(i) - t) < abs(buf.time_at(best) - t):
+            best = i
+    return (buf.time_at(best), buf.price_at(best))
+
+
+def bench(ticks: int):
+    history = PriceHistory(capacity=ticks)
+    first_time = 1762988400
+    # Wrap around once, so the buffer is full and rotated
+    for i in range(ticks + ticks // 3):
+        history.record("BTCUSD", first_time + i, 100000 + (i % 1000))
+    buf = history._buffers["BTCUSD"]
+    stats = history.get_stats()
+    print(f"{stats['ticks']} ticks, {stats['bytes']} bytes")
+
+    oldest = buf.time_at(0)
+    times = [oldest + random.random() * ticks for _ in range(LOOKUPS)]
+    for name, fn in [
+        ("nearest", lambda t: history.get_price_at("BTCUSD", t)),
+        ("twap 60s", lambda t: history.get_price_at("BTCUSD", t, 60)),
+    ]:
+        t0 = time.perf_counter()
+        for t in times:
+            fn(t)
+        t1 = time.perf_counter()
+        print(f"  {name:12} {round((t1 - t0) / LOOKUPS * 1e6, 2):9} us / lookup")
+
+    n_linear = 3
+    t0 = time.perf_counter()
+    for t in times[:n_linear]:
+        assert linear_nearest(buf, t) == buf.nearest(t)
+    t1 = time.perf_counter()
+    print(f"  {'linear scan':12} {round((t1 - t0) / n_linear * 1e6, 2):9} us / lookup")
+
+
+if __name__ == "__main__":
+    ticks = 1000000
+    if len(sys.argv) >= 2:
+        ticks = int(sys.argv[1])
+    bench(ticks)
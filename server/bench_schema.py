@@ -0,0 +1,127 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+# Benchmark: the hot queries on a v1 DB (single-column indexes) vs. a DB with the latest schema (v2: composite, unique and clustered indexes).
+# Both DBs hold the same events, nonces and outcomes (outcomes for the first half). Also measures the migration from v1.
+# Usage: python bench_schema.py [event_count]
+
+import db as db_module
+from dto import DigitOutcome, EventClassDto, EventDto, Nonce, OutcomeDto
+
+import os
+import random
+import sqlite3
+import sys
+import time
+
+
+DATA_DIR = "/tmp"
+PUBKEY = "0323423d31a856d8d8c8f7fe46ca984ee2cdddcd8506b805417e9c382f637149fd"
+DIGITS = 7
+PERIOD = 600
+DEFINITIONS = ["BTCUSD", "BTCEUR", "ETHUSD", "ETHEUR"]
+ROUNDS = 2000
+FIRST_TIME = 1762988400
+
+
+def create(dbfile: str, version: int, event_count: int) -> float:
+    if os.path.exists(dbfile):
+        os.remove(dbfile)
+    conn = sqlite3.connect(dbfile)
+    db_module.db_setup_from_to(conn, 0, version)
+    t0 = time.perf_counter()
+    cursor = conn.cursor()
+    pubkey_id = db_module.db_pubkey_insert_if_missing(cursor, PUBKEY)
+    per_def = event_count // len(DEFINITIONS)
+    for defi in DEFINITIONS:
+        ec = EventClassDto(defi.lower(), FIRST_TIME, defi, DIGITS, 0, "Outcome:{event_id}:{digit_index}:{digit_outcome}", FIRST_TIME, PERIOD, 0, FIRST_TIME + per_def * PERIOD, PUBKEY)
+        db_module.db_eventclass_insert_if_missing(cursor, ec)
+        for chunk_start in range(0, per_def, 10000):
+            events = []
+            nonces = []
+            outcomes = []
+            for i in range(chunk_start, min(chunk_start + 10000, per_def)):
+                t = FIRST_TIME + i * PERIOD
+                eid = ec.id + str(t)
+                events.append(EventDto(eid, ec.id, defi, t, "template", pubkey_id))
+                for d in range(DIGITS):
+                    nonces.append(Nonce(eid, d, f"02{i:062x}{d:02x}", f"{i:062x}{d:02x}"))
+                if i < per_def // 2:
+                    outcomes.append(OutcomeDto(eid, 98765, t + 2))
+            db_module.db_event_insert_many_if_missing(cursor, events)
+            db_module.db_nonce_insert_many(cursor, nonces)
+            # Not with db_outcome_insert_many(), it also maintains the pending flag of later versions
+            cursor.executemany("INSERT INTO OUTCOME (EventId, Value, CreatedTime) VALUES (?, ?, ?)", map(lambda o: (o.event_id, o.value, o.created_time), outcomes))
+            if version >= 3:
+                db_module.db_event_set_has_outcome_many(cursor, list(map(lambda o: o.event_id, outcomes)))
+            for o in outcomes:
+                db_module.db_digitoutcome_insert_list(cursor, o.event_id, [DigitOutcome(o.event_id, d, d, f"02{d:064x}", f"{d:0128x}", "msg") for d in range(DIGITS)])
+            conn.commit()
+    cursor.close()
+    conn.close()
+    return time.perf_counter() - t0
+
+
+def timed(name: str, conn: sqlite3.Connection, fn, args: list) -> float:
+    cursor = conn.cursor()
+    t0 = time.perf_counter()
+    for a in args:
+        fn(cursor, *a)
+    t1 = time.perf_counter()
+    cursor.close()
+    us = (t1 - t0) / len(args) * 1e6
+    print(f"    {name:28} {round(us, 1):9} us / call")
+    return us
+
+
+def run_queries(dbfile: str, event_count: int) -> dict[str, float]:
+    per_def = event_count // len(DEFINITIONS)
+    last = FIRST_TIME + per_def * PERIOD
+    random.seed(17)
+    ids = list(map(lambda _: "btcusd" + str(FIRST_TIME + random.randrange(0, per_def // 2) * PERIOD), range(ROUNDS)))
+    id_batches = list(map(lambda _: random.sample(ids, 50), range(ROUNDS // 10)))
+    times = list(map(lambda _: FIRST_TIME + random.randrange(0, last - FIRST_TIME - 86400), range(ROUNDS)))
+    conn = sqlite3.connect(dbfile)
+    res = {}
+    res["event range, by definition"] = timed("event range, by definition", conn, db_module.db_event_get_filter_time_definition, [(t, t + 86400, "BTCEUR", 100) for t in times])
+    res["next event, by definition"] = timed("next event, by definition", conn, db_module.db_event_get_filter_time_definition, [(t, 0, "ETHEUR", 1) for t in times])
+    res["latest time, by definition"] = timed("latest time, by definition", conn, db_module.db_event_get_latest_time_for_def, [("ETHUSD",) for _t in times[:ROUNDS // 10]])
+    res["nonces, by ID"] = timed("nonces, by ID", conn, db_module.db_nonce_get_all_by_id, [(eid,) for eid in ids])
+    res["nonces, 50 IDs"] = timed("nonces, 50 IDs", conn, db_module.db_nonce_get_all_by_ids, [(b,) for b in id_batches])
+    res["digit outcomes, by ID"] = timed("digit outcomes, by ID", conn, db_module.db_digitoutcome_get_all_by_id, [(eid,) for eid in ids])
+    res["outcome, by ID"] = timed("outcome, by ID", conn, db_module.db_outcome_get_by_id, [(eid,) for eid in ids])
+    res["outcomes, 50 IDs"] = timed("outcomes, 50 IDs", conn, db_module.db_outcome_get_by_ids, [(b,) for b in id_batches])
+    conn.close()
+    return res
+
+
+def bench(event_count: int):
+    file_v1 = DATA_DIR + "/ora_schema_v1.db"
+    file_latest = DATA_DIR + "/ora_schema_latest.db"
+    latest = db_module.LATEST_DB_VERSION
+    print(f"{event_count} events, {DIGITS} digits, outcomes for half of them")
+    results = {}
+    for version, dbfile in [(1, file_v1), (latest, file_latest)]:
+        print(f"  v{version}:")
+        populate_time = create(dbfile, version, event_count)
+        print(f"    {'populate':28} {round(populate_time, 2):9} s")
+        print(f"    {'file size':28} {round(os.path.getsize(dbfile) / 1e6, 1):9} MB")
+        results[version] = run_queries(dbfile, event_count)
+
+    print(f"  speedup, v1 -> v{latest}:")
+    for name in results[1]:
+        print(f"    {name:28} {round(results[1][name] / results[latest][name], 1):9}x")
+
+    conn = sqlite3.connect(file_v1)
+    t0 = time.perf_counter()
+    db_module.db_setup_from_to(conn, 1, latest)
+    conn.close()
+    print(f"  migration v1 -> v{latest}: {round(time.perf_counter() - t0, 2)} s, file size {round(os.path.getsize(file_v1) / 1e6, 1)} MB (before VACUUM)")
+
+
+if __name__ == "__main__":
+    event_count = 200000
+    if len(sys.argv) >= 2:
+        event_count = int(sys.argv[1])
+    bench(event_count)
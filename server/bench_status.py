@@ -0,0 +1,90 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+# Benchmark: oracle status (total and future event counts) and the DB stats counts,
+# COUNT(*) queries vs. the in-memory counters.
+# Usage: python bench_status.py [event_count]
+
+import db as db_module
+from db import EventStorageDb
+from test_common import recreate_empty_db_file
+
+import sqlite3
+import sys
+import time
+
+
+DATA_DIR = "/tmp"
+PERIOD = 60
+ROUNDS = 20
+
+
+def populate(dbfile: str, event_count: int) -> int:
+    recreate_empty_db_file(dbfile)
+    conn = sqlite3.connect(dbfile)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO EVENTCLASS (Id, Definition) VALUES ('btcusd', 'BTCUSD')")
+    first = 1762988400
+    for chunk_start in range(0, event_count, 100000):
+        times = range(first + chunk_start * PERIOD, first + min(chunk_start + 100000, event_count) * PERIOD, PERIOD)
+        cursor.executemany("""
+            INSERT INTO EVENT (EventId, ClassId, Definition, Time, StringTemplate, PublicKeyId)
+            VALUES (?, 'btcusd', 'BTCUSD', ?, 'template', 1)
+        """, map(lambda t: ("btcusd" + str(t), t), times))
+        cursor.executemany("""
+            INSERT INTO NONCE (EventId, DigitIndex, NoncePub, NonceSec) VALUES (?, 0, 'np', 'ns')
+        """, map(lambda t: ("btcusd" + str(t),), times))
+        conn.commit()
+    cursor.close()
+    conn.close()
+    # Half in the past
+    return first + event_count // 2 * PERIOD
+
+
+def timed(name: str, fn) -> float:
+    t0 = time.perf_counter()
+    for _i in range(ROUNDS):
+        fn()
+    t1 = time.perf_counter()
+    us = (t1 - t0) / ROUNDS * 1e6
+    print(f"  {name:28} {round(us, 1):11} us / call")
+    return us
+
+
+# The counts before the in-memory counters
+def status_count(db: EventStorageDb, now: int):
+    with db._cursor_ro() as cursor:
+        return (db_module.db_event_count_future(cursor, now), db_module.db_event_count(cursor))
+
+
+def stats_count(db: EventStorageDb):
+    with db._cursor_ro() as cursor:
+        return [
+            db_module.db_eventclass_count(cursor), db_module.db_pubkey_count(cursor), db_module.db_event_count(cursor),
+            db_module.db_nonce_count(cursor), db_module.db_digitoutcome_count(cursor), db_module.db_outcome_count(cursor),
+        ]
+
+
+def bench(event_count: int):
+    now = populate(DATA_DIR + "/ora.db", event_count)
+    db = EventStorageDb(data_dir=DATA_DIR)
+    t0 = time.perf_counter()
+    assert(db.events_count_future(now) == status_count(db, now)[0])
+    assert(db.events_len() == event_count)
+    print(f"{event_count} events, counters loaded in {round(time.perf_counter() - t0, 2)} s, {db.get_counters_stats()['times_bytes']} bytes")
+
+    t_old = timed("status, COUNT", lambda: status_count(db, now))
+    t_new = timed("status, counters", lambda: (db.events_count_future(now), db.events_len()))
+    print(f"  speedup: {round(t_old / t_new, 1)}x")
+    t_old = timed("stats, COUNT", lambda: stats_count(db))
+    t_new = timed("stats, counters", lambda: db._counters.get_counts())
+    print(f"  speedup: {round(t_old / t_new, 1)}x")
+    db.close()
+
+
+if __name__ == "__main__":
+    event_count = 1000000
+    if len(sys.argv) >= 2:
+        event_count = int(sys.argv[1])
+    bench(event_count)
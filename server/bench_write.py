@@ -0,0 +1,86 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+# Benchmark: loading a full-horizon event class into an empty DB, row-by-row inserts vs. bulk inserts.
+# Nonces are dummy values, only the DB writes are measured.
+# Usage: python bench_write.py [horizon_days]
+
+from db import EventStorageDb, db_event_insert_if_missing, db_nonce_insert_one, db_pubkey_insert_if_missing
+from dto import EventClassDto, EventDto, Nonce
+from test_common import recreate_empty_db_file
+
+import sys
+import time
+
+
+DATA_DIR = "/tmp"
+PUBKEY = "0323423d31a856d8d8c8f7fe46ca984ee2cdddcd8506b805417e9c382f637149fd"
+DIGITS = 7
+PERIOD = 600
+
+
+def prepare(horizon_days: float) -> tuple[EventClassDto, list[EventDto], list[Nonce]]:
+    first_time = 1762988400
+    n = int(horizon_days * 86400 / PERIOD)
+    ec = EventClassDto("btcusd01", first_time, "BTCUSD", DIGITS, 0, "Outcome:{event_id}:{digit_index}:{digit_outcome}", first_time, PERIOD, 0, first_time + n * PERIOD, PUBKEY)
+    events = []
+    nonces = []
+    for i in range(n):
+        t = first_time + i * PERIOD
+        eid = "btcusd" + str(t)
+        events.append(EventDto(eid, ec.id, ec.definition, t, f"Outcome:{eid}:{{digit_index}}:{{digit_outcome}}", -1))
+        for d in range(DIGITS):
+            nonces.append(Nonce(eid, d, f"02{i:062x}{d:02x}", f"{i:062x}{d:02x}"))
+    return (ec, events, nonces)
+
+
+def empty_db(ec: EventClassDto) -> EventStorageDb:
+    recreate_empty_db_file(DATA_DIR + "/ora.db")
+    db = EventStorageDb(data_dir=DATA_DIR)
+    db.event_classes_insert_if_missing(ec)
+    return db
+
+
+# The previous way: one statement per row (plus a SELECT per event), one commit
+def load_row_by_row(db: EventStorageDb, events: list[EventDto], nonces: list[Nonce]):
+    with db._conn_rw() as conn:
+        cursor = conn.cursor()
+        pubkey_id = db_pubkey_insert_if_missing(cursor, PUBKEY)
+        for e in events:
+            e.signer_public_key_id = pubkey_id
+            db_event_insert_if_missing(cursor, e)
+        for n in nonces:
+            db_nonce_insert_one(cursor, n)
+        conn.commit()
+        cursor.close()
+
+
+def load_bulk(db: EventStorageDb, events: list[EventDto], nonces: list[Nonce]):
+    db.events_append_if_missing(events, PUBKEY)
+    db.nonces_insert(nonces)
+
+
+def bench(horizon_days: float):
+    ec, events, nonces = prepare(horizon_days)
+    print(f"Horizon {horizon_days} days: {len(events)} events, {len(nonces)} nonces")
+
+    results = {}
+    for name, load in [("row-by-row", load_row_by_row), ("bulk", load_bulk)]:
+        db = empty_db(ec)
+        t0 = time.perf_counter()
+        load(db, events, nonces)
+        t1 = time.perf_counter()
+        assert db.events_len() == len(events)
+        assert db.nonces_get(events[-1].event_id)[DIGITS - 1].__dict__ == nonces[-1].__dict__
+        db.close()
+        results[name] = t1 - t0
+        print(f"  {name:12} {round(t1 - t0, 2):7} s   {round((len(events) + len(nonces)) / (t1 - t0)):9} rows/s")
+    print(f"  speedup {round(results['row-by-row'] / results['bulk'], 1)}x")
+
+
+if __name__ == "__main__":
+    horizon_days = 390
+    if len(sys.argv) >= 2:
+        horizon_days = float(sys.argv[1])
+    bench(horizon_days)
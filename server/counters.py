@@ -0,0 +1,113 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+from array import array
+from contextlib import contextmanager
+import bisect
+import heapq
+import threading
+
+# The counted tables, with their short names (as in the stats print)
+COUNTER_NAMES: list[str] = ["evcl", "pkey", "nonce", "ev", "diou", "outcome"]
+
+
+class StorageCounters:
+    """
+    In-memory row counts of the storage tables, and the times of all events in a sorted array,
+    so that the total and the future event counts do not need table scans (the latter is a binary search).
+    Loaded on first use, then updated by the storage on each insert, see updating().
+    If the inserted events are not known (a bulk insert with some skipped), the event times are reloaded on next use.
+    Changes made by other processes are not seen, the storage can verify with a recount.
+    Thread-safe.
+    """
+
+    def __init__(self, load_counts_fn, load_event_times_fn):
+        # () -> dict[str, int], by counter name
+        self._load_counts_fn = load_counts_fn
+        # () -> list[int], in increasing order
+        self._load_event_times_fn = load_event_times_fn
+        # Reentrant, held by the storage over a commit and the following updates
+        self._lock = threading.RLock()
+        self._counts: dict[str, int] | None = None
+        self._times: array | None = None
+        self.count_loads = 0
+        self.time_loads = 0
+
+    # Hold the lock over a commit and the counter updates after it: a concurrent first load
+    # either happens before the commit (and the updates are applied to it), or after the updates
+    @contextmanager
+    def updating(self):
+        with self._lock:
+            yield self
+
+    # The lock must be held
+    def _ensure_counts_locked(self):
+        if self._counts is not None:
+            return
+        self._counts = dict(self._load_counts_fn())
+        self.count_loads += 1
+
+    # The lock must be held
+    def _ensure_times_locked(self):
+        if self._times is not None:
+            return
+        self._times = array('q', self._load_event_times_fn())
+        self.time_loads += 1
+
+    # Add inserted rows to a counter. Nothing to do if not loaded yet, the load will count them
+    def add(self, name: str, count: int):
+        if count == 0:
+            return
+        with self._lock:
+            if self._counts is not None:
+                self._counts[name] += count
+
+    # Add inserted events, with their times, or with None if they are not known
+    def add_events(self, count: int, times: list[int] | None):
+        if count == 0:
+            return
+        with self._lock:
+            self.add("ev", count)
+            if self._times is None:
+                return
+            if times is None:
+                self._times = None
+                return
+            times = sorted(times)
+            if len(self._times) == 0 or times[0] >= self._times[-1]:
+                # Usual case, new events are the latest ones
+                self._times.extend(times)
+            else:
+                self._times = array('q', heapq.merge(self._times, times))
+
+    # Drop everything, reloaded on next use
+    def reset(self):
+        with self._lock:
+            self._counts = None
+            self._times = None
+
+    def get(self, name: str) -> int:
+        with self._lock:
+            self._ensure_counts_locked()
+            return self._counts[name]
+
+    def get_counts(self) -> dict[str, int]:
+        with self._lock:
+            self._ensure_counts_locked()
+            return dict(self._counts)
+
+    # Number of events with time after the given time
+    def count_events_after(self, time: float) -> int:
+        with self._lock:
+            self._ensure_times_locked()
+            return len(self._times) - bisect.bisect_right(self._times, time)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "count_loads": self.count_loads,
+                "time_loads": self.time_loads,
+                "times": -1 if self._times is None else len(self._times),
+                "times_bytes": 0 if self._times is None else self._times.itemsize * len(self._times),
+            }
@@ -3,32 +3,106 @@
 # file COPYING or http://www.opensource.org/licenses/mit-license.php.
 
 from db_infra import get_db_file, print_current_db_version
+from db_pool import ConnectionPool, DB_POOL_IDLE_SECONDS_DEFAULT, DB_POOL_MAX_RO_DEFAULT, DB_POOL_MAX_RW_DEFAULT
 from dto import DigitOutcome, EventClassDto, EventDto, Nonce, OutcomeDto
+from counters import StorageCounters
+from registry import Registry
 
+from contextlib import contextmanager
+from datetime import datetime, UTC
 import math
+import os
 import sqlite3
 import sys
-import threading
 
 
-LATEST_DB_VERSION = 1
+LATEST_DB_VERSION = 4
 
-# Upgrade from an older version, versions taken from args
+# Max number of IDs bound into one "IN (...)" query, below the SQLite host parameter limit
+DB_IN_CHUNK_SIZE = 500
+
+# Max number of rows written in one transaction in bulk inserts
+DB_WRITE_CHUNK_SIZE = 20000
+
+# Connection settings defaults, can be overridden from dotenv.
+# WAL: readers are not blocked by a writer. NORMAL synchronous is safe in WAL mode.
+DB_JOURNAL_MODE_DEFAULT = "WAL"
+DB_SYNCHRONOUS_DEFAULT = "NORMAL"
+# Page cache per connection, negative means KiB
+DB_CACHE_SIZE_DEFAULT = -16000
+DB_MMAP_SIZE_DEFAULT = 268435456
+
+# Storage format of the nonces, signatures and public keys: hex strings, or raw bytes in BLOBs (half the size).
+# A setting in the DB, changed by db_convert_key_format()
+DB_KEY_FORMAT_HEX = "hex"
+DB_KEY_FORMAT_BLOB = "blob"
+
+# Pragma value from env, checked against the allowed values
+def _db_pragma_choice(env_name: str, default: str, allowed: list[str]) -> str:
+    value = os.getenv(env_name, default).upper()
+    if value not in allowed:
+        raise Exception(f"Invalid value for {env_name}: '{value}', allowed: {allowed}")
+    return value
+
+
+# A key value (nonce, signature, public key) as stored: in blob format a lowercase hex string is stored as bytes,
+# anything else (not hex, upper case) as it is, so that it is read back unchanged
+def _db_key_in(value, blob: bool):
+    if not blob or not isinstance(value, str):
+        return value
+    try:
+        b = bytes.fromhex(value)
+    except ValueError:
+        return value
+    if b.hex() != value:
+        return value
+    return b
+
+
+# A stored key value as hex string, for both formats
+def _db_key_out(value):
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
+
+
+# Upgrade from the current version of the DB (0 if empty) to the latest, or between the versions taken from args
 def db_setup(conn: sqlite3.Connection):
     vto = LATEST_DB_VERSION
-    vfrom = vto - 1
+    vfrom = db_get_version(conn)
     if len(sys.argv) >= 3:
         vfrom = int(sys.argv[1])
         vto = int(sys.argv[2])
     db_setup_from_to(conn, vfrom, vto)
 
 
+# Version of the DB schema, 0 if it is empty (no VERSION table)
+def db_get_version(conn: sqlite3.Connection) -> int:
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'VERSION'")
+    if len(cursor.fetchall()) == 0:
+        cursor.close()
+        return 0
+    cursor.execute("SELECT Version FROM VERSION LIMIT 1")
+    rows = cursor.fetchall()
+    cursor.close()
+    if len(rows) < 1 or rows[0][0] is None:
+        return 0
+    return int(rows[0][0])
+
+
 # Upgrade from an older version, versions have default values
 def db_setup_from_to(conn: sqlite3.Connection, vfrom = 0, vto = LATEST_DB_VERSION):
     print(f"Updating DB from v{vfrom} to v{vto}")
 
     if vfrom <= 0 and vto >= 1:
         db_update_0_1(conn)
+    if vfrom <= 1 and vto >= 2:
+        db_update_1_2(conn)
+    if vfrom <= 2 and vto >= 3:
+        db_update_2_3(conn)
+    if vfrom <= 3 and vto >= 4:
+        db_update_3_4(conn)
 
 
 def db_update_0_1(conn: sqlite3.Connection):
@@ -125,6 +199,157 @@ def db_update_0_1(conn: sqlite3.Connection):
     cursor.close()
 
 
+# v2: indexes tuned for the hot queries.
+# - EVENT: composite (Definition, Time), for the per-definition time range listings and MAX(Time)
+# - OUTCOME: unique EventId, at most one outcome per event
+# - NONCE, DIGITOUTCOME: clustered on (EventId, digit index), WITHOUT ROWID, rows of an event are adjacent
+# - Indexes duplicating a primary key or a prefix of another index are dropped
+def db_update_1_2(conn: sqlite3.Connection):
+    cursor = conn.cursor()
+
+    cursor.execute("UPDATE VERSION SET Version = 2")
+
+    cursor.execute("DROP INDEX IF EXISTS EcId")
+    cursor.execute("DROP INDEX IF EXISTS PubkeyId")
+
+    cursor.execute("DROP INDEX IF EXISTS EvEventId")
+    cursor.execute("DROP INDEX IF EXISTS EvDefinition")
+    cursor.execute("CREATE INDEX EvDefinitionTime ON EVENT(Definition, Time)")
+
+    cursor.execute("""
+        CREATE TABLE NONCE_V2 (
+            EventId VARCHAR(100) NOT NULL,
+            DigitIndex INTEGER NOT NULL,
+            NoncePub VARCHAR(100),
+            NonceSec VARCHAR(100),
+            PRIMARY KEY (EventId, DigitIndex),
+            FOREIGN KEY (EventId) REFERENCES EVENT (EventId)
+        ) WITHOUT ROWID
+    """)
+    # Duplicates (not expected) are dropped, the first one is kept
+    cursor.execute("""
+        INSERT OR IGNORE INTO NONCE_V2 (EventId, DigitIndex, NoncePub, NonceSec)
+        SELECT EventId, DigitIndex, NoncePub, NonceSec FROM NONCE ORDER BY rowid
+    """)
+    cursor.execute("DROP TABLE NONCE")
+    cursor.execute("ALTER TABLE NONCE_V2 RENAME TO NONCE")
+
+    cursor.execute("""
+        CREATE TABLE DIGITOUTCOME_V2 (
+            EventId VARCHAR(100) NOT NULL,
+            Idx INTEGER NOT NULL,
+            Value INTEGER,
+            Nonce VARCHAR(100),
+            Signature VARCHAR(100),
+            MsgStr VARCHAR(100),
+            PRIMARY KEY (EventId, Idx),
+            FOREIGN KEY (EventId) REFERENCES EVENT (EventId)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        INSERT OR IGNORE INTO DIGITOUTCOME_V2 (EventId, Idx, Value, Nonce, Signature, MsgStr)
+        SELECT EventId, Idx, Value, Nonce, Signature, MsgStr FROM DIGITOUTCOME ORDER BY rowid
+    """)
+    cursor.execute("DROP TABLE DIGITOUTCOME")
+    cursor.execute("ALTER TABLE DIGITOUTCOME_V2 RENAME TO DIGITOUTCOME")
+
+    # In case of multiple outcomes, keep the first, as in db_outcome_get_by_id()
+    cursor.execute("""
+        DELETE FROM OUTCOME
+        WHERE rowid NOT IN (SELECT MIN(rowid) FROM OUTCOME GROUP BY EventId)
+    """)
+    cursor.execute("DROP INDEX IF EXISTS OutcEventId")
+    cursor.execute("CREATE UNIQUE INDEX OutcEventIdUnique ON OUTCOME(EventId)")
+
+    # Commit changes and close connection
+    conn.commit()
+    cursor.close()
+
+
+# v3: pending-outcome flag on EVENT, set when the outcome is inserted.
+# The partial index holds only the events without outcome, the queries for them do not grow with the history.
+def db_update_2_3(conn: sqlite3.Connection):
+    cursor = conn.cursor()
+
+    cursor.execute("UPDATE VERSION SET Version = 3")
+
+    cursor.execute("ALTER TABLE EVENT ADD COLUMN HasOutcome INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("UPDATE EVENT SET HasOutcome = 1 WHERE EventId IN (SELECT EventId FROM OUTCOME)")
+    # HasOutcome is included to make it a covering index for the pending queries
+    cursor.execute("CREATE INDEX EvPendingTime ON EVENT(Time, EventId, HasOutcome) WHERE HasOutcome = 0")
+
+    # Commit changes and close connection
+    conn.commit()
+    cursor.close()
+
+
+# v4: settings table, with the key format (hex by default)
+def db_update_3_4(conn: sqlite3.Connection):
+    cursor = conn.cursor()
+
+    cursor.execute("UPDATE VERSION SET Version = 4")
+
+    cursor.execute("""
+        CREATE TABLE SETTING (
+            Name VARCHAR(100) PRIMARY KEY,
+            Value VARCHAR(100)
+        )
+    """)
+    cursor.execute("INSERT INTO SETTING (Name, Value) VALUES ('KeyFormat', ?)", (DB_KEY_FORMAT_HEX,))
+
+    # Commit changes and close connection
+    conn.commit()
+    cursor.close()
+
+
+def db_setting_get(cursor: sqlite3.Cursor, name: str, default: str) -> str:
+    cursor.execute("SELECT Value FROM SETTING WHERE Name == ?", (name,))
+    rows = cursor.fetchall()
+    if len(rows) < 1 or rows[0][0] is None:
+        return default
+    return rows[0][0]
+
+
+def db_setting_set(cursor: sqlite3.Cursor, name: str, value: str):
+    cursor.execute("INSERT INTO SETTING (Name, Value) VALUES (?, ?) ON CONFLICT (Name) DO UPDATE SET Value = excluded.Value", (name, value))
+
+
+def db_get_key_format(cursor: sqlite3.Cursor) -> str:
+    return db_setting_get(cursor, "KeyFormat", DB_KEY_FORMAT_HEX)
+
+
+# Convert the stored nonces, signatures and public keys to the given format, in one transaction.
+# Values already in the format are left as they are. Returns the number of updated rows.
+# Space is freed only by a VACUUM afterwards.
+def db_convert_key_format(conn: sqlite3.Connection, key_format: str) -> int:
+    if key_format not in [DB_KEY_FORMAT_HEX, DB_KEY_FORMAT_BLOB]:
+        raise Exception(f"Invalid key format '{key_format}'")
+    # The key format is a setting, from v4
+    version = db_get_version(conn)
+    if version < LATEST_DB_VERSION:
+        raise Exception(f"DB version v{version} is older than v{LATEST_DB_VERSION}, update it first with __setup_db.py")
+    blob = key_format == DB_KEY_FORMAT_BLOB
+    conn.create_function("db_key_conv", 1, lambda v: _db_key_in(v, True) if blob else _db_key_out(v), deterministic=True)
+    # Only the rows with a value in the other storage type
+    from_type = "text" if blob else "blob"
+    cursor = conn.cursor()
+    cnt = 0
+    try:
+        for table, columns in [("PUBKEY", ["Pubkey"]), ("NONCE", ["NoncePub", "NonceSec"]), ("DIGITOUTCOME", ["Nonce", "Signature"])]:
+            sets = ", ".join(map(lambda c: f"{c} = db_key_conv({c})", columns))
+            where = " OR ".join(map(lambda c: f"typeof({c}) == '{from_type}'", columns))
+            cursor.execute(f"UPDATE {table} SET {sets} WHERE {where}")
+            cnt += cursor.rowcount
+        db_setting_set(cursor, "KeyFormat", key_format)
+        conn.commit()
+    except Exception as ex:
+        conn.rollback()
+        raise ex
+    finally:
+        cursor.close()
+    return cnt
+
+
 def db_delete_all_contents(conn: sqlite3.Connection):
     cursor = conn.cursor()
     cursor.execute("DELETE FROM NONCE")
@@ -172,6 +397,15 @@ def db_eventclass_insert_if_missing(cursor: sqlite3.Cursor, ec: EventClassDto) -
     raise Exception(f"ERROR Could not insert event class {ec.id} {ec.definition}")
 
 
+# Split a list of IDs into chunks, and return each chunk with its "?, ?, ..." placeholder string
+def _db_in_chunks(ids: list[str]) -> list[tuple[list[str], str]]:
+    ret = []
+    for i in range(0, len(ids), DB_IN_CHUNK_SIZE):
+        chunk = ids[i:i + DB_IN_CHUNK_SIZE]
+        ret.append((chunk, ", ".join(["?"] * len(chunk))))
+    return ret
+
+
 def _db_count_from_table(cursor: sqlite3.Cursor, table: str) -> int:
     cursor.execute(f"SELECT COUNT(*) FROM {table}")
     rows = cursor.fetchall()
@@ -194,12 +428,15 @@ def _db_eventclass_from_row(r) -> EventClassDto | None:
         int(r[6]), int(r[7]), int(r[8]), int(r[9]), r[10]
     )
 
+
+# In insertion order, the event resolver depends on it (ownership of overlapping events, listing order)
 def db_eventclass_get_all(cursor: sqlite3.Cursor) -> list[EventClassDto]:
     cursor.execute("""
         SELECT
             Id, CreateTime, Definition, RangeDigits, RangeDigitsLowPos, StringTemplate,
             RepeatFirstTime, RepeatPeriod, RepeatOffset, RepeatLastTime, SignerPublicKey
         FROM EVENTCLASS
+        ORDER BY rowid ASC
     """)
     ret = []
     rows = cursor.fetchall()
@@ -224,6 +461,25 @@ def db_eventclass_get_by_id(cursor: sqlite3.Cursor, id: str) -> EventClassDto |
     return _db_eventclass_from_row(rows[0])
 
 
+# Get several event classes at once, result is keyed by ID
+def db_eventclass_get_by_ids(cursor: sqlite3.Cursor, ids: list[str]) -> dict[str, EventClassDto]:
+    ret = {}
+    for chunk, placeholders in _db_in_chunks(ids):
+        cursor.execute(f"""
+            SELECT
+                Id, CreateTime, Definition, RangeDigits, RangeDigitsLowPos, StringTemplate,
+                RepeatFirstTime, RepeatPeriod, RepeatOffset, RepeatLastTime, SignerPublicKey
+            FROM EVENTCLASS
+            WHERE Id IN ({placeholders})
+        """, chunk)
+        rows = cursor.fetchall()
+        for r in rows:
+            ec = _db_eventclass_from_row(r)
+            if ec is not None:
+                ret[ec.id] = ec
+    return ret
+
+
 def db_eventclass_latest_by_def(cursor: sqlite3.Cursor, defi: str) -> EventClassDto | None:
     cursor.execute("""
         SELECT
@@ -258,15 +514,16 @@ def db_eventclass_all_by_def(cursor: sqlite3.Cursor, defi: str) -> list[EventCla
 
 
 # Insert if missing. Returns the pubkey id
-def db_pubkey_insert_if_missing(cursor: sqlite3.Cursor, pubkey: str) -> int:
-    cursor.execute("SELECT Id FROM PUBKEY WHERE Pubkey == ? LIMIT 1", (pubkey,))
+def db_pubkey_insert_if_missing(cursor: sqlite3.Cursor, pubkey: str, blob: bool = False) -> int:
+    pubkey_stored = _db_key_in(pubkey, blob)
+    cursor.execute("SELECT Id FROM PUBKEY WHERE Pubkey == ? LIMIT 1", (pubkey_stored,))
     rows = cursor.fetchall()
     if len(rows) >= 1:
         if len(rows[0]) >= 1:
             if rows[0][0] is not None:
                 return rows[0][0]
     # Not found, insert
-    cursor.execute("INSERT INTO PUBKEY (Pubkey) Values (?) RETURNING Id", (pubkey,))
+    cursor.execute("INSERT INTO PUBKEY (Pubkey) Values (?) RETURNING Id", (pubkey_stored,))
     rows = cursor.fetchall()
     if len(rows) >= 1:
         if len(rows[0]) >= 1:
@@ -275,17 +532,28 @@ def db_pubkey_insert_if_missing(cursor: sqlite3.Cursor, pubkey: str) -> int:
     raise Exception(f"ERROR Could not insert public key {pubkey}")
 
 
+# All public keys, as (ID, pubkey)
+def db_pubkey_get_all(cursor: sqlite3.Cursor) -> list[tuple[int, str]]:
+    cursor.execute("SELECT Id, Pubkey FROM PUBKEY")
+    rows = cursor.fetchall()
+    ret = []
+    for r in rows:
+        if len(r) >= 2:
+            ret.append((int(r[0]), _db_key_out(r[1])))
+    return ret
+
+
 def db_pubkey_count(cursor: sqlite3.Cursor) -> int:
     return _db_count_from_table(cursor, "PUBKEY")
 
 
-def db_nonce_insert_one(cursor: sqlite3.Cursor, nonce: Nonce):
+def db_nonce_insert_one(cursor: sqlite3.Cursor, nonce: Nonce, blob: bool = False):
     cursor.execute("""
         INSERT INTO NONCE 
             (EventId, DigitIndex, NoncePub, NonceSec)
             VALUES (?, ?, ?, ?)
             RETURNING EventId
-    """, (nonce.event_id, nonce.digit_index, nonce.nonce_pub, nonce.nonce_sec))
+    """, (nonce.event_id, nonce.digit_index, _db_key_in(nonce.nonce_pub, blob), _db_key_in(nonce.nonce_sec, blob)))
     rows = cursor.fetchall()
     if len(rows) >= 1:
         if len(rows[0]) >= 1:
@@ -296,6 +564,19 @@ def db_nonce_insert_one(cursor: sqlite3.Cursor, nonce: Nonce):
     raise Exception(f"Failed to insert Nonce, '{nonce.event_id}'!")
 
 
+# Insert many nonces with one statement, verify the row count
+def db_nonce_insert_many(cursor: sqlite3.Cursor, nonces: list[Nonce], blob: bool = False):
+    if len(nonces) == 0:
+        return
+    cursor.executemany("""
+        INSERT INTO NONCE
+            (EventId, DigitIndex, NoncePub, NonceSec)
+            VALUES (?, ?, ?, ?)
+    """, map(lambda n: (n.event_id, n.digit_index, _db_key_in(n.nonce_pub, blob), _db_key_in(n.nonce_sec, blob)), nonces))
+    if cursor.rowcount != len(nonces):
+        raise Exception(f"Failed to insert Nonces, {cursor.rowcount} vs. {len(nonces)}, '{nonces[0].event_id}'!")
+
+
 def db_nonce_get_all_by_id(cursor: sqlite3.Cursor, event_id: str) -> list[Nonce]:
     cursor.execute("""
         SELECT EventId, DigitIndex, NoncePub, NonceSec
@@ -307,31 +588,44 @@ def db_nonce_get_all_by_id(cursor: sqlite3.Cursor, event_id: str) -> list[Nonce]
     rows = cursor.fetchall()
     for r in rows:
         if len(r) >= 4:
-            n = Nonce(r[0], int(r[1]), r[2], r[3])
+            n = Nonce(r[0], int(r[1]), _db_key_out(r[2]), _db_key_out(r[3]))
             ret.append(n)
     return ret
 
 
+# Get nonces of several events at once, result is keyed by event ID (events with no nonces are missing)
+def db_nonce_get_all_by_ids(cursor: sqlite3.Cursor, event_ids: list[str]) -> dict[str, list[Nonce]]:
+    ret = {}
+    for chunk, placeholders in _db_in_chunks(event_ids):
+        cursor.execute(f"""
+            SELECT EventId, DigitIndex, NoncePub, NonceSec
+            FROM NONCE
+            WHERE EventId IN ({placeholders})
+            ORDER BY EventId ASC, DigitIndex ASC
+        """, chunk)
+        rows = cursor.fetchall()
+        for r in rows:
+            if len(r) >= 4:
+                n = Nonce(r[0], int(r[1]), _db_key_out(r[2]), _db_key_out(r[3]))
+                ret.setdefault(n.event_id, []).append(n)
+    return ret
+
+
 def db_nonce_count(cursor: sqlite3.Cursor) -> int:
     return _db_count_from_table(cursor, "NONCE")
 
 
-def db_digitoutcome_insert_list(cursor: sqlite3.Cursor, event_id: str, digit_outcome_list: list[DigitOutcome]):
-    for do in digit_outcome_list:
-        cursor.execute("""
-            INSERT INTO DIGITOUTCOME
-                (EventId, Idx, Value, Nonce, Signature, MsgStr)
-                VALUES (?, ?, ?, ?, ?, ?)
-                RETURNING EventId
-        """, (event_id, do.index, int(do.value), do.nonce, do.signature, do.msg_str))
-        rows = cursor.fetchall()
-        if len(rows) >= 1:
-            if len(rows[0]) >= 1:
-                if rows[0][0] is not None:
-                    if rows[0][0] == event_id:
-                        # OK
-                        continue
-        raise Exception(f"Failed to insert digit outcome, '{event_id}'!")
+# Insert the digit outcomes of an event with one statement, verify the row count
+def db_digitoutcome_insert_list(cursor: sqlite3.Cursor, event_id: str, digit_outcome_list: list[DigitOutcome], blob: bool = False):
+    if len(digit_outcome_list) == 0:
+        return
+    cursor.executemany("""
+        INSERT INTO DIGITOUTCOME
+            (EventId, Idx, Value, Nonce, Signature, MsgStr)
+            VALUES (?, ?, ?, ?, ?, ?)
+    """, map(lambda do: (event_id, do.index, int(do.value), _db_key_in(do.nonce, blob), _db_key_in(do.signature, blob), do.msg_str), digit_outcome_list))
+    if cursor.rowcount != len(digit_outcome_list):
+        raise Exception(f"Failed to insert digit outcomes, {cursor.rowcount} vs. {len(digit_outcome_list)}, '{event_id}'!")
 
 
 def db_digitoutcome_get_all_by_id(cursor: sqlite3.Cursor, event_id: str) -> list[DigitOutcome]:
@@ -345,11 +639,29 @@ def db_digitoutcome_get_all_by_id(cursor: sqlite3.Cursor, event_id: str) -> list
     rows = cursor.fetchall()
     for r in rows:
         if len(r) >= 6:
-            do = DigitOutcome(r[0], int(r[1]), int(r[2]), r[3], r[4], r[5])
+            do = DigitOutcome(r[0], int(r[1]), int(r[2]), _db_key_out(r[3]), _db_key_out(r[4]), r[5])
             ret.append(do)
     return ret
 
 
+# Get digit outcomes of several events at once, result is keyed by event ID
+def db_digitoutcome_get_all_by_ids(cursor: sqlite3.Cursor, event_ids: list[str]) -> dict[str, list[DigitOutcome]]:
+    ret = {}
+    for chunk, placeholders in _db_in_chunks(event_ids):
+        cursor.execute(f"""
+            SELECT EventId, Idx, Value, Nonce, Signature, MsgStr
+            FROM DIGITOUTCOME
+            WHERE EventId IN ({placeholders})
+            ORDER BY EventId ASC, Idx ASC
+        """, chunk)
+        rows = cursor.fetchall()
+        for r in rows:
+            if len(r) >= 6:
+                do = DigitOutcome(r[0], int(r[1]), int(r[2]), _db_key_out(r[3]), _db_key_out(r[4]), r[5])
+                ret.setdefault(do.event_id, []).append(do)
+    return ret
+
+
 def db_digitoutcome_count(cursor: sqlite3.Cursor) -> int:
     return _db_count_from_table(cursor, "DIGITOUTCOME")
 
@@ -367,10 +679,24 @@ def db_outcome_insert(cursor: sqlite3.Cursor, o: OutcomeDto):
             if rows[0][0] is not None:
                 if rows[0][0] == o.event_id:
                     # OK
+                    db_event_set_has_outcome_many(cursor, [o.event_id])
                     return
     raise Exception(f"Failed to insert Nonce, '{o.event_id}'!")
 
 
+def db_outcome_insert_many(cursor: sqlite3.Cursor, outcomes: list[OutcomeDto]):
+    if len(outcomes) == 0:
+        return
+    cursor.executemany("""
+        INSERT INTO OUTCOME
+            (EventId, Value, CreatedTime)
+            VALUES (?, ?, ?)
+    """, map(lambda o: (o.event_id, o.value, o.created_time), outcomes))
+    if cursor.rowcount != len(outcomes):
+        raise Exception(f"Failed to insert outcomes, {cursor.rowcount} vs. {len(outcomes)}")
+    db_event_set_has_outcome_many(cursor, list(map(lambda o: o.event_id, outcomes)))
+
+
 def db_outcome_get_by_id(cursor: sqlite3.Cursor, event_id: str) -> OutcomeDto | None:
     cursor.execute("""
         SELECT EventId, Value, CreatedTime
@@ -387,6 +713,23 @@ def db_outcome_get_by_id(cursor: sqlite3.Cursor, event_id: str) -> OutcomeDto |
     return None
 
 
+# Get outcomes of several events at once, result is keyed by event ID (events with no outcome are missing)
+def db_outcome_get_by_ids(cursor: sqlite3.Cursor, event_ids: list[str]) -> dict[str, OutcomeDto]:
+    ret = {}
+    for chunk, placeholders in _db_in_chunks(event_ids):
+        cursor.execute(f"""
+            SELECT EventId, Value, CreatedTime
+            FROM OUTCOME
+            WHERE EventId IN ({placeholders})
+        """, chunk)
+        rows = cursor.fetchall()
+        for r in rows:
+            # In case of multiple, keep the first, as in db_outcome_get_by_id()
+            if len(r) >= 3 and r[0] not in ret:
+                ret[r[0]] = OutcomeDto(r[0], r[1], int(r[2]))
+    return ret
+
+
 def db_outcome_exists(cursor: sqlite3.Cursor, event_id: str) -> bool:
     cursor.execute("SELECT COUNT(*) FROM OUTCOME WHERE EventId == ?", (event_id,))
     rows = cursor.fetchall()
@@ -434,6 +777,22 @@ def db_event_insert_if_missing(cursor: sqlite3.Cursor, e: EventDto) -> int:
     raise Exception(f"ERROR Could not insert event {e.event_id} {e.class_id}")
 
 
+# Insert many events with one statement, existing ones (by ID) are skipped. Returns the number of inserted events
+def db_event_insert_many_if_missing(cursor: sqlite3.Cursor, events: list[EventDto]) -> int:
+    if len(events) == 0:
+        return 0
+    cursor.executemany("""
+        INSERT INTO EVENT
+            (EventId, ClassId, Definition, Time, StringTemplate, PublicKeyId)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (EventId) DO NOTHING
+    """, map(lambda e: (e.event_id, e.class_id, e.definition, e.time, e.string_template, e.signer_public_key_id), events))
+    inserted = cursor.rowcount
+    if inserted < 0 or inserted > len(events):
+        raise Exception(f"ERROR Could not insert events, {inserted} vs. {len(events)}, {events[0].event_id}")
+    return inserted
+
+
 def db_event_count(cursor: sqlite3.Cursor) -> int:
     return _db_count_from_table(cursor, "EVENT")
 
@@ -442,7 +801,7 @@ def _db_event_from_row(r) -> tuple[EventDto, str] | None:
     if len(r) < 7:
         return None
     e = EventDto(r[0], r[1], r[2], int(r[3]), r[4], int(r[6]))
-    return [e, r[5]]
+    return [e, _db_key_out(r[5])]
 
 
 def db_event_get_by_id(cursor: sqlite3.Cursor, event_id: str) -> tuple[EventDto, str] | None:
@@ -459,14 +818,37 @@ def db_event_get_by_id(cursor: sqlite3.Cursor, event_id: str) -> tuple[EventDto,
     return _db_event_from_row(rows[0])
 
 
+# Get several events at once (with signer pubkey), result is keyed by event ID
+def db_event_get_by_ids(cursor: sqlite3.Cursor, event_ids: list[str]) -> dict[str, tuple[EventDto, str]]:
+    ret = {}
+    for chunk, placeholders in _db_in_chunks(event_ids):
+        cursor.execute(f"""
+            SELECT
+                EVENT.EventId, EVENT.ClassId, EVENT.Definition, EVENT.Time, EVENT.StringTemplate, PUBKEY.Pubkey, PUBKEY.Id
+            FROM EVENT
+            LEFT OUTER JOIN PUBKEY ON PUBKEY.Id == EVENT.PublicKeyId
+            WHERE EVENT.EventId IN ({placeholders})
+        """, chunk)
+        rows = cursor.fetchall()
+        for r in rows:
+            res = _db_event_from_row(r)
+            if res is not None:
+                ret[res[0].event_id] = res
+    return ret
+
+
+# Remove events from the pending ones (see EvPendingTime), called when their outcome is inserted
+def db_event_set_has_outcome_many(cursor: sqlite3.Cursor, event_ids: list[str]):
+    cursor.executemany("UPDATE EVENT SET HasOutcome = 1 WHERE EventId == ?", map(lambda eid: (eid,), event_ids))
+
+
+# The queries of events without outcome use the partial index EvPendingTime, they are O(pending)
 def db_event_get_earliest_time_without_outcome(cursor: sqlite3.Cursor, after_time: int) -> int:
     cursor.execute("""
-        SELECT MIN(EVENT.Time)
+        SELECT MIN(Time)
         FROM EVENT
-        LEFT OUTER JOIN OUTCOME ON EVENT.EventId == OUTCOME.EventId
-        WHERE OUTCOME.EventId IS NULL
-        AND EVENT.Time >= ?
-        ORDER BY EVENT.Time ASC
+        WHERE HasOutcome = 0
+        AND Time >= ?
     """, (after_time,))
     rows = cursor.fetchall()
     # print(rows)
@@ -481,12 +863,11 @@ def db_event_get_earliest_time_without_outcome(cursor: sqlite3.Cursor, after_tim
 
 def db_event_get_past_no_outcome(cursor: sqlite3.Cursor, cutoff_time: int) -> list[str]:
     cursor.execute("""
-        SELECT EVENT.EventId
+        SELECT EventId
         FROM EVENT
-        LEFT OUTER JOIN OUTCOME ON EVENT.EventId == OUTCOME.EventId
-        WHERE Time <= ?
-        AND OUTCOME.EventId IS NULL
-        ORDER BY EVENT.Time ASC
+        WHERE HasOutcome = 0
+        AND Time <= ?
+        ORDER BY Time ASC
     """, (cutoff_time,))
     rows = cursor.fetchall()
     ret = []
@@ -496,6 +877,29 @@ def db_event_get_past_no_outcome(cursor: sqlite3.Cursor, cutoff_time: int) -> li
     return ret
 
 
+# Events without outcome with time at or after from_time, as (event ID, time), in time order
+def db_event_get_no_outcome_since(cursor: sqlite3.Cursor, from_time: int) -> list[tuple[str, int]]:
+    cursor.execute("""
+        SELECT EventId, Time
+        FROM EVENT
+        WHERE HasOutcome = 0
+        AND Time >= ?
+        ORDER BY Time ASC
+    """, (from_time,))
+    rows = cursor.fetchall()
+    ret = []
+    for r in rows:
+        if len(r) >= 2:
+            ret.append((r[0], int(r[1])))
+    return ret
+
+
+# Times of all events, in increasing order
+def db_event_get_all_times(cursor: sqlite3.Cursor) -> list[int]:
+    cursor.execute("SELECT Time FROM EVENT ORDER BY Time ASC")
+    return list(map(lambda r: int(r[0]), cursor.fetchall()))
+
+
 def db_event_count_future(cursor: sqlite3.Cursor, cutoff_time: int) -> int:
     cursor.execute("""
         SELECT COUNT(*)
@@ -603,226 +1007,411 @@ class EventStorageDb:
     def __init__(self, data_dir: str = "."):
         self.db_file_name = "ora.db"
         self.data_dir = data_dir
-        # Cache connections, per each thread
-        self._conn_ro = {}
-        self._conn_rw = {}
-        self._cursor_ro = {}
+        # Connection settings, from dotenv
+        self.journal_mode = _db_pragma_choice("DB_JOURNAL_MODE", DB_JOURNAL_MODE_DEFAULT, ["WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY"])
+        self.synchronous = _db_pragma_choice("DB_SYNCHRONOUS", DB_SYNCHRONOUS_DEFAULT, ["OFF", "NORMAL", "FULL", "EXTRA"])
+        self.cache_size = int(os.getenv("DB_CACHE_SIZE", DB_CACHE_SIZE_DEFAULT))
+        self.mmap_size = int(os.getenv("DB_MMAP_SIZE", DB_MMAP_SIZE_DEFAULT))
+        # Connection pools, shared by all threads
+        pool_idle_seconds = float(os.getenv("DB_POOL_IDLE_SECONDS", DB_POOL_IDLE_SECONDS_DEFAULT))
+        self._pool_ro = ConnectionPool("ro", self._open_ro, int(os.getenv("DB_POOL_MAX_RO", DB_POOL_MAX_RO_DEFAULT)), pool_idle_seconds)
+        self._pool_rw = ConnectionPool("rw", self._open_rw, int(os.getenv("DB_POOL_MAX_RW", DB_POOL_MAX_RW_DEFAULT)), pool_idle_seconds)
+        # Callbacks notified when the outcome of an event changes (with event ID, or None for all)
+        self._outcome_listeners = []
+        # In-memory event classes and public keys
+        self._registry = Registry(self._load_event_classes, self._load_pubkeys)
+        # In-memory row counts, and event times for the future count
+        self._counters = StorageCounters(self._load_counts, self._load_event_times)
+        # If set, print_stats also recounts the rows, and verifies the counters (slow)
+        self.stats_recount = os.getenv("DB_STATS_RECOUNT", "0") == "1"
         dbfile = get_db_file(self.db_file_name, self.data_dir, create_mode=False)
         print_current_db_version(dbfile)
+        # The queries are for the latest schema, an older DB has to be updated first
+        with self._conn_rw() as conn:
+            version = db_get_version(conn)
+        if version < LATEST_DB_VERSION:
+            self.close()
+            raise Exception(f"DB version v{version} is older than v{LATEST_DB_VERSION}, update it first with __setup_db.py, {dbfile}")
+        # Journal mode is persistent in the DB file, set it once
+        with self._conn_rw() as conn:
+            conn.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        # Keys are written in the format of the DB (read in any format)
+        self.key_format = self._load_key_format()
+        self._key_blob = self.key_format == DB_KEY_FORMAT_BLOB
+        print(f"DB key format: {self.key_format}")
+
+    def add_outcome_listener(self, listener):
+        self._outcome_listeners.append(listener)
+
+    def _notify_outcome_listeners(self, event_id: str | None):
+        for listener in self._outcome_listeners:
+            listener(event_id)
+
+    # Set the per-connection pragmas
+    def _apply_pragmas(self, conn: sqlite3.Connection):
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA cache_size = {self.cache_size}")
+        conn.execute(f"PRAGMA mmap_size = {self.mmap_size}")
 
     def _open_ro(self) -> sqlite3.Connection:
         dbfile = get_db_file(self.db_file_name, self.data_dir, create_mode=False)
         dbfile_ro = "file:" + dbfile + "?mode=ro"
-        conn = sqlite3.connect(dbfile_ro, uri=True)
+        # Connections are pooled, and may be used by different threads (one at a time)
+        conn = sqlite3.connect(dbfile_ro, uri=True, check_same_thread=False)
+        self._apply_pragmas(conn)
         print("DB opened ro")
         return conn
 
     def _open_rw(self) -> sqlite3.Connection:
         dbfile = get_db_file(self.db_file_name, self.data_dir, create_mode=False)
-        conn = sqlite3.connect(dbfile)
+        conn = sqlite3.connect(dbfile, check_same_thread=False)
         # Explicitely enable Foreign Key support on all RW connections!
         cursor = conn.cursor()
         cursor.execute("PRAGMA foreign_keys = TRUE")
         cursor.close()
+        self._apply_pragmas(conn)
         print("DB opened rw")
         return conn
 
-    def _getconn_ro(self):
-        thid =  threading.current_thread().ident
-        if thid in self._conn_ro:
-            return self._conn_ro[thid]
-        conn = self._open_ro()
-        self._conn_ro[thid] = conn
-        return conn
-
+    # Check out a RO cursor from the pool, for the duration of the with block
+    @contextmanager
+    def _cursor_ro(self):
+        with self._pool_ro.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    # Check out a RW connection from the pool, for the duration of the with block.
     # Take care of commit() as needed
-    def _getconn_rw(self):
-        thid =  threading.current_thread().ident
-        if thid in self._conn_rw:
-            return self._conn_rw[thid]
-        conn = self._open_rw()
-        self._conn_rw[thid] = conn
-        return conn
-
-    # Get cached RO cursor
-    def _getcursor_ro(self):
-        thid =  threading.current_thread().ident
-        if thid in self._cursor_ro:
-            return self._cursor_ro[thid]
-        conn = self._getconn_ro()
-        cursor = conn.cursor()
-        self._cursor_ro[thid] = cursor
-        return cursor
+    def _conn_rw(self):
+        return self._pool_rw.connection()
 
     def close(self):
         print("Closing DB ...")
-        # TODO close all
-        for _t, cur in self._cursor_ro.items():
-            if cur is not None:
-                cur.close()
-        self._cursor_ro = {}
-        for _t, c in self._conn_ro.items():
-            if c is not None:
-                c.close()
-        self._conn_ro = {}
-        for _t, c in self._conn_rw.items():
-            if c is not None:
-                c.close()
-        self._conn_rw = {}
+        self._pool_ro.close()
+        self._pool_rw.close()
         print("DB closed")
 
     def delete_all_contents(self):
         print(f"WARNING: DB: deleting all contents!")
-        db_delete_all_contents(self._getconn_rw())
+        with self._conn_rw() as conn:
+            db_delete_all_contents(conn)
+        self._registry.invalidate_all()
+        self._counters.reset()
+        self._notify_outcome_listeners(None)
+
+    def _load_event_classes(self) -> list[EventClassDto]:
+        with self._cursor_ro() as cursor:
+            return db_eventclass_get_all(cursor)
+
+    def _load_pubkeys(self) -> list[tuple[int, str]]:
+        with self._cursor_ro() as cursor:
+            return db_pubkey_get_all(cursor)
+
+    def _load_key_format(self) -> str:
+        with self._cursor_ro() as cursor:
+            return db_get_key_format(cursor)
+
+    # Full row counts, by counter name
+    def _load_counts(self) -> dict[str, int]:
+        with self._cursor_ro() as cursor:
+            return {
+                "evcl": db_eventclass_count(cursor),
+                "pkey": db_pubkey_count(cursor),
+                "nonce": db_nonce_count(cursor),
+                "ev": db_event_count(cursor),
+                "diou": db_digitoutcome_count(cursor),
+                "outcome": db_outcome_count(cursor),
+            }
+
+    def _load_event_times(self) -> list[int]:
+        with self._cursor_ro() as cursor:
+            return db_event_get_all_times(cursor)
+
+    def get_counters_stats(self) -> dict:
+        return self._counters.get_stats()
+
+    # Recount the rows and compare with the counters. Returns the mismatches (name -> (counter, recount)).
+    # On mismatch the counters are reloaded.
+    def verify_counters(self) -> dict[str, tuple[int, int]]:
+        with self._counters.updating():
+            counts = self._counters.get_counts()
+            recounts = self._load_counts()
+            mismatches = {}
+            for name, c in counts.items():
+                if recounts[name] != c:
+                    mismatches[name] = (c, recounts[name])
+            now = math.floor(datetime.now(UTC).timestamp())
+            with self._cursor_ro() as cursor:
+                future_recount = db_event_count_future(cursor, now)
+            future_count = self._counters.count_events_after(now)
+            if future_recount != future_count:
+                mismatches["future"] = (future_count, future_recount)
+            if len(mismatches) > 0:
+                self._counters.reset()
+        return mismatches
+
+    def get_registry_stats(self) -> dict:
+        return self._registry.get_stats()
+
+    # ID of a public key, inserted if missing (within the transaction of the cursor, the caller commits).
+    # Returns the ID, and whether it was inserted
+    def _pubkey_id_insert_if_missing(self, cursor: sqlite3.Cursor, pubkey: str) -> tuple[int, bool]:
+        pubkey_id = self._registry.pubkey_id(pubkey)
+        if pubkey_id is not None:
+            return (pubkey_id, False)
+        return (db_pubkey_insert_if_missing(cursor, pubkey, self._key_blob), True)
+
+    def get_pool_stats(self) -> dict:
+        return {
+            "ro": self._pool_ro.get_stats(),
+            "rw": self._pool_rw.get_stats(),
+        }
 
     def print_stats(self):
-        cursor = self._getcursor_ro()
-        c_evcl = db_eventclass_count(cursor)
-        c_pkey = db_pubkey_count(cursor)
-        c_ev = db_event_count(cursor)
-        c_nonce = db_nonce_count(cursor)
-        c_diou = db_digitoutcome_count(cursor)
-        c_outcome = db_outcome_count(cursor)
-        print(f"DB stats: evcl: {c_evcl}  pkey: {c_pkey}  nonce: {c_nonce}  ev: {c_ev}  diou: {c_diou}  outcome: {c_outcome}")
+        c = self._counters.get_counts()
+        print(f"DB stats: evcl: {c['evcl']}  pkey: {c['pkey']}  nonce: {c['nonce']}  ev: {c['ev']}  diou: {c['diou']}  outcome: {c['outcome']}")
+        if self.stats_recount:
+            mismatches = self.verify_counters()
+            if len(mismatches) > 0:
+                print(f"WARNING: DB counters differ from the recount, reloaded: {mismatches}")
+        for name, ps in self.get_pool_stats().items():
+            print(f"DB pool {name}: open: {ps['open']}  idle: {ps['idle']}  in use: {ps['in_use']}  max: {ps['max_size']}  checkouts: {ps['checkouts']}  waits: {ps['waits']}  opened: {ps['opened']}  reaped: {ps['reaped']}")
 
     def event_classes_insert_if_missing(self, ec: EventClassDto) -> int:
-        conn = self._getconn_rw()
-        cursor = conn.cursor()
-        ret = db_eventclass_insert_if_missing(cursor, ec)
-        conn.commit()
-        cursor.close()
+        with self._conn_rw() as conn:
+            cursor = conn.cursor()
+            ret = db_eventclass_insert_if_missing(cursor, ec)
+            with self._counters.updating():
+                conn.commit()
+                self._counters.add("evcl", ret)
+            cursor.close()
+        if ret > 0:
+            self._registry.invalidate_event_classes()
         return ret
 
+    # Event class reads are served from the registry
+
     def event_classes_len(self) -> int:
-        cursor = self._getcursor_ro()
-        cnt = db_eventclass_count(cursor)
-        return cnt
+        return self._registry.event_classes_len()
 
     def event_classes_get_all(self) -> list[EventClassDto]:
-        cursor = self._getcursor_ro()
-        ret = db_eventclass_get_all(cursor)
-        return ret
+        return self._registry.event_classes_get_all()
 
     # By (internal) ID, should be unique
     def event_classes_get_by_id(self, id: str) -> EventClassDto:
-        cursor = self._getcursor_ro()
-        return db_eventclass_get_by_id(cursor, id)
+        return self._registry.event_classes_get_by_id(id)
+
+    # By (internal) IDs, keyed by ID
+    def event_classes_get_by_ids(self, ids: list[str]) -> dict[str, EventClassDto]:
+        return self._registry.event_classes_get_by_ids(ids)
 
     # By definition. In case there are multiple, return latest (with highest create_time)
     def event_classes_get_latest_by_def(self, definition: str) -> EventClassDto:
-        cursor = self._getcursor_ro()
-        return db_eventclass_latest_by_def(cursor, definition)
+        return self._registry.event_classes_get_latest_by_def(definition)
 
-    # By definition. In case there are multiple, return all
+    # By definition. In case there are multiple, return all, by create_time
     def event_classes_get_all_by_def(self, definition: str) -> list[EventClassDto]:
-        cursor = self._getcursor_ro()
-        return db_eventclass_all_by_def(cursor, definition)
+        return self._registry.event_classes_get_all_by_def(definition)
 
     # Also commits
     def nonces_insert_one(self, nonce: Nonce):
-        conn = self._getconn_rw()
-        cursor = conn.cursor()
-        db_nonce_insert_one(cursor, nonce)
-        conn.commit()
-        cursor.close()
-
+        with self._conn_rw() as conn:
+            cursor = conn.cursor()
+            db_nonce_insert_one(cursor, nonce, self._key_blob)
+            with self._counters.updating():
+                conn.commit()
+                self._counters.add("nonce", 1)
+            cursor.close()
+
+    # Bulk insert, committed in chunks
     def nonces_insert(self, nonces: list[Nonce]):
-        conn = self._getconn_rw()
-        cursor = conn.cursor()
-        for n in nonces:
-            db_nonce_insert_one(cursor, n)
-        conn.commit()
-        cursor.close()
+        with self._conn_rw() as conn:
+            cursor = conn.cursor()
+            try:
+                for i in range(0, len(nonces), DB_WRITE_CHUNK_SIZE):
+                    chunk = nonces[i:i + DB_WRITE_CHUNK_SIZE]
+                    db_nonce_insert_many(cursor, chunk, self._key_blob)
+                    with self._counters.updating():
+                        conn.commit()
+                        self._counters.add("nonce", len(chunk))
+            except Exception as ex:
+                # Drop the partial chunk
+                conn.rollback()
+                raise ex
+            finally:
+                cursor.close()
 
     def nonces_get(self, event_id: str) -> list[Nonce]:
-        cursor = self._getcursor_ro()
-        return db_nonce_get_all_by_id(cursor, event_id)
+        with self._cursor_ro() as cursor:
+            return db_nonce_get_all_by_id(cursor, event_id)
+
+    # Nonces of several events, keyed by event ID
+    def nonces_get_by_ids(self, event_ids: list[str]) -> dict[str, list[Nonce]]:
+        with self._cursor_ro() as cursor:
+            return db_nonce_get_all_by_ids(cursor, event_ids)
 
     # Insert an event. It also inserts the public key if needed
     def events_insert_if_missing(self, e: EventDto, signer_public_key: str) -> int:
-        conn = self._getconn_rw()
-        cursor = conn.cursor()
-        pubkey_id = db_pubkey_insert_if_missing(cursor, signer_public_key)
-        e.signer_public_key_id = pubkey_id
-        ret = db_event_insert_if_missing(cursor, e)
-        conn.commit()
-        cursor.close()
+        with self._conn_rw() as conn:
+            cursor = conn.cursor()
+            pubkey_id, pubkey_inserted = self._pubkey_id_insert_if_missing(cursor, signer_public_key)
+            e.signer_public_key_id = pubkey_id
+            ret = db_event_insert_if_missing(cursor, e)
+            with self._counters.updating():
+                conn.commit()
+                self._counters.add("pkey", 1 if pubkey_inserted else 0)
+                self._counters.add_events(ret, [e.time])
+            cursor.close()
+        if pubkey_inserted:
+            self._registry.invalidate_pubkeys()
         return ret
 
+    # Bulk insert, committed in chunks. It also inserts the public key if needed
     def events_append_if_missing(self, more_events: list[EventDto], signer_public_key: str) -> int:
-        conn = self._getconn_rw()
-        cursor = conn.cursor()
-        pubkey_id = db_pubkey_insert_if_missing(cursor, signer_public_key)
-        added_cnt = 0
-        for e in more_events:
-            e.signer_public_key_id = pubkey_id
-            added_cnt += db_event_insert_if_missing(cursor, e)
-        conn.commit()
-        cursor.close()
-        return added_cnt
+        with self._conn_rw() as conn:
+            cursor = conn.cursor()
+            pubkey_id, pubkey_inserted = self._pubkey_id_insert_if_missing(cursor, signer_public_key)
+            with self._counters.updating():
+                conn.commit()
+                self._counters.add("pkey", 1 if pubkey_inserted else 0)
+            if pubkey_inserted:
+                self._registry.invalidate_pubkeys()
+            for e in more_events:
+                e.signer_public_key_id = pubkey_id
+            added_cnt = 0
+            try:
+                for i in range(0, len(more_events), DB_WRITE_CHUNK_SIZE):
+                    chunk = more_events[i:i + DB_WRITE_CHUNK_SIZE]
+                    inserted = db_event_insert_many_if_missing(cursor, chunk)
+                    with self._counters.updating():
+                        conn.commit()
+                        # Which ones were inserted is known only if all or none
+                        self._counters.add_events(inserted, list(map(lambda e: e.time, chunk)) if inserted == len(chunk) else None)
+                    added_cnt += inserted
+            except Exception as ex:
+                # Drop the partial chunk
+                conn.rollback()
+                raise ex
+            finally:
+                cursor.close()
+            return added_cnt
 
     def events_len(self) -> int:
-        cursor = self._getcursor_ro()
-        return db_event_count(cursor)
+        return self._counters.get("ev")
 
     # Also returns the signer pubkey
     def events_get_by_id(self, event_id: str) -> tuple[EventDto, str] | None:
-        cursor = self._getcursor_ro()
-        return db_event_get_by_id(cursor, event_id)
+        with self._cursor_ro() as cursor:
+            return db_event_get_by_id(cursor, event_id)
+
+    # Several events, keyed by event ID, also with the signer pubkey
+    def events_get_by_ids(self, event_ids: list[str]) -> dict[str, tuple[EventDto, str]]:
+        with self._cursor_ro() as cursor:
+            return db_event_get_by_ids(cursor, event_ids)
 
     # Get the time of the earliest event without outcome
     def events_get_earliest_time_without_outcome(self, after_time: float) -> int:
-        cursor = self._getcursor_ro()
-        return db_event_get_earliest_time_without_outcome(cursor, after_time=math.floor(after_time))
+        with self._cursor_ro() as cursor:
+            return db_event_get_earliest_time_without_outcome(cursor, after_time=math.floor(after_time))
 
     # Get (the ID of) events in the past with no outcome
     def events_get_past_no_outcome(self, now) -> list[str]:
-        cursor = self._getcursor_ro()
-        return db_event_get_past_no_outcome(cursor, now)
+        with self._cursor_ro() as cursor:
+            return db_event_get_past_no_outcome(cursor, now)
+
+    # Get (the ID and time of) events since a time with no outcome
+    def events_get_no_outcome_since(self, from_time: float) -> list[tuple[str, int]]:
+        with self._cursor_ro() as cursor:
+            return db_event_get_no_outcome_since(cursor, math.floor(from_time))
 
     """Count the number of future events"""
     def events_count_future(self, current_time: int):
-        cursor = self._getcursor_ro()
-        return db_event_count_future(cursor, current_time)
+        return self._counters.count_events_after(current_time)
 
     def events_get_ids_filter(self, start_time: int, end_time: int, definition: str | None, limit: int) -> list[str]:
-        cursor = self._getcursor_ro()
-        return db_event_get_filter_time_definition(cursor, start_time, end_time, definition, limit)
+        with self._cursor_ro() as cursor:
+            return db_event_get_filter_time_definition(cursor, start_time, end_time, definition, limit)
 
     def events_get_latest_time_for_def(self, definition: str) -> int:
-        cursor = self._getcursor_ro()
-        return db_event_get_latest_time_for_def(cursor, definition)
+        with self._cursor_ro() as cursor:
+            return db_event_get_latest_time_for_def(cursor, definition)
 
     def events_get_ids_with_no_nonce(self, limit: int = 100) -> list[str]:
-        cursor = self._getcursor_ro()
-        return db_event_get_ids_with_no_nonce(cursor, limit)
+        with self._cursor_ro() as cursor:
+            return db_event_get_ids_with_no_nonce(cursor, limit)
 
     def digitoutcomes_insert(self, event_id: str, digit_outcome_list: list[DigitOutcome]):
-        conn = self._getconn_rw()
-        cursor = conn.cursor()
-        db_digitoutcome_insert_list(cursor, event_id, digit_outcome_list)
-        conn.commit()
-        cursor.close()
+        with self._conn_rw() as conn:
+            cursor = conn.cursor()
+            try:
+                db_digitoutcome_insert_list(cursor, event_id, digit_outcome_list, self._key_blob)
+                with self._counters.updating():
+                    conn.commit()
+                    self._counters.add("diou", len(digit_outcome_list))
+            except Exception as ex:
+                conn.rollback()
+                raise ex
+            finally:
+                cursor.close()
+        self._notify_outcome_listeners(event_id)
 
     def digitoutcomes_get(self, event_id: str) -> list[DigitOutcome]:
-        cursor = self._getcursor_ro()
-        dos = db_digitoutcome_get_all_by_id(cursor, event_id)
-        return dos
+        with self._cursor_ro() as cursor:
+            dos = db_digitoutcome_get_all_by_id(cursor, event_id)
+            return dos
+
+    # Digit outcomes of several events, keyed by event ID
+    def digitoutcomes_get_by_ids(self, event_ids: list[str]) -> dict[str, list[DigitOutcome]]:
+        with self._cursor_ro() as cursor:
+            return db_digitoutcome_get_all_by_ids(cursor, event_ids)
 
     def outcomes_get(self, event_id: str) -> OutcomeDto | None:
-        cursor = self._getcursor_ro()
-        return db_outcome_get_by_id(cursor, event_id)
+        with self._cursor_ro() as cursor:
+            return db_outcome_get_by_id(cursor, event_id)
+
+    # Outcomes of several events, keyed by event ID
+    def outcomes_get_by_ids(self, event_ids: list[str]) -> dict[str, OutcomeDto]:
+        with self._cursor_ro() as cursor:
+            return db_outcome_get_by_ids(cursor, event_ids)
 
     def outcomes_exists(self, event_id: str) -> bool:
-        cursor = self._getcursor_ro()
-        return db_outcome_exists(cursor, event_id)
+        with self._cursor_ro() as cursor:
+            return db_outcome_exists(cursor, event_id)
 
     def outcomes_insert(self, o: OutcomeDto):
-        conn = self._getconn_rw()
-        cursor = conn.cursor()
-        db_outcome_insert(cursor, o)
-        conn.commit()
-        cursor.close()
+        with self._conn_rw() as conn:
+            cursor = conn.cursor()
+            db_outcome_insert(cursor, o)
+            with self._counters.updating():
+                conn.commit()
+                self._counters.add("outcome", 1)
+            cursor.close()
+        self._notify_outcome_listeners(o.event_id)
+
+    # Insert several outcomes with their digit outcomes, all in one transaction (none on error)
+    def outcomes_insert_multi(self, outcomes: list[tuple[OutcomeDto, list[DigitOutcome]]]):
+        if len(outcomes) == 0:
+            return
+        with self._conn_rw() as conn:
+            cursor = conn.cursor()
+            try:
+                for o, digit_outcome_list in outcomes:
+                    db_digitoutcome_insert_list(cursor, o.event_id, digit_outcome_list, self._key_blob)
+                db_outcome_insert_many(cursor, list(map(lambda od: od[0], outcomes)))
+                with self._counters.updating():
+                    conn.commit()
+                    self._counters.add("outcome", len(outcomes))
+                    self._counters.add("diou", sum(map(lambda od: len(od[1]), outcomes)))
+            except Exception as ex:
+                conn.rollback()
+                raise ex
+            finally:
+                cursor.close()
+        for o, _d in outcomes:
+            self._notify_outcome_listeners(o.event_id)
 
 
 # Persistence in memory
@@ -842,6 +1431,8 @@ class EventStorage:
         self._digitoutcomes: dict[str, list[DigitOutcome]] = {}
         # Holds outcomes, key is event ID
         self._outcomes: dict[str, OutcomeDto] = {}
+        # Events without outcome, event ID -> time
+        self._pending: dict[str, int] = {}
 
 
     def close(self):
@@ -856,6 +1447,7 @@ class EventStorage:
         self._pubkeys = {}
         self._digitoutcomes = {}
         self._outcomes = {}
+        self._pending = {}
 
     def print_stats(self):
         print(f"DB stats: evcl: {len(self._event_classes)}  pkey {len(self._pubkeys)}  nonce: {len(self._nonces)}  ev: {len(self._events)}  diou: {len(self._digitoutcomes)}  outcome: {len(self._outcomes)}")
@@ -881,6 +1473,10 @@ class EventStorage:
         # Not found
         return None
 
+    # By (internal) IDs, keyed by ID
+    def event_classes_get_by_ids(self, ids: list[str]) -> dict[str, EventClassDto]:
+        return {id: self._event_classes[id] for id in ids if id in self._event_classes}
+
     # By definition. In case there are multiple, return latest (with highest create_time)
     def event_classes_get_latest_by_def(self, definition: str) -> EventClassDto:
         found = None
@@ -915,6 +1511,9 @@ class EventStorage:
             return []
         return self._nonces[event_id]
 
+    def nonces_get_by_ids(self, event_ids: list[str]) -> dict[str, list[Nonce]]:
+        return {eid: self._nonces[eid] for eid in event_ids if eid in self._nonces}
+
     def pubkey_insert_if_missing(self, pubkey: str) -> int:
         for pid, p in self._pubkeys.items():
             if p == pubkey:
@@ -933,6 +1532,8 @@ class EventStorage:
         pubkey_id = self.pubkey_insert_if_missing(signer_public_key)
         e.signer_public_key_id = pubkey_id
         self._events[eid] = e
+        if eid not in self._outcomes:
+            self._pending[eid] = e.time
         return 1
 
     def events_append_if_missing(self, more_events: list[EventDto], signer_public_key: str) -> int:
@@ -953,33 +1554,49 @@ class EventStorage:
             return None
         return [e, self._pubkeys[e.signer_public_key_id]]
 
+    def events_get_by_ids(self, event_ids: list[str]) -> dict[str, tuple[EventDto, str]]:
+        ret = {}
+        for eid in event_ids:
+            res = self.events_get_by_id(eid)
+            if res is not None:
+                ret[eid] = res
+        return ret
+
     # Get the time of the earliest event without outcome
     def events_get_earliest_time_without_outcome(self, time_after: float) -> int:
         time_after = math.floor(time_after)
         t = 0
-        for eid, e in self._events.items():
-            if self.outcomes_exists(eid):
-                continue
-            if e.time < time_after:
+        for _eid, et in self._pending.items():
+            if et < time_after:
                 continue
             if t == 0:
-                t = e.time
+                t = et
             else:
-                if e.time < t:
-                    t = e.time
+                if et < t:
+                    t = et
         return t
 
     # Get (the ID of) events in the past with no outcome
     def events_get_past_no_outcome(self, now) -> list[str]:
         # past events without outcome
         pe = []
-        for eid, e in self._events.items():
-            if self.outcomes_exists(eid):
+        for eid, et in self._pending.items():
+            if et > now:
                 continue
-            if e.time > now:
+            pe.append((eid, et))
+        pe.sort(key=lambda et: et[1])
+        return list(map(lambda et: et[0], pe))
+
+    # Get (the ID and time of) events since a time with no outcome
+    def events_get_no_outcome_since(self, from_time: float) -> list[tuple[str, int]]:
+        from_time = math.floor(from_time)
+        res = []
+        for eid, et in self._pending.items():
+            if et < from_time:
                 continue
-            pe.append(e.event_id)
-        return pe
+            res.append((eid, et))
+        res.sort(key=lambda et: et[1])
+        return res
 
     """Count the number of future events"""
     def events_count_future(self, current_time: int):
@@ -1016,11 +1633,17 @@ class EventStorage:
             return []
         return self._digitoutcomes[event_id]
 
+    def digitoutcomes_get_by_ids(self, event_ids: list[str]) -> dict[str, list[DigitOutcome]]:
+        return {eid: self._digitoutcomes[eid] for eid in event_ids if eid in self._digitoutcomes}
+
     def outcomes_get(self, event_id: str) -> OutcomeDto | None:
         if event_id in self._outcomes:
             return self._outcomes[event_id]
         return None
 
+    def outcomes_get_by_ids(self, event_ids: list[str]) -> dict[str, OutcomeDto]:
+        return {eid: self._outcomes[eid] for eid in event_ids if eid in self._outcomes}
+
     def outcomes_exists(self, event_id: str) -> bool:
         if event_id in self._outcomes:
             return True
@@ -1028,3 +1651,9 @@ class EventStorage:
 
     def outcomes_insert(self, o: OutcomeDto):
         self._outcomes[o.event_id] = o
+        self._pending.pop(o.event_id, None)
+
+    def outcomes_insert_multi(self, outcomes: list[tuple[OutcomeDto, list[DigitOutcome]]]):
+        for o, digit_outcome_list in outcomes:
+            self.digitoutcomes_insert(o.event_id, digit_outcome_list)
+            self.outcomes_insert(o)
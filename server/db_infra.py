@@ -33,9 +33,10 @@ def get_db_file(db_file_name: str, data_dir: str = ".", create_mode: bool = Fals
     return dbfile
 
 
-def get_db_update_versions_from_args(default_to: int) -> tuple[int, int]:
+# Versions to update between: from the current version (0: create), to the latest by default, or from args
+def get_db_update_versions_from_args(default_to: int, default_from: int) -> tuple[int, int]:
     vto = default_to
-    vfrom = vto - 1
+    vfrom = default_from
 
     if len(sys.argv) >= 3:
         vfrom = int(sys.argv[1])
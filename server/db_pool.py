@@ -0,0 +1,146 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+from contextlib import contextmanager
+import sqlite3
+import threading
+import time
+
+
+DB_POOL_MAX_RO_DEFAULT: int = 8
+DB_POOL_MAX_RW_DEFAULT: int = 2
+DB_POOL_IDLE_SECONDS_DEFAULT: float = 60
+# Max time to wait for a free connection when the pool is exhausted
+DB_POOL_CHECKOUT_TIMEOUT_SECONDS: float = 30
+
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections, shared by all threads.
+    A connection is checked out for exclusive use (see connection()), and returned afterwards.
+    At most max_size connections are open; when all are in use, checkout waits.
+    Idle connections unused for longer than idle_seconds are closed (reaped).
+    After close(), the pool can still be used, new connections are opened as needed.
+    """
+
+    def __init__(self, name: str, open_fn, max_size: int, idle_seconds: float = DB_POOL_IDLE_SECONDS_DEFAULT):
+        self.name = name
+        # Opens a new connection, it has to be usable from any thread (check_same_thread=False)
+        self._open_fn = open_fn
+        self.max_size = max(1, max_size)
+        self.idle_seconds = idle_seconds
+        # Idle connections, with the time they were returned, most recent at the end
+        self._idle: list[tuple[sqlite3.Connection, float]] = []
+        # Number of open connections (idle + in use + being opened)
+        self._open_count = 0
+        # Incremented on close(), connections opened before are closed when returned
+        self._epoch = 0
+        self._conn_epoch: dict[int, int] = {}
+        self._cond = threading.Condition()
+        self.checkouts = 0
+        self.waits = 0
+        self.opened = 0
+        self.reaped = 0
+
+    # Check out a connection for exclusive use, for the duration of the with block
+    @contextmanager
+    def connection(self):
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._checkin(conn)
+
+    def _checkout(self) -> sqlite3.Connection:
+        deadline = time.monotonic() + DB_POOL_CHECKOUT_TIMEOUT_SECONDS
+        with self._cond:
+            waited = False
+            while True:
+                self._reap_idle_locked(time.monotonic())
+                if len(self._idle) > 0:
+                    # Take the most recently used one, older ones can get reaped
+                    conn, _t = self._idle.pop()
+                    self.checkouts += 1
+                    return conn
+                if self._open_count < self.max_size:
+                    self._open_count += 1
+                    self.checkouts += 1
+                    break
+                if not waited:
+                    self.waits += 1
+                    waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise Exception(f"Timeout waiting for a DB connection, pool {self.name}, size {self.max_size}")
+                self._cond.wait(remaining)
+        # Open outside of the lock
+        try:
+            conn = self._open_fn()
+        except Exception as ex:
+            with self._cond:
+                self._open_count -= 1
+                self._cond.notify()
+            raise ex
+        with self._cond:
+            self.opened += 1
+            self._conn_epoch[id(conn)] = self._epoch
+        return conn
+
+    def _checkin(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            # Left uncommitted, e.g. due to an error, do not leak it to the next user
+            conn.rollback()
+        with self._cond:
+            if self._conn_epoch.get(id(conn)) != self._epoch:
+                # Opened before a close()
+                self._close_locked(conn)
+                self._cond.notify()
+                return
+            now = time.monotonic()
+            self._idle.append((conn, now))
+            self._reap_idle_locked(now)
+            self._cond.notify()
+
+    # Close connections idle for too long. The lock must be held.
+    def _reap_idle_locked(self, now: float):
+        while len(self._idle) > 0 and now - self._idle[0][1] > self.idle_seconds:
+            conn, _t = self._idle.pop(0)
+            self._close_locked(conn)
+            self.reaped += 1
+
+    # The lock must be held
+    def _close_locked(self, conn: sqlite3.Connection):
+        self._conn_epoch.pop(id(conn), None)
+        conn.close()
+        self._open_count -= 1
+
+    # Close idle connections now, regardless of idle time
+    def reap_all_idle(self):
+        with self._cond:
+            while len(self._idle) > 0:
+                conn, _t = self._idle.pop(0)
+                self._close_locked(conn)
+                self.reaped += 1
+
+    # Close all idle connections, connections in use are closed when returned
+    def close(self):
+        with self._cond:
+            self._epoch += 1
+            for conn, _t in self._idle:
+                self._close_locked(conn)
+            self._idle = []
+            self._cond.notify_all()
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            return {
+                "open": self._open_count,
+                "idle": len(self._idle),
+                "in_use": self._open_count - len(self._idle),
+                "max_size": self.max_size,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "opened": self.opened,
+                "reaped": self.reaped,
+            }
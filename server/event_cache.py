@@ -0,0 +1,110 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+from collections import OrderedDict
+import sys
+import threading
+
+
+EVENT_CACHE_MAX_ENTRIES_DEFAULT: int = 20000
+EVENT_CACHE_MAX_BYTES_DEFAULT: int = 64 * 1024 * 1024
+
+
+# Approximate in-memory size of a (JSON-like) value, in bytes
+def estimate_size(value) -> int:
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += estimate_size(k) + estimate_size(v)
+    elif isinstance(value, list) or isinstance(value, tuple):
+        for v in value:
+            size += estimate_size(v)
+    return size
+
+
+class EventInfoCache:
+    """
+    Bounded LRU cache of fully built event info dicts, keyed by event ID.
+    An event info only changes when its outcome is inserted, so entries are never expired,
+    only invalidated explicitly (on outcome insert), or evicted when over the limits.
+    Thread-safe. Entries are stored and returned as shallow copies.
+    """
+
+    def __init__(self, max_entries: int = EVENT_CACHE_MAX_ENTRIES_DEFAULT, max_bytes: int = EVENT_CACHE_MAX_BYTES_DEFAULT):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # Values are (info, size) tuples, in LRU order (most recent at the end)
+        self._entries: OrderedDict[str, tuple[dict, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Incremented on each invalidation, used to reject entries built before an invalidation
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    # Return the cached info, or None
+    def get(self, event_id: str) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(event_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(event_id)
+            self.hits += 1
+            return dict(entry[0])
+
+    # Return a token to be passed to put(), take it before reading the data from the DB
+    def get_generation(self) -> int:
+        return self._generation
+
+    # Store an info. Ignored if there was an invalidation since the generation was taken.
+    def put(self, event_id: str, info: dict, generation: int):
+        if self.max_entries <= 0:
+            return
+        size = estimate_size(info)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self._generation:
+                # Data may be stale
+                return
+            self._remove(event_id)
+            self._entries[event_id] = (dict(info), size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _eid, (_info, s) = self._entries.popitem(last=False)
+                self._bytes -= s
+                self.evictions += 1
+
+    def invalidate(self, event_id: str):
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            self._remove(event_id)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, event_id: str):
+        entry = self._entries.pop(event_id, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
@@ -2,12 +2,19 @@
 # Distributed under the MIT software license, see the accompanying
 # file COPYING or http://www.opensource.org/licenses/mit-license.php.
 
-from fastapi import FastAPI
+from fastapi import Body, FastAPI, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from oracle import OracleApp
+from oracle import EVENT_IDS_FILTER_MAX_COUNT, EVENTS_FILTER_MAX_COUNT, Oracle, OracleApp
+from oracle_async import AsyncOracle
+from response_cache import etag_matches
 
 oracle_app = OracleApp.get_singleton_instance()
+# Async handlers: DB reads on a fixed pool of reader threads, prices from the async fetcher
+oracle_async = AsyncOracle(oracle_app)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
 app = FastAPI()
 
@@ -18,6 +25,7 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
     #expose_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # the cursor of the next page of a listing
     allow_credentials=True,
     allow_methods=["*"],  # Allow all HTTP methods
     allow_headers=["*"],  # Allow all headers
@@ -26,50 +34,100 @@ app.add_middleware(
 app.mount("/demo", StaticFiles(directory="public_demo", html=True), name="demo")
 
 @app.get("/api/v0/oracle/oracle_info")
-def api_oracle_info():
-    return oracle_app.oracle.get_oracle_info()
+async def api_oracle_info():
+    return oracle_async.get_oracle_info()
 
 @app.get("/api/v0/oracle/oracle_status")
-def api_oracle_status():
-    return oracle_app.oracle.get_oracle_status()
+async def api_oracle_status():
+    return await oracle_async.get_oracle_status()
 
-@app.get("/api/v0/event/event/{event_id}")
-def api_event(event_id: str):
-    return oracle_app.oracle.get_event_by_id(event_id)
+@app.get("/api/v0/oracle/cache_stats")
+async def api_oracle_cache_stats():
+    return oracle_async.get_event_info_cache_stats()
 
+# Pre-serialized, with ETag; settled events are cacheable for long, conditional requests get 304
+@app.get("/api/v0/event/event/{event_id}")
+async def api_event(event_id: str, if_none_match: str | None = Header(default=None)):
+    resp = await oracle_async.get_event_response_by_id(event_id)
+    headers = {"ETag": resp.etag, "Cache-Control": resp.cache_control}
+    if etag_matches(if_none_match, resp.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=resp.body, media_type="application/json", headers=headers)
+
+# Infos of several events by their IDs (a JSON list in the body), in one response; missing events are skipped
+@app.post("/api/v0/event/events_by_id")
+async def api_events_by_id(event_ids: list[str] = Body()):
+    if len(event_ids) > oracle_app.oracle.events_by_id_max:
+        raise HTTPException(status_code=400, detail=f"Too many event IDs, {len(event_ids)}, max {oracle_app.oracle.events_by_id_max}")
+    body = await oracle_async.get_events_response_by_ids(event_ids)
+    return Response(content=body, media_type="application/json")
+
+# Keyset pagination: pass the X-Next-Cursor header of a full page as "after" for the next page.
+# With format=ndjson all matching events are streamed, one per line, without the count limit.
 @app.get("/api/v0/event/events")
-def api_events(start_time: int = 0, end_time: int = 0, definition: str = None):
-    return oracle_app.oracle.get_events_filter(start_time, end_time, definition)
+async def api_events(response: Response, start_time: int = 0, end_time: int = 0, definition: str = None, after: str = None, format: str = "json"):
+    await check_cursor(after)
+    if format == "ndjson":
+        return StreamingResponse(oracle_async.iter_events_ndjson(start_time, end_time, definition, after), media_type=NDJSON_MEDIA_TYPE)
+    events = await oracle_async.get_events_filter(start_time, end_time, definition, after)
+    set_next_cursor(response, Oracle.next_cursor(list(map(lambda e: e["event_id"], events)), EVENTS_FILTER_MAX_COUNT))
+    return events
 
 @app.get("/api/v0/event/event_ids")
-def api_event_ids(start_time: int = 0, end_time: int = 0, definition: str = None):
-    return oracle_app.oracle.get_event_ids_filter(start_time, end_time, definition)
+async def api_event_ids(response: Response, start_time: int = 0, end_time: int = 0, definition: str = None, after: str = None, format: str = "json"):
+    await check_cursor(after)
+    if format == "ndjson":
+        return StreamingResponse(oracle_async.iter_event_ids_ndjson(start_time, end_time, definition, after), media_type=NDJSON_MEDIA_TYPE)
+    event_ids = await oracle_async.get_event_ids_filter(start_time, end_time, definition, after)
+    set_next_cursor(response, Oracle.next_cursor(event_ids, EVENT_IDS_FILTER_MAX_COUNT))
+    return event_ids
+
+async def check_cursor(after: str | None):
+    if not await oracle_async.is_valid_cursor(after):
+        raise HTTPException(status_code=400, detail=f"Invalid cursor, {after}")
+
+def set_next_cursor(response: Response, cursor: str | None):
+    if cursor is not None:
+        response.headers["X-Next-Cursor"] = cursor
+
+# Server-Sent Events push of new outcomes (with digit signatures) as soon as they are committed, instead of polling.
+# Optional filters: definition, event_id (repeatable). A too slow client gets an "overflow" event and is disconnected.
+@app.get("/api/v0/event/outcome_stream")
+async def api_outcome_stream(definition: str = None, event_id: list[str] | None = Query(default=None)):
+    sub = oracle_async.subscribe_outcomes(definition, event_id)
+    if sub is None:
+        raise HTTPException(status_code=503, detail="Too many outcome stream subscribers")
+    return StreamingResponse(oracle_async.iter_outcomes_sse(sub), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.get("/api/v0/event/event_classes")
-def api_events():
-    return oracle_app.oracle.get_event_classes()
+async def api_events():
+    return await oracle_async.get_event_classes()
 
 @app.get("/api/v0/event/next_event")
-def api_next_event(definition: str, period: float = 60):
-    return oracle_app.oracle.get_next_event(definition, int(period))
+async def api_next_event(definition: str, period: float = 60):
+    return await oracle_async.get_next_event(definition, int(period))
 
 @app.get("/api/v0/price/current_all")
-def api_price_current_all():
-    return oracle_app.get_current_prices()
+async def api_price_current_all():
+    return await oracle_async.get_current_prices()
 
 @app.get("/api/v0/price/current/{symbol}")
-def api_price_current(symbol: str):
-    return oracle_app.get_current_price(symbol)
+async def api_price_current(symbol: str):
+    return await oracle_async.get_current_price(symbol)
 
 @app.get("/api/v0/price_info/current_all")
-def api_price_current_all():
-    return oracle_app.get_current_price_infos()
+async def api_price_current_all():
+    return await oracle_async.get_current_price_infos()
 
 @app.get("/api/v0/price_info/current/{symbol}")
-def api_price_current(symbol: str):
-    return oracle_app.get_current_price_info(symbol)
+async def api_price_current(symbol: str):
+    return await oracle_async.get_current_price_info(symbol)
+
+@app.get("/api/v0/price/stats")
+async def api_price_stats():
+    return oracle_async.get_price_stats()
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"Oracle": "API"}
 
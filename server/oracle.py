@@ -5,20 +5,41 @@
 from db import EventStorageDb
 import dlcplazacryptlib
 from dto import DigitOutcome, EventClassDto, EventDto, Nonce, OutcomeDto
+from event_cache import EVENT_CACHE_MAX_BYTES_DEFAULT, EVENT_CACHE_MAX_ENTRIES_DEFAULT, EventInfoCache
+from outcome_feed import OUTCOME_FEED_MAX_SUBSCRIBERS_DEFAULT, OUTCOME_FEED_QUEUE_MAX_DEFAULT, OutcomeFeed
+from outcome_scheduler import OUTCOME_RETRY_SECS, OUTCOME_SETTLE_SECS_DEFAULT, OutcomeScheduler
 from price import PriceSource
+from price_history import PriceHistory, PRICE_HISTORY_CAPACITY_DEFAULT, PRICE_HISTORY_MAX_DISTANCE_SECS_DEFAULT, PRICE_HISTORY_SAMPLE_SECS_DEFAULT
+from response_cache import RESPONSE_STORE_MAX_BYTES_DEFAULT, SerializedResponse, SerializedResponseStore, json_dumps_bytes
 from util import power_of_ten
 
 from datetime import datetime, UTC
 from dotenv import load_dotenv
+import heapq
+import itertools
 import math
 import os
 import random
+import threading
 import _thread
 import time
 
 
 # For past events older than this no outcome is genrated
 EVENT_TOO_OLD_THRESHOLD=86400
+# Period of checking for new events needed at the expanding horizon
+HORIZON_CHECK_PERIOD_SECS=60
+# Max number of events generated and inserted at once by the horizon extension
+HORIZON_EXTEND_CHUNK_SIZE=10000
+# Max number of events in one bulk lookup by IDs (default, see EVENTS_BY_ID_MAX)
+EVENTS_BY_ID_MAX_DEFAULT=1000
+# Max number of events in a page of the event listing, and of event IDs in a page of the event ID listing
+EVENTS_FILTER_MAX_COUNT=100
+EVENT_IDS_FILTER_MAX_COUNT=5000
+# Number of event IDs listed at once when walking a listing (see EventResolver.list_event_ids_iter())
+EVENT_IDS_PAGE_SIZE=1000
+# Number of events hydrated at once when streaming a listing (see Oracle.iter_events_ndjson())
+EVENTS_STREAM_CHUNK_SIZE=100
 
 EVENT_STRING_TEMPLATE_DEFAULT = "Outcome:{event_id}:{digit_index}:{digit_outcome}"
 
@@ -183,14 +204,23 @@ class EventClass:
 class Nonces:
     # Generate nonces. Note: this is a bit slow due to key operations
     def generate(event_id: str, range_digits: int) -> list[Nonce]:
-        nonces = []
-        for i in range(range_digits):
-            # TODO use a non-deterministic, true random nonce here
-            newnonce = dlcplazacryptlib.create_deterministic_nonce(event_id, i)
-            nonce = Nonce(event_id=event_id, digit_index=i, nonce_pub=newnonce[1], nonce_sec=newnonce[0])
-            nonces.append(nonce)
-        # print(".", end="")
-        return nonces
+        return Nonces.generate_multi([(event_id, range_digits)])[0]
+
+    # Generate nonces for several events, in one (parallel) call to cryptlib.
+    # Input is a list of (event_id, range_digits), result contains the nonces for each.
+    def generate_multi(requests: list[tuple[str, int]]) -> list[list[Nonce]]:
+        if len(requests) == 0:
+            return []
+        # TODO use a non-deterministic, true random nonce here
+        newnoncess = dlcplazacryptlib.create_deterministic_nonces(requests)
+        res = []
+        for (event_id, _range_digits), newnonces in zip(requests, newnoncess):
+            nonces = []
+            for i in range(len(newnonces)):
+                nonce = Nonce(event_id=event_id, digit_index=i, nonce_pub=newnonces[i][1], nonce_sec=newnonces[i][0])
+                nonces.append(nonce)
+            res.append(nonces)
+        return res
 
 
 class Outcome:
@@ -200,30 +230,47 @@ class Outcome:
 
     # Create the outcome. May throw
     def create(outcome_value: str, event_id: str, event_desc: EventDescription, created_time: float, signer_public_key: str, nonces: list[Nonce]):
-        outcome_dto = OutcomeDto(event_id=event_id, value=outcome_value, created_time=created_time)
-
-        digit_values = event_desc.value_to_digits(float(outcome_value))
-        # the number of digits, nonces, signatures
-        n = event_desc.range_digits
-        # check that digit_values[], nonces.n[] have enough elements
-        if len(digit_values) < n:
-            raise Exception(f"Not enough digit_values, {digit_values} {n}")
-        if len(nonces) < n:
-            raise Exception(f"Not enough nonces, {len(nonces)} {n}")
+        return Outcome.create_multi([(outcome_value, event_id, event_desc, signer_public_key, nonces)], created_time)[0]
 
+    # Create the outcomes of several events, signed in one call to cryptlib.
+    # Input is a list of (outcome_value, event_id, event_desc, signer_public_key, nonces). May throw
+    def create_multi(requests: list[tuple[str, str, EventDescription, str, list[Nonce]]], created_time: float) -> list['Outcome']:
+        if len(requests) == 0:
+            return []
         # For signing we use the pubkey configured into cryptlib,
-        # Check that signer pubkey matches the event's
+        # Check that signer pubkey matches the events'
         lib_pubkey = dlcplazacryptlib.get_public_key(0)
-        if lib_pubkey != signer_public_key:
-            raise Exception(f"Signing error: key not matching pubkey '{signer_public_key}' ({lib_pubkey})")
 
-        digits = []
-        for i in range(n):
-            msg = Outcome.string_for_event(event_desc, event_id, i, digit_values[i])
-            sig = dlcplazacryptlib.sign_schnorr_with_nonce(msg, nonces[i].nonce_sec, 0)
-            digit_outcome = DigitOutcome(event_id, i, digit_values[i], nonces[i].nonce_pub, sig, msg)
-            digits.append(digit_outcome)
-        return Outcome(dto=outcome_dto, digit_outcomes=digits)
+        prepared = []
+        sign_requests = []
+        for outcome_value, event_id, event_desc, signer_public_key, nonces in requests:
+            digit_values = event_desc.value_to_digits(float(outcome_value))
+            # the number of digits, nonces, signatures
+            n = event_desc.range_digits
+            # check that digit_values[], nonces.n[] have enough elements
+            if len(digit_values) < n:
+                raise Exception(f"Not enough digit_values, {digit_values} {n}")
+            if len(nonces) < n:
+                raise Exception(f"Not enough nonces, {len(nonces)} {n}")
+            if lib_pubkey != signer_public_key:
+                raise Exception(f"Signing error: key not matching pubkey '{signer_public_key}' ({lib_pubkey})")
+            msgs = []
+            for i in range(n):
+                msgs.append(Outcome.string_for_event(event_desc, event_id, i, digit_values[i]))
+            prepared.append((msgs, digit_values))
+            sign_requests.append((msgs, list(map(lambda nonce: nonce.nonce_sec, nonces[:n]))))
+
+        sigss = dlcplazacryptlib.sign_outcome_digits_multi(sign_requests, 0)
+
+        outcomes = []
+        for (outcome_value, event_id, _event_desc, _signer_public_key, nonces), (msgs, digit_values), sigs in zip(requests, prepared, sigss):
+            outcome_dto = OutcomeDto(event_id=event_id, value=outcome_value, created_time=created_time)
+            digits = []
+            for i in range(len(msgs)):
+                digit_outcome = DigitOutcome(event_id, i, digit_values[i], nonces[i].nonce_pub, sigs[i], msgs[i])
+                digits.append(digit_outcome)
+            outcomes.append(Outcome(dto=outcome_dto, digit_outcomes=digits))
+        return outcomes
 
     def string_for_event(event_desc: EventDescription, event_id: str, digit_index: int, digit_outcome: int) -> str:
         s = event_desc.event_string_template_for_id(event_id)
@@ -254,6 +301,180 @@ class Event:
         return event_class_dto.definition.lower() + str(time)
 
 
+class EventResolver:
+    """
+    Resolves events arithmetically from the event classes, without reading EVENT rows.
+    The ID of an event is the lowercase definition plus the time, and the times of a class are on its grid
+    (repeat_offset + k * repeat_period, from repeat_first_time to repeat_last_time).
+    The horizon extension creates events past repeat_last_time, up to the latest event time of the definition;
+    this extent is loaded once, and advanced on inserts (see extend()).
+    Where classes of a definition overlap, the one inserted first owns the event, as with insert-if-missing.
+    Thread-safe.
+    """
+
+    def __init__(self):
+        # Event classes by definition, in insertion order
+        self._classes: dict[str, list[EventClass]] = {}
+        # Latest event time by definition
+        self._latest: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    # Load the event classes, and the latest event time of each definition
+    def load(self, class_dtos: list[EventClassDto], latest_times: dict[str, int]):
+        with self._lock:
+            self._classes = {}
+            self._latest = {}
+            for dto in class_dtos:
+                self._add_class_locked(dto)
+            for definition, t in latest_times.items():
+                self._latest[definition] = max(self._latest.get(definition, 0), t)
+            self.loaded = True
+
+    def add_class(self, dto: EventClassDto):
+        with self._lock:
+            self._add_class_locked(dto)
+
+    def _add_class_locked(self, dto: EventClassDto):
+        self._classes.setdefault(dto.definition, []).append(EventClass(dto))
+        # All events of the class are created with it
+        last = EventResolver._last_on_grid(dto, dto.repeat_last_time)
+        if last >= dto.repeat_first_time:
+            self._latest[dto.definition] = max(self._latest.get(dto.definition, 0), last)
+
+    # An event was created at the horizon
+    def extend(self, definition: str, time: int):
+        with self._lock:
+            self._latest[definition] = max(self._latest.get(definition, 0), time)
+
+    # Latest event time of a definition, 0 if none
+    def latest_time(self, definition: str) -> int:
+        with self._lock:
+            return self._latest.get(definition, 0)
+
+    def get_classes(self, definition: str) -> list[EventClass]:
+        with self._lock:
+            return list(self._classes.get(definition, []))
+
+    def get_definitions(self) -> list[str]:
+        with self._lock:
+            return list(self._classes.keys())
+
+    # Last time on the grid of the class, at or before the given time
+    def _last_on_grid(dto: EventClassDto, time: int) -> int:
+        return (time - dto.repeat_offset) // dto.repeat_period * dto.repeat_period + dto.repeat_offset
+
+    # Time range of the horizon extension of a definition, beyond the ranges of the classes. The lock must be held
+    def _extension_range_locked(self, definition: str) -> tuple[int, int]:
+        classes = self._classes.get(definition, [])
+        nominal_last = max(map(lambda ec: ec.dto.repeat_last_time, classes), default=0)
+        return (nominal_last + 1, self._latest.get(definition, 0))
+
+    # The class owning the event of a definition at a time, None if there is no such event. The lock must be held
+    def _owner_locked(self, definition: str, time: int) -> EventClass | None:
+        classes = self._classes.get(definition, [])
+        for ec in classes:
+            if ec.dto.repeat_first_time <= time <= ec.dto.repeat_last_time and time % ec.dto.repeat_period == ec.dto.repeat_offset:
+                return ec
+        ext_from, ext_to = self._extension_range_locked(definition)
+        if ext_from <= time <= ext_to:
+            for ec in classes:
+                if ec.dto.repeat_first_time <= time and time % ec.dto.repeat_period == ec.dto.repeat_offset:
+                    return ec
+        return None
+
+    def exists(self, definition: str, time: int) -> bool:
+        with self._lock:
+            return self._owner_locked(definition, time) is not None
+
+    # The event with the given ID, None if there is no such event
+    def resolve(self, event_id: str) -> Event | None:
+        with self._lock:
+            for definition in self._classes.keys():
+                prefix = definition.lower()
+                if not event_id.startswith(prefix):
+                    continue
+                time_str = event_id[len(prefix):]
+                if not time_str.isdigit() or str(int(time_str)) != time_str:
+                    continue
+                ec = self._owner_locked(definition, int(time_str))
+                if ec is not None:
+                    return Event.new(int(time_str), ec)
+        return None
+
+    # Times of the events of a class in [start_time, end_time], in order, with its owned ones only. The lock must be held
+    def _class_times_locked(self, ec: EventClass, start_time: int, end_time: int):
+        dto = ec.dto
+        ext_from, ext_to = self._extension_range_locked(dto.definition)
+        # Only class of its definition, owns all
+        single = len(self._classes.get(dto.definition, [])) == 1
+        for range_from, range_to in [(dto.repeat_first_time, dto.repeat_last_time), (max(ext_from, dto.repeat_first_time), ext_to)]:
+            t_from = max(range_from, start_time)
+            t_to = min(range_to, end_time)
+            if t_from > t_to:
+                continue
+            t = EventResolver._last_on_grid(dto, t_from)
+            if t < t_from:
+                t += dto.repeat_period
+            if single:
+                yield from range(t, t_to + 1, dto.repeat_period)
+                continue
+            while t <= t_to:
+                if self._owner_locked(dto.definition, t) is ec:
+                    yield t
+                t += dto.repeat_period
+
+    # IDs of events in a time range (0: unbounded), optionally of a definition, in time order, at most limit (0: no limit).
+    # Same order as the time index, same-time events (of different definitions) in event ID order.
+    # after: keyset cursor, an event ID, only events after it (in this order) are listed, see list_event_ids_iter()
+    def list_event_ids(self, start_time: int, end_time: int, definition: str | None, limit: int, after: str | None = None) -> list[str]:
+        if end_time == 0:
+            end_time = 2**63
+        with self._lock:
+            after_key = None
+            if after is not None:
+                after_key = self._order_key_locked(after)
+                if after_key is None:
+                    raise Exception(f"Invalid cursor, no such event, {after}")
+                start_time = max(start_time, after_key[0])
+            streams = []
+            for defi, classes in self._classes.items():
+                if definition is None or defi == definition:
+                    prefix = defi.lower()
+                    for ec in classes:
+                        streams.append(map(lambda t, prefix=prefix: (t, prefix + str(t)), self._class_times_locked(ec, start_time, end_time)))
+            if len(streams) == 1:
+                merged = streams[0]
+            else:
+                merged = heapq.merge(*streams)
+            if after_key is not None:
+                merged = itertools.dropwhile(lambda t_eid: t_eid <= after_key, merged)
+            if limit != 0:
+                merged = itertools.islice(merged, limit)
+            return list(map(lambda t_eid: t_eid[1], merged))
+
+    # All IDs of events in a time range, as list_event_ids(), one page at a time: the lock is not held
+    # between the pages, and the memory use does not grow with the number of events
+    def list_event_ids_iter(self, start_time: int, end_time: int, definition: str | None, after: str | None = None, page_size: int = EVENT_IDS_PAGE_SIZE):
+        while True:
+            page = self.list_event_ids(start_time, end_time, definition, page_size, after)
+            yield from page
+            if len(page) < page_size:
+                return
+            after = page[-1]
+
+    # Sort key of an event in the listing order, (time, event ID), None if there is no such event. The lock must be held.
+    # Does not depend on the classes, a cursor stays valid when classes are inserted
+    def _order_key_locked(self, event_id: str) -> tuple[int, str] | None:
+        for definition in self._classes.keys():
+            prefix = definition.lower()
+            time_str = event_id[len(prefix):]
+            if event_id.startswith(prefix) and time_str.isdigit() and str(int(time_str)) == time_str:
+                if self._owner_locked(definition, int(time_str)) is not None:
+                    return (int(time_str), event_id)
+        return None
+
+
 class Oracle:
     def __init__(self, public_key, data_dir_override: str = None, price_source_override = None):
         load_dotenv()
@@ -268,14 +489,75 @@ class Oracle:
         self.horizon_days = float(os.getenv("HORIZON_DAYS", 390))
         print(f"Horizon setting: {self.horizon_days} days")
 
+        # Max number of events in a bulk lookup by IDs, from dotenv
+        self.events_by_id_max = int(os.getenv("EVENTS_BY_ID_MAX", EVENTS_BY_ID_MAX_DEFAULT))
+
+        # Outcome price: TWAP window before the event time, from dotenv (0: nearest tick to the event time)
+        self.outcome_twap_window = float(os.getenv("OUTCOME_TWAP_WINDOW_SECS", 0))
+        # Sampling interval of the price history, from dotenv (0: off)
+        self.price_history_sample_secs = float(os.getenv("PRICE_HISTORY_SAMPLE_SECS", PRICE_HISTORY_SAMPLE_SECS_DEFAULT))
+
+        # Cache of built event infos, limits from dotenv
+        cache_max_entries = int(os.getenv("EVENT_CACHE_MAX_ENTRIES", EVENT_CACHE_MAX_ENTRIES_DEFAULT))
+        cache_max_bytes = int(os.getenv("EVENT_CACHE_MAX_BYTES", EVENT_CACHE_MAX_BYTES_DEFAULT))
+        self.event_info_cache = EventInfoCache(max_entries=cache_max_entries, max_bytes=cache_max_bytes)
+        # Serialized responses of settled events, limit from dotenv
+        self.event_response_store = SerializedResponseStore(max_bytes=int(os.getenv("EVENT_RESPONSE_STORE_MAX_BYTES", RESPONSE_STORE_MAX_BYTES_DEFAULT)))
+
+        # Push of new outcomes to subscribers, limits from dotenv
+        self.outcome_feed = OutcomeFeed(
+            queue_max=int(os.getenv("OUTCOME_FEED_QUEUE_MAX", OUTCOME_FEED_QUEUE_MAX_DEFAULT)),
+            max_subscribers=int(os.getenv("OUTCOME_FEED_MAX_SUBSCRIBERS", OUTCOME_FEED_MAX_SUBSCRIBERS_DEFAULT)),
+        )
+
+        # Deadlines of upcoming outcomes, settle delay after the event time from dotenv
+        self.outcome_scheduler = OutcomeScheduler(settle_secs=float(os.getenv("OUTCOME_SETTLE_SECS", OUTCOME_SETTLE_SECS_DEFAULT)))
+        self.event_resolver = EventResolver()
+
         if price_source_override is None:
             price_source = PriceSource()
+            # Optional streaming of prices, from dotenv
+            if os.getenv("PRICE_STREAMING", "0") == "1":
+                price_source.start_streaming()
+            # Price history for event-time outcomes, limits from dotenv
+            price_source.history = PriceHistory(
+                capacity=int(os.getenv("PRICE_HISTORY_CAPACITY", PRICE_HISTORY_CAPACITY_DEFAULT)),
+                max_distance=float(os.getenv("PRICE_HISTORY_MAX_DISTANCE_SECS", PRICE_HISTORY_MAX_DISTANCE_SECS_DEFAULT)),
+            )
         else:
             price_source = price_source_override
         self.db = EventStorageDb(data_dir=data_dir)
         self.public_key = public_key
         self.price_source = price_source
 
+    # The storage. On (re)assignment the event info cache is hooked up to its outcome changes.
+    @property
+    def db(self) -> EventStorageDb:
+        return self._db
+
+    @db.setter
+    def db(self, db: EventStorageDb):
+        self._db = db
+        self.event_info_cache.clear()
+        self.event_response_store.clear()
+        self.outcome_scheduler = OutcomeScheduler(settle_secs=self.outcome_scheduler.settle_secs)
+        self.event_resolver = EventResolver()
+        db.add_outcome_listener(self._on_outcome_change)
+
+    # Called by the storage when the outcome of an event is inserted (event_id None: all events)
+    def _on_outcome_change(self, event_id: str | None):
+        if event_id is None:
+            self.event_info_cache.clear()
+            self.event_response_store.clear()
+        else:
+            self.event_info_cache.invalidate(event_id)
+            self.event_response_store.remove(event_id)
+
+    def get_event_info_cache_stats(self) -> dict:
+        stats = self.event_info_cache.get_stats()
+        stats["response_store"] = self.event_response_store.get_stats()
+        return stats
+
     def initialize_cryptlib() -> str:
         # Take location of secret file from dotenv
         load_dotenv()
@@ -292,6 +574,17 @@ class Oracle:
 
     def delete_all_contents(self):
         self.db.delete_all_contents()
+        self.event_resolver = EventResolver()
+        self.outcome_scheduler.clear()
+
+    # The event resolver, loaded from the storage on first use
+    def resolver(self) -> EventResolver:
+        if not self.event_resolver.loaded:
+            class_dtos = self.db.event_classes_get_all()
+            definitions = set(map(lambda dto: dto.definition, class_dtos))
+            latest_times = {definition: self.db.events_get_latest_time_for_def(definition) for definition in definitions}
+            self.event_resolver.load(class_dtos, latest_times)
+        return self.event_resolver
 
     def load_event_classes(self, event_classes, defer_nonces = False):
         for ec in event_classes:
@@ -303,9 +596,12 @@ class Oracle:
         if inserted == 0:
             print(f"ERROR: Event class already present! id '{ec.dto.id}'")
             return
+        if self.event_resolver.loaded:
+            self.event_resolver.add_class(ec.dto)
         event_dtos, nonces = self.generate_events_from_class(ec=ec, defer_nonces=defer_nonces)
         print(f"add_event_class_and_events Generated {len(event_dtos)} events and {len(nonces)} nonces (in memory)")
         added_event_cnt = self.db.events_append_if_missing(event_dtos, ec.dto.signer_public_key)
+        self.schedule_outcomes(event_dtos)
         if len(nonces) > 0:
             self.db.nonces_insert(nonces)
         print(f"Loaded event class '{ec.dto.id}', generated {len(event_dtos)} events, inserted {added_event_cnt}, total {self.db.events_len()}")
@@ -315,6 +611,11 @@ class Oracle:
         self.db.print_stats()
         now = round(datetime.now(UTC).timestamp())
         print(f"Oracle, with {self.db.events_count_future(now)} future events ({self.db.events_len()} total), and {self.db.event_classes_len()} eventclasses")
+        cs = self.event_info_cache.get_stats()
+        print(f"Event info cache: entries: {cs['entries']}  bytes: {cs['bytes']}  hits: {cs['hits']}  misses: {cs['misses']}  invalidations: {cs['invalidations']}  evictions: {cs['evictions']}")
+        ss = self.outcome_scheduler.get_stats()
+        ls = self.outcome_scheduler.get_latency_stats()
+        print(f"Outcome scheduler: scheduled: {ss['scheduled']}  next: {ss['next_deadline']}  time-to-outcome (s): count: {ls['count']}  p50: {ls['p50']}  p90: {ls['p90']}  p99: {ls['p99']}  max: {ls['max']}")
 
     # Generate events. Also nonces, unless deferred
     def generate_events_from_class(self, ec: EventClass, defer_nonces = False) -> tuple[list[EventDto], list[Nonce]]:
@@ -330,17 +631,17 @@ class Oracle:
             # eid = ev.dto.event_id
             # print(cnt, " ", eid, ", ", ev.time, ' ', ev.desc.range_digits)
             events.append(ev.dto)
-
-            if not defer_nonces:
-                nonces1 = self.generate_nonces(ev)
-                for n in nonces1:
-                    noncess.append(n)
-                if len(noncess) % 10 == 0:
-                    print(".", end='')
-                if len(noncess) % 1000 == 0:
-                    print(f"\n{len(noncess)}")
             t += ec.dto.repeat_period
             cnt += 1
+
+        if not defer_nonces:
+            # Generate nonces in batches
+            batch_size = 10000
+            for i in range(0, len(events), batch_size):
+                batch = events[i:i + batch_size]
+                for nonces1 in Nonces.generate_multi(list(map(lambda e: (e.event_id, ec.desc.range_digits), batch))):
+                    noncess.extend(nonces1)
+                print(f"{len(noncess)} nonces generated")
         return (events, noncess)
 
     # Note: public keys may be extended to several
@@ -380,7 +681,7 @@ class Oracle:
 
     # TODO: such operational data should be moved out of code, into config/DB
     def initialize_with_default_data(self, public_key):
-        self.db.delete_all_contents()
+        self.delete_all_contents()
         self.db.print_stats()
         now = round(datetime.now(UTC).timestamp())
 
@@ -444,6 +745,21 @@ class Oracle:
         # No nonces, generate now!
         return self.generate_and_insert_nonces(event)
 
+    # Nonces of several events, by event ID. Missing ones are generated (in one batch) and inserted
+    def get_nonces_multi(self, events: list[Event]) -> dict[str, list[Nonce]]:
+        noncess = self.db.nonces_get_by_ids(list(map(lambda e: e.dto.event_id, events)))
+        missing = list(filter(lambda e: len(noncess.get(e.dto.event_id, [])) == 0, events))
+        if len(missing) == 0:
+            return noncess
+        generated = Nonces.generate_multi(list(map(lambda e: (e.dto.event_id, e.desc.range_digits), missing)))
+        all_nonces = []
+        for e, nonces in zip(missing, generated):
+            assert(len(nonces) > 0)
+            noncess[e.dto.event_id] = nonces
+            all_nonces.extend(nonces)
+        self.db.nonces_insert(all_nonces)
+        return noncess
+
     def get_outcome(self, event_id: str) -> Outcome | None:
         # get outcome (if any)
         outcome_dto = self.db.outcomes_get(event_id)
@@ -458,8 +774,11 @@ class Oracle:
         else:
             outcome = override_outcome
 
+        return self._build_event_info(event, outcome, self.get_nonces(event))
+
+    # Assemble the event info dict, from already loaded parts
+    def _build_event_info(self, event: Event, outcome: Outcome | None, nonces: list[Nonce]) -> dict:
         has_outcome = (outcome is not None)
-        nonces = self.get_nonces(event)
         info = {
             "event_id": event.dto.event_id,
             "time_utc": event.dto.time,
@@ -485,54 +804,207 @@ class Oracle:
             info["digits"] = list(map(lambda di: di.to_info(), outcome.digits))
         return info
 
+    # Event info, served from the cache if present
     def get_event_info(self, event: Event):
-        return self._get_event_info_with_outcome(event, None)
+        eid = event.dto.event_id
+        info = self.event_info_cache.get(eid)
+        if info is not None:
+            return info
+        generation = self.event_info_cache.get_generation()
+        info = self._get_event_info_with_outcome(event, None)
+        self.event_info_cache.put(eid, info, generation)
+        return info
 
+    # Resolved from the event classes, no DB access
     def get_event_obj_by_id(self, event_id: str) -> Event | None:
-        res = self.db.events_get_by_id(event_id)
-        if res is None:
-            return None
-        e_dto, pubkey = res
-        event_class_dto = self.db.event_classes_get_by_id(e_dto.class_id)
-        if event_class_dto is None:
-            # Could not get event class!
-            return None
-        desc = EventClass(event_class_dto).desc
-        return Event(e_dto, desc, event_class_dto.id, pubkey)
+        return self.resolver().resolve(event_id)
+
+    # Get several event objects at once, resolved from the event classes.
+    # Order follows event_ids, missing events are skipped.
+    def get_event_objs_by_ids(self, event_ids: list[str]) -> list[Event]:
+        resolver = self.resolver()
+        events = []
+        for eid in event_ids:
+            e = resolver.resolve(eid)
+            if e is not None:
+                events.append(e)
+        return events
+
+    # Get the infos of several events at once, same as get_event_by_id() for each, but
+    # with a constant number of queries (nonces, outcomes, digit outcomes loaded in bulk).
+    # Missing events are skipped.
+    def get_events_by_ids(self, event_ids: list[str]) -> list[dict]:
+        # Take from cache what's there, load the rest
+        cached = {}
+        for eid in event_ids:
+            info = self.event_info_cache.get(eid)
+            if info is not None:
+                cached[eid] = info
+        if len(cached) < len(event_ids):
+            generation = self.event_info_cache.get_generation()
+            loaded = self._load_event_infos_by_ids(list(filter(lambda eid: eid not in cached, event_ids)))
+            for eid, info in loaded.items():
+                self.event_info_cache.put(eid, info, generation)
+                cached[eid] = info
+        return [cached[eid] for eid in event_ids if eid in cached]
+
+    # Load and build event infos for several events, keyed by event ID
+    def _load_event_infos_by_ids(self, event_ids: list[str]) -> dict[str, dict]:
+        events = self.get_event_objs_by_ids(event_ids)
+        found_ids = list(map(lambda e: e.dto.event_id, events))
+        nonces = self.db.nonces_get_by_ids(found_ids)
+        outcomes = self.db.outcomes_get_by_ids(found_ids)
+        digits = self.db.digitoutcomes_get_by_ids(list(outcomes.keys()))
+        infos = {}
+        for e in events:
+            eid = e.dto.event_id
+            outcome = None
+            if eid in outcomes:
+                outcome = Outcome(outcomes[eid], digits.get(eid, []))
+            if eid in nonces:
+                event_nonces = nonces[eid]
+            else:
+                # No nonces, generate now
+                event_nonces = self.get_nonces(e)
+            infos[eid] = self._build_event_info(e, outcome, event_nonces)
+        return infos
 
     def get_event_by_id(self, event_id: str):
+        info = self.event_info_cache.get(event_id)
+        if info is not None:
+            return info
+        generation = self.event_info_cache.get_generation()
         e = self.get_event_obj_by_id(event_id)
         if e is None:
             return {}
-        return self._get_event_info_with_outcome(e, None)
+        info = self._get_event_info_with_outcome(e, None)
+        self.event_info_cache.put(event_id, info, generation)
+        return info
 
-    # Note: Max count is capped at the hard limit of 100 events, to prevent large responses
-    def get_events_filter(self, start_time: int = 0, end_time = 0, definition: str = None, max_count: int = 100) -> list[dict]:
+    # Event info as a serialized JSON response (with ETag). Responses of settled events (with outcome)
+    # never change, they are serialized once and served from the response store.
+    def get_event_response_by_id(self, event_id: str) -> SerializedResponse:
+        resp = self.event_response_store.get(event_id)
+        if resp is not None:
+            return resp
+        return self.build_event_response_by_id(event_id)
+
+    # Build the serialized response of an event, without looking in the response store first
+    def build_event_response_by_id(self, event_id: str) -> SerializedResponse:
+        info = self.get_event_by_id(event_id)
+        settled = info.get("has_outcome", False)
+        resp = SerializedResponse.new(info, settled)
+        if settled:
+            self.event_response_store.put(event_id, resp)
+        return resp
+
+    # Infos of several events as one serialized JSON list, in the order of the IDs, missing events and
+    # repeated IDs are skipped. See _get_event_bodies_by_ids().
+    def get_events_response_by_ids(self, event_ids: list[str]) -> bytes:
+        event_ids = list(dict.fromkeys(event_ids))
+        bodies = self._get_event_bodies_by_ids(event_ids)
+        return b"[" + b",".join([bodies[eid] for eid in event_ids if eid in bodies]) + b"]"
+
+    # Serialized infos of several events, keyed by event ID, missing events are skipped.
+    # Stored responses of settled events are reused as they are, the rest is loaded in bulk (as in get_events_by_ids()).
+    # Loaded settled ones go to the response store only, not to the info cache as well
+    # (sizing the info is more costly than serializing it). cache: if False, nothing is added to the caches
+    # (for scans, not to evict the hot entries).
+    def _get_event_bodies_by_ids(self, event_ids: list[str], cache: bool = True) -> dict[str, bytes]:
+        bodies = {}
+        infos = {}
+        for eid in event_ids:
+            resp = self.event_response_store.get(eid)
+            if resp is not None:
+                bodies[eid] = resp.body
+                continue
+            info = self.event_info_cache.get(eid)
+            if info is not None:
+                infos[eid] = info
+        missing = list(filter(lambda eid: eid not in bodies and eid not in infos, event_ids))
+        if len(missing) > 0:
+            generation = self.event_info_cache.get_generation()
+            for eid, info in self._load_event_infos_by_ids(missing).items():
+                if cache and not info.get("has_outcome", False):
+                    self.event_info_cache.put(eid, info, generation)
+                infos[eid] = info
+        for eid, info in infos.items():
+            if cache and info.get("has_outcome", False):
+                resp = SerializedResponse.new(info, True)
+                self.event_response_store.put(eid, resp)
+                bodies[eid] = resp.body
+            else:
+                bodies[eid] = json_dumps_bytes(info)
+        return bodies
+
+    # Note: Max count is capped at the hard limit of 100 events, to prevent large responses.
+    # Keyset pagination: the next page is after the last event of a full page, see next_cursor().
+    def get_events_filter(self, start_time: int = 0, end_time = 0, definition: str = None, max_count: int = EVENTS_FILTER_MAX_COUNT, after: str = None) -> list[dict]:
         if definition is not None:
             definition = definition.upper()
-        max_count_hard_limit = 100
-        max_count = min(max_count, max_count_hard_limit)
-        event_ids = self.db.events_get_ids_filter(start_time, end_time, definition, max_count)
-        event_infos = list(map(lambda eid: self.get_event_by_id(eid), event_ids))
-        return event_infos
-
-    # Note: a hard limit of 5000 limit is applied, to prevent very large responses
-    def get_event_ids_filter(self, start_time: int = 0, end_time = 0, definition: str = None) -> list[str]:
+        max_count = min(max_count, EVENTS_FILTER_MAX_COUNT)
+        event_ids = self.resolver().list_event_ids(start_time, end_time, definition, max_count, after)
+        return self.get_events_by_ids(event_ids)
+
+    # Note: a hard limit of 5000 limit is applied, to prevent very large responses.
+    # Keyset pagination: the next page is after the last event of a full page, see next_cursor().
+    def get_event_ids_filter(self, start_time: int = 0, end_time = 0, definition: str = None, after: str = None) -> list[str]:
         if definition is not None:
             definition = definition.upper()
-        return self.db.events_get_ids_filter(start_time, end_time, definition, 5000)
+        return self.resolver().list_event_ids(start_time, end_time, definition, EVENT_IDS_FILTER_MAX_COUNT, after)
+
+    # Whether a pagination cursor is valid (an existing event), None is valid (from the start)
+    def is_valid_cursor(self, after: str | None) -> bool:
+        return after is None or self.resolver().resolve(after) is not None
+
+    # The cursor of the page after a page of event IDs, None if this was the last one
+    def next_cursor(page: list[str], max_count: int) -> str | None:
+        if len(page) < max_count:
+            return None
+        return page[-1]
+
+    # All IDs of events in a time range, one per line, without the count limit. Generated a page at a time
+    def iter_event_ids_ndjson(self, start_time: int = 0, end_time = 0, definition: str = None, after: str = None):
+        if definition is not None:
+            definition = definition.upper()
+        page = []
+        for eid in self.resolver().list_event_ids_iter(start_time, end_time, definition, after):
+            page.append(json_dumps_bytes(eid))
+            if len(page) >= EVENT_IDS_PAGE_SIZE:
+                yield b"\n".join(page) + b"\n"
+                page = []
+        if len(page) > 0:
+            yield b"\n".join(page) + b"\n"
+
+    # All infos of events in a time range, one per line, without the count limit.
+    # Hydrated in bulk a chunk at a time, so the memory use does not grow with the number of events;
+    # served from the caches where possible, but not added to them.
+    def iter_events_ndjson(self, start_time: int = 0, end_time = 0, definition: str = None, after: str = None):
+        if definition is not None:
+            definition = definition.upper()
+        chunk = []
+        for eid in self.resolver().list_event_ids_iter(start_time, end_time, definition, after):
+            chunk.append(eid)
+            if len(chunk) >= EVENTS_STREAM_CHUNK_SIZE:
+                yield self._events_ndjson_chunk(chunk)
+                chunk = []
+        if len(chunk) > 0:
+            yield self._events_ndjson_chunk(chunk)
+
+    def _events_ndjson_chunk(self, event_ids: list[str]) -> bytes:
+        bodies = self._get_event_bodies_by_ids(event_ids, cache=False)
+        return b"".join([bodies[eid] + b"\n" for eid in event_ids if eid in bodies])
 
     # Get the ID of the next event for a definition, after the given time
     def _get_next_event_id_with_time(self, definition: str, abs_time: float) -> int:
-        # In case of multiple classes, try all of them, as we don't know whose time period matches the requested
-        event_classes = self.get_event_classes_by_def(definition)
-        for ec in event_classes:
-            next_event_id = ec.next_event_id(abs_time)
-            # print(f"next_event_id {next_event_id}")
-            if next_event_id is not None:
-                return next_event_id
-        # None found
-        return None
+        if not definition:
+            return None
+        # In case of multiple classes, the earliest of all of them
+        event_ids = self.resolver().list_event_ids(math.ceil(abs_time), 0, definition.upper(), 1)
+        if len(event_ids) == 0:
+            # None found
+            return None
+        return event_ids[0]
 
     # Get the next instance of an event class, after the given time
     def _get_next_event_with_time(self, definition: str, abs_time: float) -> dict:
@@ -555,6 +1027,32 @@ class Oracle:
     def get_price(self, symbol, pref_max_age: float):
         return self.price_source.get_price_info(symbol, pref_max_age=pref_max_age).price
 
+    # Start filling the price history in the background, if enabled
+    def start_price_history_sampling(self):
+        if self.price_history_sample_secs > 0:
+            self.price_source.start_history_sampling(self.price_history_sample_secs)
+
+    # Price for the outcome of an event: from the price history, at the event time, if available.
+    # Otherwise the current price.
+    def get_price_for_event(self, symbol, event_time: int):
+        return self.get_prices_for_events(symbol, [event_time])[event_time]
+
+    # Prices for the outcomes of several events of a symbol, by event time. The current price is fetched
+    # at most once, for the event times not in the price history.
+    def get_prices_for_events(self, symbol, event_times: list[int]) -> dict[int, float]:
+        res = {}
+        current = None
+        for t in event_times:
+            if t in res:
+                continue
+            value = self.price_source.get_price_at(symbol, t, self.outcome_twap_window)
+            if value is None:
+                if current is None:
+                    current = self.get_price(symbol, pref_max_age=15)
+                value = current
+            res[t] = value
+        return res
+
     # Return the number of events modified, and the next time due
     def _create_past_outcomes_time(self, current_time: float, event_too_old_threshold: int = 86400) -> tuple[int, int]:
         cnt = 0
@@ -565,15 +1063,12 @@ class Oracle:
 
         # Filter out VERY old events
         if event_too_old_threshold == 0:
-            events = past_events
+            events = self.get_event_objs_by_ids(past_events)
         else:
             too_old_time = math.ceil(current_time - event_too_old_threshold)
             cnt_too_old = 0
             events = []
-            for eid in past_events:
-                e = self.get_event_obj_by_id(eid)
-                if e is None:
-                    continue
+            for e in self.get_event_objs_by_ids(past_events):
                 if e.dto.time >= too_old_time:
                     events.append(e)
                 else:
@@ -584,81 +1079,188 @@ class Oracle:
         if len(events) == 0:
             return (0, self.db.events_get_earliest_time_without_outcome(current_time))
         print(f"Found {len(events)} past events that need outcome")
-        for e in events:
-            symbol = e.desc.definition
-            value = self.get_price(symbol, pref_max_age=15)
-            try:
-                outcome = Outcome.create(str(value), e.dto.event_id, e.desc, current_time, e.signer_public_key, self.get_nonces(e))
-                self.db.digitoutcomes_insert(e.dto.event_id, outcome.digits)
-                self.db.outcomes_insert(outcome.dto)
-            except Exception as ex:
-                print(f"EXCEPTION while creating outcome, {ex}")
-                # continue
-            cnt += 1
+        created, failed = self._create_outcomes_batch(events, current_time)
+        if len(failed) > 0:
+            print(f"WARNING: Could not create outcomes for {len(failed)} past events")
+        cnt = len(created)
         if cnt == 0:
             return (0, self.db.events_get_earliest_time_without_outcome(current_time))
         print(f"Created outcomes for {cnt} past events")
         self.print_stats()
         return (cnt, self.db.events_get_earliest_time_without_outcome(current_time))
 
+    # Create and store the outcomes of several events, in a batch: grouped by definition, with the price fetched once
+    # per definition, nonces loaded in one query, signed in one call, stored in one transaction.
+    # Return the events whose outcome was created, and those that failed
+    def _create_outcomes_batch(self, events: list[Event], current_time: float) -> tuple[list[Event], list[Event]]:
+        if len(events) == 0:
+            return ([], [])
+        try:
+            noncess = self.get_nonces_multi(events)
+        except Exception as ex:
+            print(f"EXCEPTION while getting nonces for outcomes, {ex}")
+            return ([], events)
+
+        by_definition: dict[str, list[Event]] = {}
+        for e in events:
+            by_definition.setdefault(e.desc.definition, []).append(e)
+        failed = []
+        requests = []
+        request_events = []
+        for definition, def_events in by_definition.items():
+            try:
+                prices = self.get_prices_for_events(definition, list(map(lambda e: e.dto.time, def_events)))
+            except Exception as ex:
+                print(f"EXCEPTION while getting price for outcomes, {definition}, {ex}")
+                failed.extend(def_events)
+                continue
+            for e in def_events:
+                requests.append((str(prices[e.dto.time]), e.dto.event_id, e.desc, e.signer_public_key, noncess.get(e.dto.event_id, [])))
+                request_events.append(e)
+
+        outcomes = []
+        created = []
+        try:
+            outcomes = Outcome.create_multi(requests, current_time)
+            created = request_events
+        except Exception as ex:
+            # Isolate the failing ones
+            print(f"EXCEPTION while creating outcomes, {ex}, retrying one by one")
+            for request, e in zip(requests, request_events):
+                try:
+                    outcomes.extend(Outcome.create_multi([request], current_time))
+                    created.append(e)
+                except Exception as ex1:
+                    print(f"EXCEPTION while creating outcome, {ex1}")
+                    failed.append(e)
+        try:
+            self.db.outcomes_insert_multi(list(map(lambda o: (o.dto, o.digits), outcomes)))
+        except Exception as ex:
+            print(f"EXCEPTION while storing outcomes, {ex}")
+            return ([], failed + created)
+        self._publish_outcomes(created)
+        return (created, failed)
+
+    # Push the committed outcomes to the subscribers of the outcome feed, if any. The infos are loaded back
+    # (in bulk), so they are the same as served by the API, and their responses are stored for the polling clients too.
+    def _publish_outcomes(self, events: list[Event]):
+        if len(events) == 0 or not self.outcome_feed.has_subscribers():
+            return
+        try:
+            bodies = self._get_event_bodies_by_ids(list(map(lambda e: e.dto.event_id, events)))
+            self.outcome_feed.publish([(e.dto.event_id, e.desc.definition, bodies[e.dto.event_id]) for e in events if e.dto.event_id in bodies])
+        except Exception as ex:
+            print(f"EXCEPTION while publishing outcomes, {ex}")
+
+    # Load the deadlines of the events without outcome (not too old) into the scheduler, once
+    def load_outcome_schedule(self, current_time: float, event_too_old_threshold: int = EVENT_TOO_OLD_THRESHOLD):
+        if self.outcome_scheduler.loaded:
+            return
+        from_time = 0 if event_too_old_threshold == 0 else math.ceil(current_time - event_too_old_threshold)
+        entries = self.db.events_get_no_outcome_since(from_time)
+        self.outcome_scheduler.load(entries)
+        print(f"Outcome scheduler loaded, {len(entries)} events without outcome")
+
+    # Keep the scheduler up to date with newly inserted events
+    def schedule_outcomes(self, event_dtos: list[EventDto]):
+        self.outcome_scheduler.add_many(list(map(lambda e: (e.event_id, e.time), event_dtos)))
+
+    # Create the outcomes of the events whose deadline (in the scheduler) has passed.
+    # Return the number of events handled
+    def _create_due_outcomes(self, current_time: float) -> int:
+        due = self.outcome_scheduler.pop_due(current_time)
+        if len(due) == 0:
+            return 0
+        events = self.get_event_objs_by_ids(list(map(lambda et: et[0], due)))
+        # Skip those that got an outcome meanwhile
+        have_outcome = self.db.outcomes_get_by_ids(list(map(lambda e: e.dto.event_id, events)))
+        events = list(filter(lambda e: e.dto.event_id not in have_outcome, events))
+        created, failed = self._create_outcomes_batch(events, current_time)
+        outcome_time = datetime.now(UTC).timestamp()
+        for e in created:
+            self.outcome_scheduler.record_latency(e.dto.time, outcome_time)
+        for e in failed:
+            if current_time - e.dto.time < EVENT_TOO_OLD_THRESHOLD:
+                self.outcome_scheduler.retry(e.dto.event_id, e.dto.time, current_time + OUTCOME_RETRY_SECS)
+        cnt = len(created)
+        if cnt > 0:
+            ls = self.outcome_scheduler.get_latency_stats()
+            print(f"Created outcomes for {cnt} events, time-to-outcome p50 {ls['p50']} s, p99 {ls['p99']} s")
+        return len(due)
+
     def create_past_outcomes(self) -> int:
         now = datetime.now(UTC).timestamp()
         # print("Checking for past outcome generation ...", round(now))
         return self._create_past_outcomes_time(now, event_too_old_threshold=EVENT_TOO_OLD_THRESHOLD)
 
-    # Return the number of events modified, and the next time due
-    def _create_future_events(self, current_time_orig: float, max_count = 10) -> tuple[int, int]:
+    # Extend the events up to the horizon. Per event class, the missing time slots after the latest event are found
+    # with one range query, then events and nonces are generated in bulk and inserted in chunks.
+    # At most max_count events are created (0: no limit).
+    # Return the number of events created, and the earliest next time slot
+    def _create_future_events(self, current_time_orig: float, max_count = 0) -> tuple[int, int]:
+        t_start = time.perf_counter()
         ct = math.floor(current_time_orig)
         horizon = ct + self.horizon_days * 86400
 
         # Go by event classes
+        resolver = self.resolver()
         cnt = 0
         earliest_next_event = 0
-        for ec in self.db.event_classes_get_all():
-            look_from = self.db.events_get_latest_time_for_def(ec.definition)
-            # print(look_from, look_from - ct)
-            if look_from == 0 or look_from is None:
-                look_from = ct
-            _ft, last_time = Oracle.compute_event_time_range(repeat_period=ec.repeat_period, repeat_offset=ec.repeat_offset, start_time=look_from, end_time=horizon)
-            # print(f"Checking range {_ft} -- {last_time}  {last_time - _ft}  {(last_time - _ft)/ec.repeat_period}  {ec.definition}")
-            # Iterate over times, check if event exists
-            t = _ft
-            while t <= last_time:
-                # Check if event exists
-                event_id = Event.event_id_from_class_and_time(ec, t)
-                e = self.db.events_get_by_id(event_id)
-                if e is None:
-                    print(f"Need to generate future event for '{ec.definition}' time {t} {t - ct}")
-                    assert(t % ec.repeat_period == ec.repeat_offset)
-                    # create event, also nonces
-                    try:
-                        ev = Event.new(event_class=EventClass(ec), time=t)
-                        assert(ev is not None)
-                        self.db.events_insert_if_missing(ev.dto, ec.signer_public_key)
-                        nonces = self.generate_and_insert_nonces(ev)
-                        assert(len(nonces) > 0)
-                    except Exception as ex:
-                        print(f"EXCEPTION while creating outcome, {ex}")
-                    cnt+=1
-                    if cnt >= max_count:
-                        break
+        for definition in resolver.get_definitions():
+            for ec in resolver.get_classes(definition):
+                look_from = resolver.latest_time(definition)
+                if look_from == 0 or look_from is None:
+                    look_from = ct
+                if look_from >= horizon:
+                    continue
+                first_time, last_time = Oracle.compute_event_time_range(repeat_period=ec.dto.repeat_period, repeat_offset=ec.dto.repeat_offset, start_time=look_from, end_time=horizon)
+                # Existing ones in the range, normally only the latest
+                existing = set(self.db.events_get_ids_filter(first_time, last_time, definition, 0))
+                missing = list(filter(lambda t: Event.event_id_from_class_and_time(ec.dto, t) not in existing, range(first_time, last_time + 1, ec.dto.repeat_period)))
+                if max_count != 0:
+                    missing = missing[:max_count - cnt]
+                for i in range(0, len(missing), HORIZON_EXTEND_CHUNK_SIZE):
+                    cnt += self._insert_future_events(ec, missing[i:i + HORIZON_EXTEND_CHUNK_SIZE])
+                next = resolver.latest_time(definition) + ec.dto.repeat_period
+                if earliest_next_event == 0:
+                    earliest_next_event = next
                 else:
-                    # this time slot is filled
-                    next = t + ec.repeat_period
-                    if earliest_next_event == 0:
-                        earliest_next_event = next
-                    else:
-                        earliest_next_event = min(earliest_next_event, next)
-                t += ec.repeat_period
-            if cnt >= max_count:
+                    earliest_next_event = min(earliest_next_event, next)
+                if max_count != 0 and cnt >= max_count:
+                    break
+            if max_count != 0 and cnt >= max_count:
                 break
-        # print(f"Future event check done, {cnt}")
         if cnt > 0:
-            print(f"Generated {cnt} new future events")
+            elapsed = time.perf_counter() - t_start
+            print(f"Generated {cnt} new future events, in {round(elapsed, 3)} s, {round(cnt / max(elapsed, 1e-6))} events/s")
             self.print_stats()
         return (cnt, earliest_next_event)
 
-    def create_future_events(self, max_count = 10) -> int:
+    # Create events of a class at the given times, with nonces, in bulk. Return the number of events inserted
+    def _insert_future_events(self, ec: EventClass, times: list[int]) -> int:
+        if len(times) == 0:
+            return 0
+        events = list(map(lambda t: Event.new(event_class=ec, time=t), times))
+        event_dtos = list(map(lambda e: e.dto, events))
+        try:
+            inserted = self.db.events_append_if_missing(event_dtos, ec.dto.signer_public_key)
+        except Exception as ex:
+            print(f"EXCEPTION while creating future events, {ex}")
+            return 0
+        self.event_resolver.extend(ec.dto.definition, times[-1])
+        self.schedule_outcomes(event_dtos)
+        # Nonces; if this fails, they are filled later (see fill_nonces_all())
+        try:
+            all_nonces = []
+            for nonces in Nonces.generate_multi(list(map(lambda e: (e.dto.event_id, e.desc.range_digits), events))):
+                assert(len(nonces) > 0)
+                all_nonces.extend(nonces)
+            self.db.nonces_insert(all_nonces)
+        except Exception as ex:
+            print(f"EXCEPTION while creating nonces for future events, {ex}")
+        return inserted
+
+    def create_future_events(self, max_count = 0) -> int:
         now = datetime.now(UTC).timestamp()
         return self._create_future_events(now, max_count=max_count)
 
@@ -667,16 +1269,19 @@ class Oracle:
         if len(eids) == 0:
             return 0
         # print(f"WARNING: Found at least {len(eids)} events with no nonces! Filling...")
-        cnt = 0
-        for eid in eids:
-            e = self.get_event_obj_by_id(eid)
-            if e is None:
-                continue
-            nonces = self.get_nonces(e)
+        events = self.get_event_objs_by_ids(eids[:max_count])
+        cnt = len(events)
+        # Skip those that got nonces meanwhile (on demand)
+        have_nonces = self.db.nonces_get_by_ids(list(map(lambda e: e.dto.event_id, events)))
+        events = list(filter(lambda e: e.dto.event_id not in have_nonces, events))
+        # Generate in one batch, insert in one transaction
+        noncess = Nonces.generate_multi(list(map(lambda e: (e.dto.event_id, e.desc.range_digits), events)))
+        all_nonces = []
+        for nonces in noncess:
             assert(len(nonces) > 0)
-            cnt += 1
-            if cnt >= max_count:
-                break
+            all_nonces.extend(nonces)
+        if len(all_nonces) > 0:
+            self.db.nonces_insert(all_nonces)
         if cnt > 0:
             print(f"Touched nonces for {cnt} events...")
             self.db.print_stats()
@@ -702,39 +1307,34 @@ class Oracle:
     #         return {}
 
     # Continuously check for:
-    # - events that has just became due and outcome is needed
-    # - new events that need to be generated at the expanding horizon
+    # - events that has just became due and outcome is needed: sleeps until the earliest deadline in the outcome scheduler
+    # - new events that need to be generated at the expanding horizon: periodically
     def check_outcome_loop(self, early_exit = False):
         print("check_outcome_loop started", round(datetime.now(UTC).timestamp()))
+        self.load_outcome_schedule(datetime.now(UTC).timestamp())
+        next_horizon_check = 0
         while True:
-            cnt, next1 = self.create_past_outcomes()
+            now = datetime.now(UTC).timestamp()
+            cnt = self._create_due_outcomes(now)
             if cnt > 0:
                 continue
 
-            cnt, next2 = self.create_future_events(10)
-            if cnt > 0:
-                continue
+            if now >= next_horizon_check:
+                cnt = self.create_future_events()[0]
+                if cnt > 0:
+                    continue
+                next_horizon_check = now + HORIZON_CHECK_PERIOD_SECS
 
             if early_exit:
                 print("check_outcome_loop: all is fine, exiting")
                 break
 
-            # Wait some
-            next = next1
-            if next == 0:
-                next = next2
-            else:
-                if next2 != 0 and next2 < next:
-                    next = next2
-            # print(next1, next2, next)
-            now = datetime.now(UTC).timestamp()
-            towait_unbound = (next - now) / 2 - 1
-            towait = min(max(towait_unbound, 0.01), 60)
-            # print(next1, next2, next, now, towait_unbound, towait)
-            if towait > 0.5:
-                print(f"Sleeping for {round(towait, 3)} s (of {round(towait_unbound, 1)}) ...")
-            time.sleep(towait)
-            # print(" ")
+            # Wait until the earliest deadline (a new earlier one wakes it up), or the next horizon check
+            wake_time = next_horizon_check
+            next_deadline = self.outcome_scheduler.next_deadline()
+            if next_deadline is not None:
+                wake_time = min(wake_time, next_deadline)
+            self.outcome_scheduler.wait(wake_time - now)
 
 
     # Fill all event nonces, some may be missing (deferred)
@@ -774,6 +1374,7 @@ class OracleApp:
         if not _outcome_loop_thread_started:
             _thread.start_new(outcome_loop_thread, (app.oracle,))
             _thread.start_new(nonce_loop_thread, (app.oracle,))
+            app.oracle.start_price_history_sampling()
         return app
 
     def get_oracle(self):
@@ -801,6 +1402,10 @@ class OracleApp:
             res[symbol] = info
         return res
 
+    # Counters of the price fetching: requests, coalesced requests, prefetches
+    def get_price_stats(self):
+        return self.oracle.price_source.get_stats()
+
 def outcome_loop_thread(oracle):
     global _outcome_loop_thread_started
     _outcome_loop_thread_started = True
@@ -0,0 +1,160 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+from db_pool import DB_POOL_MAX_RO_DEFAULT
+from oracle import EVENTS_FILTER_MAX_COUNT, OracleApp
+from outcome_feed import OutcomeSubscription
+from response_cache import SerializedResponse
+
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+
+# Preferred max age of the prices served by the API
+API_PRICE_PREF_MAX_AGE_SECS: float = 60
+# Heartbeat interval of idle outcome streams, keeps proxies from closing them, and detects gone clients
+OUTCOME_STREAM_HEARTBEAT_SECS: float = 15
+
+
+class AsyncOracle:
+    """
+    Async facade over the oracle app, for the async API handlers.
+    Calls reading the DB run on a small fixed pool of reader threads, by default as many as
+    read-only DB connections, so a reader never waits for a connection and the event loop is never blocked.
+    Calls served from memory (oracle info, stored responses, stats) run directly on the loop.
+    Price reads await the price fetcher (or its caches), which runs on its own loop.
+    New outcomes are pushed to streams from the outcome feed, see iter_outcomes_sse().
+    """
+
+    def __init__(self, app: OracleApp, reader_count: int = 0):
+        self.app = app
+        if reader_count <= 0:
+            reader_count = int(os.getenv("API_DB_READERS", os.getenv("DB_POOL_MAX_RO", DB_POOL_MAX_RO_DEFAULT)))
+        self.reader_count = max(1, reader_count)
+        self._executor = ThreadPoolExecutor(max_workers=self.reader_count, thread_name_prefix="db-reader")
+        # Updated only from the event loop
+        self.read_count = 0
+        self.direct_count = 0
+
+    # Run a (blocking) DB-reading call on a reader thread
+    async def _read(self, fn, *args):
+        self.read_count += 1
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def get_oracle_info(self):
+        self.direct_count += 1
+        return self.app.oracle.get_oracle_info()
+
+    async def get_oracle_status(self):
+        return await self._read(self.app.oracle.get_oracle_status)
+
+    def get_event_info_cache_stats(self) -> dict:
+        self.direct_count += 1
+        stats = self.app.oracle.get_event_info_cache_stats()
+        stats["api"] = self.get_stats()
+        stats["outcome_feed"] = self.app.oracle.outcome_feed.get_stats()
+        return stats
+
+    # Stored (settled) responses are served on the loop, others are built by a reader
+    async def get_event_response_by_id(self, event_id: str) -> SerializedResponse:
+        oracle = self.app.oracle
+        resp = oracle.event_response_store.get(event_id)
+        if resp is not None:
+            self.direct_count += 1
+            return resp
+        return await self._read(oracle.build_event_response_by_id, event_id)
+
+    async def get_events_response_by_ids(self, event_ids: list[str]) -> bytes:
+        return await self._read(self.app.oracle.get_events_response_by_ids, event_ids)
+
+    async def get_events_filter(self, start_time: int = 0, end_time: int = 0, definition: str = None, after: str = None) -> list[dict]:
+        return await self._read(self.app.oracle.get_events_filter, start_time, end_time, definition, EVENTS_FILTER_MAX_COUNT, after)
+
+    async def get_event_ids_filter(self, start_time: int = 0, end_time: int = 0, definition: str = None, after: str = None) -> list[str]:
+        return await self._read(self.app.oracle.get_event_ids_filter, start_time, end_time, definition, after)
+
+    async def is_valid_cursor(self, after: str | None) -> bool:
+        if after is None:
+            return True
+        return await self._read(self.app.oracle.is_valid_cursor, after)
+
+    # Streamed listings: each chunk is produced on a reader thread
+    async def iter_event_ids_ndjson(self, start_time: int = 0, end_time: int = 0, definition: str = None, after: str = None):
+        async for chunk in self._iter_read(self.app.oracle.iter_event_ids_ndjson(start_time, end_time, definition, after)):
+            yield chunk
+
+    async def iter_events_ndjson(self, start_time: int = 0, end_time: int = 0, definition: str = None, after: str = None):
+        async for chunk in self._iter_read(self.app.oracle.iter_events_ndjson(start_time, end_time, definition, after)):
+            yield chunk
+
+    # Iterate a (blocking) generator, advancing it on a reader thread.
+    # If the client goes away, the generator is left to the garbage collector, a step may still be running.
+    async def _iter_read(self, gen):
+        while True:
+            chunk = await self._read(next, gen, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    async def get_event_classes(self):
+        return await self._read(self.app.oracle.get_event_classes)
+
+    async def get_next_event(self, definition: str, period: int = 60) -> dict:
+        return await self._read(self.app.oracle.get_next_event, definition, period)
+
+    # Subscribe to new outcomes, of a definition and/or some events (None: all). None if there are too many subscribers
+    def subscribe_outcomes(self, definition: str | None = None, event_ids: list[str] | None = None) -> OutcomeSubscription | None:
+        if definition is not None:
+            definition = definition.upper()
+        return self.app.oracle.outcome_feed.subscribe(definition, event_ids)
+
+    # Server-Sent Events stream of the outcomes of a subscription: an "outcome" event with the event info
+    # (as served by the event endpoint) per outcome, a comment as heartbeat when idle.
+    # On overflow (the client is too slow) an "overflow" event ends the stream. Unsubscribes at the end.
+    async def iter_outcomes_sse(self, sub: OutcomeSubscription):
+        try:
+            # Sent right away, the client knows it is subscribed
+            yield b": subscribed\n\n"
+            while True:
+                items = await sub.get(OUTCOME_STREAM_HEARTBEAT_SECS)
+                if items is None:
+                    yield b"event: overflow\ndata: {}\n\n"
+                    return
+                if len(items) == 0:
+                    yield b": keepalive\n\n"
+                    continue
+                yield b"".join(map(lambda item: b"id: " + item[0].encode() + b"\nevent: outcome\ndata: " + item[1] + b"\n\n", items))
+        finally:
+            self.app.oracle.outcome_feed.unsubscribe(sub)
+
+    async def get_current_price_info(self, symbol: str):
+        return await self.app.oracle.price_source.get_price_info_async(symbol, pref_max_age=API_PRICE_PREF_MAX_AGE_SECS)
+
+    async def get_current_price(self, symbol: str):
+        info = await self.get_current_price_info(symbol)
+        return info.price
+
+    # All symbols, fetched concurrently
+    async def get_current_price_infos(self) -> dict:
+        symbols = self.app.oracle.price_source.get_symbols()
+        infos = await asyncio.gather(*map(lambda symbol: self.get_current_price_info(symbol), symbols))
+        return dict(zip(symbols, infos))
+
+    async def get_current_prices(self) -> dict:
+        infos = await self.get_current_price_infos()
+        return dict(map(lambda kv: (kv[0], kv[1].price), infos.items()))
+
+    def get_price_stats(self):
+        self.direct_count += 1
+        return self.app.get_price_stats()
+
+    def get_stats(self) -> dict:
+        return {
+            "readers": self.reader_count,
+            "reads": self.read_count,
+            "direct": self.direct_count,
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,166 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+from collections import deque
+import asyncio
+import threading
+
+# Max number of outcomes queued for one subscriber; a subscriber falling further behind is dropped
+OUTCOME_FEED_QUEUE_MAX_DEFAULT: int = 1000
+OUTCOME_FEED_MAX_SUBSCRIBERS_DEFAULT: int = 10000
+
+
+class OutcomeSubscription:
+    """
+    One subscriber of the outcome feed: a bounded queue of (event ID, serialized info) items, filled by the publisher
+    (any thread), consumed by a coroutine on the given event loop, see get().
+    If the queue overflows, the subscription is closed as overflowed (backpressure: a slow consumer
+    is dropped instead of buffering without bound or slowing down the publisher), the client can reconnect
+    and catch up from the event listing.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue_max: int, definition: str | None, event_ids: set[str] | None):
+        self._loop = loop
+        self.queue_max = queue_max
+        # Filters, None: all
+        self.definition = definition
+        self.event_ids = event_ids
+        self._queue: deque[tuple[str, bytes]] = deque()
+        self._lock = threading.Lock()
+        # Set (on the loop) when there is something to get
+        self._event = asyncio.Event()
+        self._wake_pending = False
+        self.overflowed = False
+        self.closed = False
+
+    def matches(self, event_id: str, definition: str) -> bool:
+        if self.definition is not None and self.definition != definition:
+            return False
+        if self.event_ids is not None and event_id not in self.event_ids:
+            return False
+        return True
+
+    # Queue items, from any thread. Returns False if the subscription is closed (or has just overflowed)
+    def put(self, items: list[tuple[str, bytes]]) -> bool:
+        with self._lock:
+            if self.closed:
+                return False
+            if len(self._queue) + len(items) > self.queue_max:
+                self.overflowed = True
+                self.closed = True
+                self._queue.clear()
+            else:
+                self._queue.extend(items)
+            # At most one wake-up outstanding
+            wake = not self._wake_pending
+            self._wake_pending = True
+        if wake:
+            try:
+                self._loop.call_soon_threadsafe(self._wake)
+            except RuntimeError:
+                # The loop is closed, the consumer is gone
+                self.close()
+                return False
+        return not self.closed
+
+    # On the loop
+    def _wake(self):
+        with self._lock:
+            self._wake_pending = False
+        self._event.set()
+
+    # Wait for queued items, at most timeout seconds. Returns all queued items, or [] on timeout.
+    # None if the subscription is closed (e.g. overflowed). Call on the loop of the subscription.
+    async def get(self, timeout: float) -> list[tuple[str, bytes]] | None:
+        with self._lock:
+            if len(self._queue) > 0:
+                items = list(self._queue)
+                self._queue.clear()
+                return items
+            if self.closed:
+                return None
+        # Wake-ups are run on this loop, none can be missed between the check above and the clear
+        self._event.clear()
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        return await self.get(0)
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            self._queue.clear()
+
+
+class OutcomeFeed:
+    """
+    Fan-out of newly created (committed) outcomes to subscribers, e.g. Server-Sent Event streams.
+    The outcomes are published serialized, once, and queued to each matching subscriber.
+    Thread-safe.
+    """
+
+    def __init__(self, queue_max: int = OUTCOME_FEED_QUEUE_MAX_DEFAULT, max_subscribers: int = OUTCOME_FEED_MAX_SUBSCRIBERS_DEFAULT):
+        self.queue_max = queue_max
+        self.max_subscribers = max_subscribers
+        self._subscribers: set[OutcomeSubscription] = set()
+        self._lock = threading.Lock()
+        self.published_count = 0
+        self.delivered_count = 0
+        self.overflow_count = 0
+
+    def has_subscribers(self) -> bool:
+        with self._lock:
+            return len(self._subscribers) > 0
+
+    # Subscribe, to be consumed on the current event loop. Definition: upper case. None if there are too many subscribers
+    def subscribe(self, definition: str | None = None, event_ids: list[str] | None = None) -> OutcomeSubscription | None:
+        sub = OutcomeSubscription(asyncio.get_running_loop(), self.queue_max, definition, None if event_ids is None else set(event_ids))
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: OutcomeSubscription):
+        sub.close()
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    # Publish outcomes, as (event_id, definition, serialized info) tuples, to the matching subscribers
+    def publish(self, items: list[tuple[str, str, bytes]]):
+        if len(items) == 0:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.published_count += len(items)
+        delivered = 0
+        closed = []
+        for sub in subscribers:
+            matching = [(event_id, body) for event_id, definition, body in items if sub.matches(event_id, definition)]
+            if len(matching) == 0:
+                continue
+            if sub.put(matching):
+                delivered += len(matching)
+            else:
+                # Overflowed, or its loop is gone
+                closed.append(sub)
+        with self._lock:
+            self.delivered_count += delivered
+            for sub in closed:
+                if sub in self._subscribers:
+                    self._subscribers.discard(sub)
+                    if sub.overflowed:
+                        self.overflow_count += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "max_subscribers": self.max_subscribers,
+                "queue_max": self.queue_max,
+                "published": self.published_count,
+                "delivered": self.delivered_count,
+                "overflows": self.overflow_count,
+            }
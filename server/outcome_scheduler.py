@@ -0,0 +1,178 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+from collections import deque
+import heapq
+import threading
+
+# Delay after the event time before the outcome is created, to let the price at the event time settle
+OUTCOME_SETTLE_SECS_DEFAULT: float = 2
+# Delay before retrying an outcome that could not be created
+OUTCOME_RETRY_SECS: float = 10
+# Number of recent time-to-outcome measurements kept for the percentiles
+OUTCOME_LATENCY_WINDOW: int = 1000
+
+
+class OutcomeScheduler:
+    """
+    Upcoming outcome deadlines of the events without outcome, in a min-heap.
+    The deadline of an event is its time plus the settle delay (or later, for a retry).
+    Loaded once from the storage, then kept up to date: new events are added, due ones are popped.
+    The outcome loop sleeps until the earliest deadline, see wait(); adding an earlier deadline wakes it up.
+    Also keeps time-to-outcome measurements (outcome creation time minus event time).
+    Thread-safe.
+    """
+
+    def __init__(self, settle_secs: float = OUTCOME_SETTLE_SECS_DEFAULT, latency_window: int = OUTCOME_LATENCY_WINDOW):
+        self.settle_secs = settle_secs
+        # (deadline, event_id, event_time)
+        self._heap: list[tuple[float, str, int]] = []
+        # Current deadline of each scheduled event, heap entries not matching it are stale (lazy removal)
+        self._deadlines: dict[str, float] = {}
+        self._cond = threading.Condition()
+        self._latencies: deque[float] = deque(maxlen=latency_window)
+        self.loaded = False
+        self.popped_count = 0
+        self.wakeup_count = 0
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._deadlines)
+
+    # Add the events (event_id, event_time) loaded from the storage, and mark as loaded
+    def load(self, entries: list[tuple[str, int]]):
+        with self._cond:
+            for event_id, event_time in entries:
+                self._add_locked(event_id, event_time, 0)
+            # Compact, dropping stale entries
+            self._heap = list(map(lambda kv: (kv[1][0], kv[0], kv[1][1]), self._entries_locked().items()))
+            heapq.heapify(self._heap)
+            self.loaded = True
+            self._cond.notify_all()
+
+    # Drop all scheduled events and mark as not loaded, e.g. after the storage contents are deleted.
+    # The same instance is kept, the outcome loop may be waiting on it
+    def clear(self):
+        with self._cond:
+            self._heap = []
+            self._deadlines = {}
+            self.loaded = False
+            self._cond.notify_all()
+
+    # Schedule an event, not earlier than not_before. Returns False if it is already scheduled
+    def add(self, event_id: str, event_time: int, not_before: float = 0) -> bool:
+        with self._cond:
+            return self._add_locked(event_id, event_time, not_before)
+
+    def add_many(self, entries: list[tuple[str, int]]) -> int:
+        cnt = 0
+        with self._cond:
+            for event_id, event_time in entries:
+                if self._add_locked(event_id, event_time, 0):
+                    cnt += 1
+        return cnt
+
+    # Reschedule a popped event for a retry, at not_before
+    def retry(self, event_id: str, event_time: int, not_before: float):
+        with self._cond:
+            self._deadlines.pop(event_id, None)
+            self._add_locked(event_id, event_time, not_before)
+
+    def remove(self, event_id: str):
+        with self._cond:
+            self._deadlines.pop(event_id, None)
+
+    # The lock must be held
+    def _add_locked(self, event_id: str, event_time: int, not_before: float) -> bool:
+        if event_id in self._deadlines:
+            return False
+        deadline = max(event_time + self.settle_secs, not_before)
+        self._deadlines[event_id] = deadline
+        earliest = self._peek_locked()
+        heapq.heappush(self._heap, (deadline, event_id, event_time))
+        if earliest is None or deadline < earliest[0]:
+            # The new deadline is the earliest, wake up the waiter to sleep less
+            self._cond.notify_all()
+        return True
+
+    # The earliest valid heap entry, stale ones are dropped. The lock must be held
+    def _peek_locked(self) -> tuple[float, str, int] | None:
+        while len(self._heap) > 0:
+            deadline, event_id, _t = self._heap[0]
+            if self._deadlines.get(event_id) == deadline:
+                return self._heap[0]
+            heapq.heappop(self._heap)
+        return None
+
+    # Valid entries, as event_id -> (deadline, event_time). The lock must be held
+    def _entries_locked(self) -> dict[str, tuple[float, int]]:
+        res = {}
+        for deadline, event_id, event_time in self._heap:
+            if self._deadlines.get(event_id) == deadline:
+                res[event_id] = (deadline, event_time)
+        return res
+
+    # The earliest deadline, or None if nothing is scheduled
+    def next_deadline(self) -> float | None:
+        with self._cond:
+            e = self._peek_locked()
+            return None if e is None else e[0]
+
+    # Remove and return the events (event_id, event_time) whose deadline has passed, earliest first
+    def pop_due(self, now: float, max_count: int = 0) -> list[tuple[str, int]]:
+        res = []
+        with self._cond:
+            while max_count == 0 or len(res) < max_count:
+                e = self._peek_locked()
+                if e is None or e[0] > now:
+                    break
+                heapq.heappop(self._heap)
+                del self._deadlines[e[1]]
+                res.append((e[1], e[2]))
+            self.popped_count += len(res)
+        return res
+
+    # Sleep at most timeout seconds; returns earlier if an earlier deadline is added, or on wake()
+    def wait(self, timeout: float):
+        if timeout <= 0:
+            return
+        with self._cond:
+            self._cond.wait(timeout)
+            self.wakeup_count += 1
+
+    def wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def record_latency(self, event_time: float, outcome_time: float):
+        with self._cond:
+            self._latencies.append(outcome_time - event_time)
+
+    # Percentiles of the recent time-to-outcome measurements, in seconds
+    def get_latency_stats(self) -> dict:
+        with self._cond:
+            lat = sorted(self._latencies)
+        if len(lat) == 0:
+            return {"count": 0, "p50": 0, "p90": 0, "p99": 0, "max": 0}
+
+        def percentile(p: float) -> float:
+            return round(lat[min(len(lat) - 1, int(p / 100 * len(lat)))], 3)
+        return {
+            "count": len(lat),
+            "p50": percentile(50),
+            "p90": percentile(90),
+            "p99": percentile(99),
+            "max": round(lat[-1], 3),
+        }
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            e = self._peek_locked()
+            return {
+                "scheduled": len(self._deadlines),
+                "heap": len(self._heap),
+                "next_deadline": None if e is None else e[0],
+                "popped": self.popped_count,
+                "wakeups": self.wakeup_count,
+            }
@@ -5,9 +5,13 @@
 from price_common import PriceInfo, PriceInfoSingle
 from price_binance import BinancePriceSource
 from price_bitstamp import BitstampPriceSource
+from price_fetcher import AsyncPriceFetcher
+from price_history import PriceHistory, PRICE_HISTORY_SAMPLE_SECS_DEFAULT
 from price_kraken import KrakenPriceSource
+from price_stream import TickerStream
 
 from datetime import datetime, UTC
+import asyncio
 import threading;
 
 PREFETCH_MIN_ACCEPTED_AGE_SECS: int = 15
@@ -15,11 +19,34 @@ PREFETCH_PREF_MAX_AGE_SECS: int = 2
 
 # Can provide current price infos
 class PriceSource:
-    def __init__(self):
-        self.bitstamp_source = BitstampPriceSource()
-        # binance_global_source = BinancePriceSource(True)
-        self.binance_us_source = BinancePriceSource(False)
-        self.kraken_source = KrakenPriceSource()
+    # sources_override: for testing, a function creating the sources with the given fetcher
+    def __init__(self, fetcher: AsyncPriceFetcher | None = None, sources_override = None):
+        # All sources share one fetcher (event loop, connection pools)
+        self.fetcher = fetcher if fetcher is not None else AsyncPriceFetcher()
+        if sources_override is not None:
+            self.sources = sources_override(self.fetcher)
+        else:
+            self.bitstamp_source = BitstampPriceSource(self.fetcher)
+            # binance_global_source = BinancePriceSource(True, self.fetcher)
+            self.binance_us_source = BinancePriceSource(False, self.fetcher)
+            self.kraken_source = KrakenPriceSource(self.fetcher)
+            self.sources = [
+                self.bitstamp_source,
+                self.binance_us_source,
+                self.kraken_source,
+                # self.binance_global_source,
+            ]
+        # Symbols with a background prefetch outstanding, at most one per symbol
+        self._prefetching: set[str] = set()
+        self._prefetch_lock = threading.Lock()
+        self.prefetch_started_count = 0
+        self.prefetch_skipped_count = 0
+        # Ticker streams, by source ID, if streaming is on
+        self.streams: dict[str, TickerStream] = {}
+        # Recent aggregated prices, filled by the sampler (see start_history_sampling())
+        self.history = PriceHistory()
+        self._sampling = False
+        self._sampling_future = None
 
     def get_symbols(self) -> list[str]:
         return ["BTCUSD", "BTCEUR"]
@@ -27,55 +54,128 @@ class PriceSource:
     # Return current price (info).
     def get_price_info(self, symbol: str, pref_max_age: float = 0) -> PriceInfo:
         price_info = self.get_price_info_internal(symbol, pref_max_age)
+        self._prefetch_if_old(symbol, price_info, pref_max_age)
+        return price_info
+
+    # Async version of get_price_info(), for coroutines on another event loop (e.g. the API server's):
+    # the fetch runs on the fetcher loop, the caller awaits it without blocking a thread
+    async def get_price_info_async(self, symbol: str, pref_max_age: float = 0) -> PriceInfo:
+        future = self.fetcher.run_background(self.get_price_info_internal_async(symbol, pref_max_age))
+        # Each request has its own deadline, this is only a safety net
+        price_info = await asyncio.wait_for(asyncio.wrap_future(future), self.fetcher.timeout + 1)
+        self._prefetch_if_old(symbol, price_info, pref_max_age)
+        return price_info
 
-        # Optional pre-fetch: if current info is old (but acceptable), start fetch in background
+    # Optional pre-fetch: if current info is old (but acceptable), start fetch in background
+    def _prefetch_if_old(self, symbol: str, price_info: PriceInfo, pref_max_age: float):
         now = datetime.now(UTC).timestamp()
         age = now - price_info.retrieve_time
         # print(f"Age: {age}")
         if age > max(PREFETCH_MIN_ACCEPTED_AGE_SECS, pref_max_age / 2):
-            th1 = threading.Thread(target=self._bg_prefetch, args=(symbol,))
-            th1.start() # fire and forget
+            self._start_prefetch(symbol)
 
-        return price_info
+    # Start a prefetch in the background (fire and forget), unless one is already outstanding for the symbol
+    def _start_prefetch(self, symbol: str):
+        symbol = symbol.upper()
+        with self._prefetch_lock:
+            if symbol in self._prefetching:
+                self.prefetch_skipped_count += 1
+                return
+            self._prefetching.add(symbol)
+            self.prefetch_started_count += 1
+        self.fetcher.run_background(self._bg_prefetch(symbol))
+
+    def get_stats(self) -> dict:
+        stats = self.fetcher.get_stats()
+        with self._prefetch_lock:
+            stats["prefetch_started"] = self.prefetch_started_count
+            stats["prefetch_skipped"] = self.prefetch_skipped_count
+            stats["prefetch_outstanding"] = len(self._prefetching)
+        stats["streams"] = dict(map(lambda kv: (kv[0], kv[1].get_stats()), self.streams.items()))
+        stats["history"] = self.history.get_stats()
+        return stats
+
+    # Start streaming mode: a WebSocket ticker consumer per source, prices are served from the streamed
+    # last prices while fresh, REST is the fallback. url_overrides: stream URLs by source ID (for testing)
+    def start_streaming(self, url_overrides: dict[str, str] = {}):
+        for src in self.sources:
+            if src.source_id in self.streams or not hasattr(src, "ws_url"):
+                continue
+            stream = TickerStream(src, self.get_symbols(), url_overrides.get(src.source_id))
+            self.streams[src.source_id] = stream
+            src.stream_book = stream.book
+            self.fetcher.run_background(stream.run())
+        print(f"Price streaming started, {len(self.streams)} streams")
+
+    # Start sampling the aggregated price of all symbols into the history, in the background
+    def start_history_sampling(self, interval: float = PRICE_HISTORY_SAMPLE_SECS_DEFAULT):
+        if self._sampling:
+            return
+        self._sampling = True
+        self._sampling_future = self.fetcher.run_background(self._sample_history_loop(interval))
+        print(f"Price history sampling started, interval {interval} s, capacity {self.history.capacity}")
+
+    def stop_history_sampling(self):
+        self._sampling = False
+        if self._sampling_future is not None:
+            self._sampling_future.cancel()
+            self._sampling_future = None
+
+    async def _sample_history_loop(self, interval: float):
+        while self._sampling:
+            for symbol in self.get_symbols():
+                await self._sample_history(symbol, interval)
+            await asyncio.sleep(interval)
+
+    async def _sample_history(self, symbol: str, interval: float):
+        try:
+            pi = await self.get_price_info_internal_async(symbol, pref_max_age=interval)
+            if pi.error is None and pi.price > 0:
+                self.history.record(symbol, pi.retrieve_time, pi.price)
+        except Exception as ex:
+            print(f"Price history sampling error, {symbol}, {ex}")
+
+    # Price at a given (recent) time, from the history: nearest tick, or TWAP over the window before the time.
+    # None if not available.
+    def get_price_at(self, symbol: str, time: float, twap_window: float = 0) -> float | None:
+        return self.history.get_price_at(symbol, time, twap_window)
+
+    def stop_streaming(self):
+        for src in self.sources:
+            if src.source_id in self.streams:
+                src.stream_book = None
+                self.fetcher.run(self.streams[src.source_id].stop())
+        self.streams = {}
 
+    # Sync wrapper of get_price_info_internal_async(), runs it on the fetcher loop
     def get_price_info_internal(self, symbol: str, pref_max_age: float = 0) -> PriceInfo:
+        # Each request has its own deadline, this is only a safety net
+        return self.fetcher.run(self.get_price_info_internal_async(symbol, pref_max_age), timeout=self.fetcher.timeout + 1)
+
+    async def get_price_info_internal_async(self, symbol: str, pref_max_age: float = 0) -> PriceInfo:
         symbol = symbol.upper()
 
-        # Invoke in parallel
-        sources = [
-            self.bitstamp_source,
-            self.binance_us_source,
-            self.kraken_source,
-            # price_infos.append(self.binance_global_source.get_price_info(symbol, preferred_time))
-        ]
-        n = len(sources)
-        thids = []
-        price_infos = [None] * n
-        for i in range(n):
-            th = threading.Thread(target=self._bg_get_price, args=(sources[i], symbol, pref_max_age, price_infos, i))
-            thids.append(th)
-            th.start()
-        # Wait for all
-        for i in range(n):
-            thids[i].join()
+        # Invoke all sources concurrently
+        price_infos = await asyncio.gather(*map(lambda src: self._get_price_from_source(src, symbol, pref_max_age), self.sources))
 
         # Aggregate info from multiple sources
-        price_info = PriceSource.aggregate_infos(price_infos, symbol)
+        price_info = PriceSource.aggregate_infos(list(price_infos), symbol)
         return price_info
 
-    def _bg_get_price(self, price_source, symbol, pref_max_age, result_arr, index):
+    async def _get_price_from_source(self, price_source, symbol, pref_max_age) -> PriceInfoSingle:
         try:
-            price_info = price_source.get_price_info(symbol, pref_max_age)
+            return await price_source.get_price_info_async(symbol, pref_max_age)
         except Exception as ex:
             now = datetime.now(UTC).timestamp()
-            price_info = PriceInfoSingle.create_with_error(symbol, now, self.source_id, f"Exception while getting price {ex}")
-        result_arr[index] = price_info
-        # print(index, len(result_arr), result_arr[index])
-        return
+            return PriceInfoSingle.create_with_error(symbol, now, price_source.source_id, f"Exception while getting price {ex}")
 
-    def _bg_prefetch(self, symbol):
+    async def _bg_prefetch(self, symbol: str):
         # print(f"Prefetch in background ...")
-        _pi = self.get_price_info_internal(symbol, pref_max_age=PREFETCH_PREF_MAX_AGE_SECS)
+        try:
+            _pi = await self.get_price_info_internal_async(symbol, pref_max_age=PREFETCH_PREF_MAX_AGE_SECS)
+        finally:
+            with self._prefetch_lock:
+                self._prefetching.discard(symbol)
         # now = datetime.now(UTC).timestamp()
         # age = now - _pi.retrieve_time
         # print(f"Prefetch in background: age {age}  {_pi.price}")
@@ -3,9 +3,10 @@
 # file COPYING or http://www.opensource.org/licenses/mit-license.php.
 
 from price_common import PriceInfoSingle
+from price_fetcher import AsyncPriceFetcher, get_shared_fetcher
+from price_stream import LastPriceBook, PRICE_STREAM_MAX_AGE_SECS
 
 from datetime import datetime, UTC
-import requests
 
 DEFAULT_MAX_AGE_SECS: int = 15
 MIN_PREF_MAX_AGE_SECS: int = 5
@@ -20,7 +21,7 @@ class BinancePriceSource:
     source_id = "Binance_set_later"
     cache = {}
 
-    def __init__(self, global_or_us: bool):
+    def __init__(self, global_or_us: bool, fetcher: AsyncPriceFetcher | None = None, url_root_override: str | None = None):
         self.global_or_us = global_or_us
         if global_or_us:
             self.host = "api3.binance.com"
@@ -29,15 +30,34 @@ class BinancePriceSource:
             self.host = "api.binance.us"
             self.source_id = "BinanceUS"
         self.url_root = "https://" + self.host + "/api/v3/ticker/price?symbol="
+        # Streaming, see price_stream
+        if global_or_us:
+            self.ws_url = "wss://stream.binance.com:9443/ws"
+        else:
+            self.ws_url = "wss://stream.binance.us:9443/ws"
+        self.stream_book: LastPriceBook | None = None
+        if url_root_override is not None:
+            self.url_root = url_root_override
+        self.fetcher = fetcher if fetcher is not None else get_shared_fetcher()
         self.cache = {}
         print("Binance price source initialized,", self.global_or_us, "host", self.host, "src", self.source_id, "url", self.url_root)
 
-    def get_price_info(self, symbol: str, pref_max_age: float = 0) -> float:
+    # Sync wrapper of get_price_info_async()
+    def get_price_info(self, symbol: str, pref_max_age: float = 0) -> PriceInfoSingle:
+        return self.fetcher.run(self.get_price_info_async(symbol, pref_max_age))
+
+    async def get_price_info_async(self, symbol: str, pref_max_age: float = 0) -> PriceInfoSingle:
         now = datetime.now(UTC).timestamp()
         if pref_max_age == 0:
             pref_max_age = DEFAULT_MAX_AGE_SECS
         pref_max_age = max(pref_max_age, MIN_PREF_MAX_AGE_SECS)
 
+        # Streamed price, if streaming and fresh enough
+        if self.stream_book is not None:
+            streamed = self.stream_book.get(symbol.upper(), min(pref_max_age, PRICE_STREAM_MAX_AGE_SECS))
+            if streamed is not None:
+                return streamed
+
         # symbol specific processing
         if symbol.upper() == "BTCUSD":
             symbol = "BTCUSDT"
@@ -54,8 +74,13 @@ class BinancePriceSource:
             if age < pref_max_age:
                 # print("Using cached value", cached["pi"].price, cached)
                 return cached
-        # Not cached, get it now
-        price, error = self.do_get_price(symbol)
+        # Not cached, get it now. Concurrent callers share one fetch.
+        return await self.fetcher.single_flight((self.source_id, symbol), lambda: self._fetch_price_info(symbol))
+
+    # Fetch and cache
+    async def _fetch_price_info(self, symbol: str) -> PriceInfoSingle:
+        now = datetime.now(UTC).timestamp()
+        price, error = await self.do_get_price(symbol)
         if error:
             pi = PriceInfoSingle.create_with_error(symbol, now, self.source_id, error)
         else:
@@ -68,14 +93,13 @@ class BinancePriceSource:
         # print("Saved value to cache", cached["pi"].price, cached)
         return pi
 
-    def do_get_price(self, symbol: str) -> tuple[float, str | None]:
+    async def do_get_price(self, symbol: str) -> tuple[float, str | None]:
+        url = self.url_root + symbol
         try:
-            url = self.url_root + symbol
             # print("url", url)
-            response = requests.get(url)
-            if not response.ok:
-                return 0, f"Error getting price, {url}, {response.status_code}"
-            jsonData = response.json()
+            jsonData, error = await self.fetcher.get_json(url)
+            if error:
+                return 0, error
             # print(jsonData)
             price = jsonData['price']
             if price is None:
@@ -83,3 +107,30 @@ class BinancePriceSource:
             return float(price), None
         except Exception as ex:
             return 0, f"Exception getting price, {url}, {ex}"
+
+    # Our symbol to Binance stream symbol, None if not supported
+    def stream_symbol(self, symbol: str) -> str | None:
+        if symbol == "BTCUSD":
+            return "btcusdt"
+        if symbol == "BTCEUR" and self.global_or_us:
+            return "btceur"
+        return None
+
+    # Streaming: subscribe to trades
+    # See https://developers.binance.com/docs/binance-spot-api-docs/web-socket-streams
+    def ws_subscribe_messages(self, symbols: list[str]) -> list[dict]:
+        params = []
+        for s in symbols:
+            ss = self.stream_symbol(s)
+            if ss is not None:
+                params.append(ss + "@trade")
+        return [{"method": "SUBSCRIBE", "params": params, "id": 1}]
+
+    # Streaming: e.g. {"e": "trade", "s": "BTCUSDT", "p": "98765.00", "T": 1762988400000, ...}
+    def ws_parse_message(self, msg: dict) -> list[tuple[str, float, float]]:
+        if msg.get("e") != "trade":
+            return []
+        symbol = msg["s"]
+        if symbol == "BTCUSDT":
+            symbol = "BTCUSD"
+        return [(symbol, float(msg["p"]), float(msg["T"]) / 1000)]
@@ -3,11 +3,13 @@
 # file COPYING or http://www.opensource.org/licenses/mit-license.php.
 
 from price_common import PriceInfoSingle
+from price_fetcher import AsyncPriceFetcher, get_shared_fetcher
+from price_stream import LastPriceBook, PRICE_STREAM_MAX_AGE_SECS
 
 from datetime import datetime, UTC
-import requests
 
 BITSTAMP_URL_ROOT: str = "https://www.bitstamp.net/api/v2/ticker/"
+BITSTAMP_WS_URL: str = "wss://ws.bitstamp.net"
 DEFAULT_MAX_AGE_SECS: int = 15
 MIN_PREF_MAX_AGE_SECS: int = 5
 
@@ -17,15 +19,30 @@ class BitstampPriceSource:
     cache = {}
     source_id = "Bitstamp"
 
-    def __init__(self):
+    def __init__(self, fetcher: AsyncPriceFetcher | None = None, url_root: str = BITSTAMP_URL_ROOT):
+        self.fetcher = fetcher if fetcher is not None else get_shared_fetcher()
+        self.url_root = url_root
         self.cache = {}
+        # Streaming, see price_stream
+        self.ws_url = BITSTAMP_WS_URL
+        self.stream_book: LastPriceBook | None = None
 
-    def get_price_info(self, symbol: str, pref_max_age: float = 0) -> float:
+    # Sync wrapper of get_price_info_async()
+    def get_price_info(self, symbol: str, pref_max_age: float = 0) -> PriceInfoSingle:
+        return self.fetcher.run(self.get_price_info_async(symbol, pref_max_age))
+
+    async def get_price_info_async(self, symbol: str, pref_max_age: float = 0) -> PriceInfoSingle:
         now = datetime.now(UTC).timestamp()
         if pref_max_age == 0:
             pref_max_age = DEFAULT_MAX_AGE_SECS
         pref_max_age = max(pref_max_age, MIN_PREF_MAX_AGE_SECS)
 
+        # Streamed price, if streaming and fresh enough
+        if self.stream_book is not None:
+            streamed = self.stream_book.get(symbol.upper(), min(pref_max_age, PRICE_STREAM_MAX_AGE_SECS))
+            if streamed is not None:
+                return streamed
+
         # symbol specific processing
         if symbol.upper() == "BTCUSD":
             symbol = "btcusd"
@@ -38,8 +55,13 @@ class BitstampPriceSource:
             if age < pref_max_age:
                 # print("Using cached value", cached["pi"].price, cached)
                 return cached
-        # Not cached, get it now
-        price, claimed_time, error = BitstampPriceSource.do_get_price(symbol)
+        # Not cached, get it now. Concurrent callers share one fetch.
+        return await self.fetcher.single_flight((self.source_id, symbol), lambda: self._fetch_price_info(symbol))
+
+    # Fetch and cache
+    async def _fetch_price_info(self, symbol: str) -> PriceInfoSingle:
+        now = datetime.now(UTC).timestamp()
+        price, claimed_time, error = await self.do_get_price(symbol)
         if error:
             pi = PriceInfoSingle.create_with_error(symbol, now, self.source_id, error)
         else:
@@ -50,14 +72,13 @@ class BitstampPriceSource:
         # print("Saved value to cache", cached["pi"].price, cached)
         return pi
 
-    def do_get_price(symbol: str) -> tuple[float, float, str | None]:
+    async def do_get_price(self, symbol: str) -> tuple[float, float, str | None]:
+        url = self.url_root + symbol
         try:
-            url = BITSTAMP_URL_ROOT + symbol
             # print("url", url)
-            response = requests.get(url)
-            if not response.ok:
-                return 0, 0, f"Error getting price, {url}, {response.status_code}"
-            jsonData = response.json()
+            jsonData, error = await self.fetcher.get_json(url)
+            if error:
+                return 0, 0, error
             # print(jsonData)
             price = jsonData['last']
             if price is None:
@@ -66,3 +87,18 @@ class BitstampPriceSource:
             return float(price), float(claimed_time), None
         except Exception as ex:
             return 0, 0, f"Exception getting price, {url}, {ex}"
+
+    # Streaming: subscribe to live trades
+    # See https://www.bitstamp.net/websocket/v2/
+    def ws_subscribe_messages(self, symbols: list[str]) -> list[dict]:
+        return list(map(lambda s: {"event": "bts:subscribe", "data": {"channel": "live_trades_" + s.lower()}}, symbols))
+
+    # Streaming: e.g. {"event": "trade", "channel": "live_trades_btcusd", "data": {"price": 98765.0, "timestamp": "1762988400", ...}}
+    def ws_parse_message(self, msg: dict) -> list[tuple[str, float, float]]:
+        if msg.get("event") != "trade":
+            return []
+        channel = msg.get("channel", "")
+        if not channel.startswith("live_trades_"):
+            return []
+        data = msg["data"]
+        return [(channel[len("live_trades_"):].upper(), float(data["price"]), float(data["timestamp"]))]
@@ -0,0 +1,150 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+import asyncio
+import httpx
+import threading
+
+# Deadline for one price request (connect + send + receive)
+PRICE_FETCH_TIMEOUT_SECS: float = 5
+# Connection pool limits, per host
+PRICE_FETCH_MAX_CONNECTIONS_PER_HOST: int = 10
+PRICE_FETCH_KEEPALIVE_SECS: float = 60
+
+
+class AsyncPriceFetcher:
+    """
+    Asyncio HTTP(S) fetcher for the price sources.
+    Keeps a keep-alive connection pool per host, so repeated fetches do not pay a new TCP+TLS handshake.
+    Each request has a deadline. Runs its own event loop in a background thread,
+    sync code can run coroutines on it using run().
+    Concurrent fetches of the same thing can be coalesced, see single_flight().
+    """
+
+    def __init__(self, timeout: float = PRICE_FETCH_TIMEOUT_SECS):
+        self.timeout = timeout
+        # HTTP clients (connection pools), keyed by scheme+host+port. Used only from the loop thread.
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        # In-flight single-flight tasks, by key. Used only from the loop thread.
+        self._inflight: dict[object, asyncio.Task] = {}
+        self.request_count = 0
+        self.coalesced_count = 0
+        self.error_count = 0
+        self.timeout_count = 0
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                th = threading.Thread(target=loop.run_forever, name="price-fetcher", daemon=True)
+                th.start()
+                self._loop = loop
+                self._thread = th
+            return self._loop
+
+    # Run a coroutine on the fetcher loop and wait for its result. For sync callers, not from the loop itself.
+    def run(self, coro, timeout: float | None = None):
+        future = asyncio.run_coroutine_threadsafe(coro, self._get_loop())
+        return future.result(timeout)
+
+    # Start a coroutine on the fetcher loop, do not wait for it. The returned future can be used to cancel it
+    def run_background(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop())
+
+    # Run coro_fn() at most once at a time per key: if one with the same key is in flight,
+    # wait for its result instead of starting a new one. Call on the fetcher loop.
+    async def single_flight(self, key, coro_fn):
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced_count += 1
+            return await asyncio.shield(task)
+        task = asyncio.ensure_future(coro_fn())
+        self._inflight[key] = task
+
+        def _done(t):
+            if self._inflight.get(key) is t:
+                del self._inflight[key]
+        task.add_done_callback(_done)
+        # A cancelled caller does not cancel the shared task
+        return await asyncio.shield(task)
+
+    def _get_client(self, url: str) -> httpx.AsyncClient:
+        u = httpx.URL(url)
+        key = f"{u.scheme}://{u.host}:{u.port}"
+        client = self._clients.get(key)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=PRICE_FETCH_MAX_CONNECTIONS_PER_HOST,
+                    max_keepalive_connections=PRICE_FETCH_MAX_CONNECTIONS_PER_HOST,
+                    keepalive_expiry=PRICE_FETCH_KEEPALIVE_SECS,
+                ),
+                headers={"Accept": "application/json"},
+            )
+            self._clients[key] = client
+        return client
+
+    # GET a JSON document, within the deadline. Returns the parsed JSON, or an error
+    async def get_json(self, url: str, timeout: float | None = None) -> tuple[object, str | None]:
+        if timeout is None:
+            timeout = self.timeout
+        self.request_count += 1
+        try:
+            response = await asyncio.wait_for(self._get_client(url).get(url), timeout)
+            if not response.is_success:
+                self.error_count += 1
+                return None, f"Error getting price, {url}, {response.status_code}"
+            return response.json(), None
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            self.error_count += 1
+            self.timeout_count += 1
+            return None, f"Timeout getting price, {url}, {timeout} s"
+        except Exception as ex:
+            self.error_count += 1
+            return None, f"Exception getting price, {url}, {ex}"
+
+    def get_stats(self) -> dict:
+        return {
+            "hosts": len(self._clients),
+            "requests": self.request_count,
+            "coalesced": self.coalesced_count,
+            "in_flight": len(self._inflight),
+            "errors": self.error_count,
+            "timeouts": self.timeout_count,
+        }
+
+    async def _close_clients(self):
+        for _k, client in self._clients.items():
+            await client.aclose()
+        self._clients = {}
+
+    # Close the connections and stop the loop
+    def close(self):
+        with self._lock:
+            loop = self._loop
+            self._loop = None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._close_clients(), loop).result(self.timeout)
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread is not None:
+            self._thread.join(self.timeout)
+            self._thread = None
+        loop.close()
+
+
+_shared_fetcher: AsyncPriceFetcher | None = None
+_shared_fetcher_lock = threading.Lock()
+
+# A fetcher shared by the sources that are not given one explicitly
+def get_shared_fetcher() -> AsyncPriceFetcher:
+    global _shared_fetcher
+    with _shared_fetcher_lock:
+        if _shared_fetcher is None:
+            _shared_fetcher = AsyncPriceFetcher()
+        return _shared_fetcher
@@ -0,0 +1,162 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+from array import array
+import threading
+
+# Number of ticks kept per symbol (16 bytes each), e.g. 1 day at 1 tick / sec
+PRICE_HISTORY_CAPACITY_DEFAULT: int = 86400
+# Interval of sampling the aggregated price into the history
+PRICE_HISTORY_SAMPLE_SECS_DEFAULT: float = 1
+# A tick farther than this from the requested time is not used
+PRICE_HISTORY_MAX_DISTANCE_SECS_DEFAULT: float = 30
+
+
+class TickRingBuffer:
+    """
+    Fixed-capacity ring buffer of (time, price) ticks, in increasing time order.
+    Backed by two arrays of doubles, when full the oldest tick is overwritten.
+    Lookups by time are binary searches, O(log n).
+    Not thread-safe, see PriceHistory.
+    """
+
+    def __init__(self, capacity: int):
+        assert(capacity > 0)
+        self.capacity = capacity
+        self._times = array('d', bytes(8 * capacity))
+        self._prices = array('d', bytes(8 * capacity))
+        # Physical index of the oldest tick, and number of ticks
+        self._start = 0
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _phys(self, i: int) -> int:
+        return (self._start + i) % self.capacity
+
+    def time_at(self, i: int) -> float:
+        return self._times[self._phys(i)]
+
+    def price_at(self, i: int) -> float:
+        return self._prices[self._phys(i)]
+
+    # Append a tick. Ticks older than the latest one are dropped, same time overwrites. Returns True if stored.
+    def append(self, time: float, price: float) -> bool:
+        if self._len > 0:
+            last = self.time_at(self._len - 1)
+            if time < last:
+                return False
+            if time == last:
+                self._prices[self._phys(self._len - 1)] = price
+                return True
+        if self._len < self.capacity:
+            p = self._phys(self._len)
+            self._len += 1
+        else:
+            # Full, overwrite the oldest
+            p = self._start
+            self._start = (self._start + 1) % self.capacity
+        self._times[p] = time
+        self._prices[p] = price
+        return True
+
+    # Index of the first tick with time >= t (len if none)
+    def bisect_left(self, t: float) -> int:
+        lo = 0
+        hi = self._len
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.time_at(mid) < t:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    # The tick nearest to time t, as (time, price), or None if empty
+    def nearest(self, t: float) -> tuple[float, float] | None:
+        if self._len == 0:
+            return None
+        i = self.bisect_left(t)
+        if i == self._len:
+            i -= 1
+        elif i > 0 and t - self.time_at(i - 1) <= self.time_at(i) - t:
+            i -= 1
+        return (self.time_at(i), self.price_at(i))
+
+    # Time-weighted average price over [t_start, t_end], each tick's price holds until the next tick.
+    # None if there is no tick at or before t_end.
+    def twap(self, t_start: float, t_end: float) -> float | None:
+        if self._len == 0 or t_end < t_start:
+            return None
+        # Last tick at or before t_start (its price holds at t_start), or the first one after it
+        i = self.bisect_left(t_start)
+        if i == self._len or (i > 0 and self.time_at(i) > t_start):
+            i -= 1
+        if i < 0 or self.time_at(i) > t_end:
+            return None
+        if t_end == t_start:
+            return self.price_at(i)
+        weighted = 0.0
+        covered = 0.0
+        while i < self._len:
+            seg_start = max(self.time_at(i), t_start)
+            if seg_start >= t_end:
+                break
+            seg_end = t_end if i + 1 == self._len else min(self.time_at(i + 1), t_end)
+            weighted += self.price_at(i) * (seg_end - seg_start)
+            covered += seg_end - seg_start
+            i += 1
+        if covered <= 0:
+            return self.price_at(i - 1)
+        return weighted / covered
+
+    def memory_bytes(self) -> int:
+        return self._times.itemsize * len(self._times) + self._prices.itemsize * len(self._prices)
+
+
+class PriceHistory:
+    """
+    Recent aggregated price ticks, a TickRingBuffer per symbol (uppercase).
+    Memory is bounded: capacity ticks per symbol. Thread-safe.
+    """
+
+    def __init__(self, capacity: int = PRICE_HISTORY_CAPACITY_DEFAULT, max_distance: float = PRICE_HISTORY_MAX_DISTANCE_SECS_DEFAULT):
+        self.capacity = capacity
+        self.max_distance = max_distance
+        self._buffers: dict[str, TickRingBuffer] = {}
+        self._lock = threading.Lock()
+
+    def record(self, symbol: str, time: float, price: float) -> bool:
+        symbol = symbol.upper()
+        with self._lock:
+            buf = self._buffers.get(symbol)
+            if buf is None:
+                buf = TickRingBuffer(self.capacity)
+                self._buffers[symbol] = buf
+            return buf.append(time, price)
+
+    # Price at the given time: the nearest tick, or the TWAP over [time - twap_window, time] if twap_window > 0.
+    # None if there is no tick within max_distance of the time.
+    def get_price_at(self, symbol: str, time: float, twap_window: float = 0) -> float | None:
+        symbol = symbol.upper()
+        with self._lock:
+            buf = self._buffers.get(symbol)
+            if buf is None:
+                return None
+            nearest = buf.nearest(time)
+            if nearest is None or abs(nearest[0] - time) > self.max_distance:
+                return None
+            if twap_window <= 0:
+                return nearest[1]
+            return buf.twap(time - twap_window, time)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "symbols": len(self._buffers),
+                "ticks": sum(map(lambda b: len(b), self._buffers.values())),
+                "capacity_per_symbol": self.capacity,
+                "bytes": sum(map(lambda b: b.memory_bytes(), self._buffers.values())),
+            }
@@ -3,9 +3,10 @@
 # file COPYING or http://www.opensource.org/licenses/mit-license.php.
 
 from price_common import PriceInfoSingle
+from price_fetcher import AsyncPriceFetcher, get_shared_fetcher
+from price_stream import LastPriceBook, PRICE_STREAM_MAX_AGE_SECS
 
 from datetime import datetime, UTC
-import requests
 
 DEFAULT_MAX_AGE_SECS: int = 15
 MIN_PREF_MAX_AGE_SECS: int = 5
@@ -14,27 +15,48 @@ MIN_PREF_MAX_AGE_SECS: int = 5
 # See https://docs.kraken.com/api/docs/rest-api/get-ticker-information
 # E.g. curl 'https://api.kraken.com/0/public/Ticker?pair=XBTUSD' -H 'Accept: application/json'
 class KrakenPriceSource:
-    def __init__(self):
+    def __init__(self, fetcher: AsyncPriceFetcher | None = None, url_root_override: str | None = None):
         self.host = "api.kraken.com"
         self.source_id = "Kraken"
         self.url_root = f"https://{self.host}/0/public/Ticker?pair="
+        if url_root_override is not None:
+            self.url_root = url_root_override
+        self.fetcher = fetcher if fetcher is not None else get_shared_fetcher()
         self.cache = {}
+        # Streaming, see price_stream
+        self.ws_url = "wss://ws.kraken.com/v2"
+        self.stream_book: LastPriceBook | None = None
         print(f"Kraken price source initialized, host {self.host}, src {self.source_id}, url {self.url_root}")
 
-    def get_price_info(self, symbol: str, pref_max_age: float = 0) -> float:
+    # Sync wrapper of get_price_info_async()
+    def get_price_info(self, symbol: str, pref_max_age: float = 0) -> PriceInfoSingle:
+        return self.fetcher.run(self.get_price_info_async(symbol, pref_max_age))
+
+    async def get_price_info_async(self, symbol: str, pref_max_age: float = 0) -> PriceInfoSingle:
         now = datetime.now(UTC).timestamp()
         if pref_max_age == 0:
             pref_max_age = DEFAULT_MAX_AGE_SECS
         pref_max_age = max(pref_max_age, MIN_PREF_MAX_AGE_SECS)
 
+        # Streamed price, if streaming and fresh enough
+        if self.stream_book is not None:
+            streamed = self.stream_book.get(symbol.upper(), min(pref_max_age, PRICE_STREAM_MAX_AGE_SECS))
+            if streamed is not None:
+                return streamed
+
         if symbol in self.cache:
             cached = self.cache[symbol]
             age = now - cached.retrieve_time
             if age < pref_max_age:
                 # print("Using cached value", cached["pi"].price, cached)
                 return cached
-        # Not cached, get it now
-        price, error = self.do_get_price(symbol)
+        # Not cached, get it now. Concurrent callers share one fetch.
+        return await self.fetcher.single_flight((self.source_id, symbol), lambda: self._fetch_price_info(symbol))
+
+    # Fetch and cache
+    async def _fetch_price_info(self, symbol: str) -> PriceInfoSingle:
+        now = datetime.now(UTC).timestamp()
+        price, error = await self.do_get_price(symbol)
         if error:
             pi = PriceInfoSingle.create_with_error(symbol, now, self.source_id, error)
         else:
@@ -55,17 +77,17 @@ class KrakenPriceSource:
             return ("XBTEUR", "XXBTZEUR")
         return (None, None)
 
-    def do_get_price(self, symbol: str) -> tuple[float, str | None]:
+    async def do_get_price(self, symbol: str) -> tuple[float, str | None]:
+        url = self.url_root
         try:
             symb_int1, symb_int2 = self.internal_symbol(symbol)
             if symb_int1 is None or symb_int2 is None:
                 return 0, f"Symbol is not supported, {symbol}"
             url = self.url_root + symb_int1
             # print("url", url)
-            response = requests.get(url)
-            if not response.ok:
-                return 0, f"Error getting price, {url}, {response.status_code}"
-            jsonData = response.json()
+            jsonData, error = await self.fetcher.get_json(url)
+            if error:
+                return 0, error
             # print(jsonData)
             result = jsonData["result"]
             if result is not None:
@@ -79,3 +101,21 @@ class KrakenPriceSource:
             return 0, f"Error parsing price, {url}, {jsonData}"
         except Exception as ex:
             return 0, f"Exception getting price, {url}, {ex}"
+
+    # Streaming: subscribe to the ticker
+    # See https://docs.kraken.com/api/docs/websocket-v2/ticker
+    def ws_subscribe_messages(self, symbols: list[str]) -> list[dict]:
+        pairs = list(map(lambda s: s[:3] + "/" + s[3:], symbols))
+        return [{"method": "subscribe", "params": {"channel": "ticker", "symbol": pairs}}]
+
+    # Streaming: e.g. {"channel": "ticker", "type": "update", "data": [{"symbol": "BTC/USD", "last": 98765.1, ...}]}
+    # No timestamp in the message, the current time is used
+    def ws_parse_message(self, msg: dict) -> list[tuple[str, float, float]]:
+        if msg.get("channel") != "ticker":
+            return []
+        now = datetime.now(UTC).timestamp()
+        ret = []
+        for d in msg.get("data", []):
+            symbol = d["symbol"].replace("/", "").replace("XBT", "BTC")
+            ret.append((symbol, float(d["last"]), now))
+        return ret
@@ -0,0 +1,120 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+from price_common import PriceInfoSingle
+
+from datetime import datetime, UTC
+import asyncio
+import json
+from websockets.asyncio.client import connect as ws_connect
+
+# A streamed price older than this (since received) is stale, REST is used instead
+PRICE_STREAM_MAX_AGE_SECS: float = 5
+# Delay before reconnecting after a stream error, doubled on each failure, up to the max
+PRICE_STREAM_RECONNECT_MIN_SECS: float = 1
+PRICE_STREAM_RECONNECT_MAX_SECS: float = 60
+
+
+class LastPriceBook:
+    """
+    Latest streamed price per symbol (uppercase, e.g. "BTCUSD"), of one source.
+    Updated and read on the fetcher loop only.
+    """
+
+    def __init__(self, source_id: str):
+        self.source_id = source_id
+        self._prices: dict[str, PriceInfoSingle] = {}
+        self.update_count = 0
+
+    def update(self, symbol: str, price: float, claimed_time: float, receive_time: float):
+        self._prices[symbol] = PriceInfoSingle(price, symbol, receive_time, claimed_time, self.source_id)
+        self.update_count += 1
+
+    # The latest price, if not older than max_age (since received), otherwise None
+    def get(self, symbol: str, max_age: float = PRICE_STREAM_MAX_AGE_SECS) -> PriceInfoSingle | None:
+        pi = self._prices.get(symbol)
+        if pi is None:
+            return None
+        now = datetime.now(UTC).timestamp()
+        if now - pi.retrieve_time > max_age:
+            return None
+        return pi
+
+    def symbols(self) -> list[str]:
+        return list(self._prices.keys())
+
+
+class TickerStream:
+    """
+    Long-lived WebSocket consumer of the ticker/trade stream of one source, feeding a LastPriceBook.
+    The source provides the exchange specifics:
+    - ws_url: the WebSocket URL
+    - ws_subscribe_messages(symbols) -> list[dict]: messages to send after connecting
+    - ws_parse_message(msg: dict) -> list[tuple[symbol, price, claimed_time]]: ticks in a received message
+    Reconnects (with backoff) on errors, until stopped.
+    """
+
+    def __init__(self, source, symbols: list[str], url: str | None = None):
+        self.source = source
+        self.symbols = list(map(lambda s: s.upper(), symbols))
+        self.url = url if url is not None else source.ws_url
+        self.book = LastPriceBook(source.source_id)
+        self._stopped = False
+        self._ws = None
+        self.connect_count = 0
+        self.error_count = 0
+        self.message_count = 0
+
+    async def run(self):
+        delay = PRICE_STREAM_RECONNECT_MIN_SECS
+        while not self._stopped:
+            try:
+                async with ws_connect(self.url, open_timeout=10, ping_interval=20) as ws:
+                    self._ws = ws
+                    self.connect_count += 1
+                    print(f"Price stream connected, {self.source.source_id}, {self.url}")
+                    for msg in self.source.ws_subscribe_messages(self.symbols):
+                        await ws.send(json.dumps(msg))
+                    delay = PRICE_STREAM_RECONNECT_MIN_SECS
+                    async for raw in ws:
+                        self._on_message(raw)
+            except Exception as ex:
+                if self._stopped:
+                    break
+                self.error_count += 1
+                print(f"Price stream error, {self.source.source_id}, {ex}, reconnecting in {delay} s")
+            finally:
+                self._ws = None
+            if self._stopped:
+                break
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, PRICE_STREAM_RECONNECT_MAX_SECS)
+
+    def _on_message(self, raw):
+        self.message_count += 1
+        try:
+            msg = json.loads(raw)
+            ticks = self.source.ws_parse_message(msg)
+        except Exception as ex:
+            print(f"Price stream, could not parse message, {self.source.source_id}, {ex}")
+            return
+        now = datetime.now(UTC).timestamp()
+        for symbol, price, claimed_time in ticks:
+            if symbol in self.symbols and price > 0:
+                self.book.update(symbol, price, claimed_time, now)
+
+    # Stop, call on the fetcher loop
+    async def stop(self):
+        self._stopped = True
+        if self._ws is not None:
+            await self._ws.close()
+
+    def get_stats(self) -> dict:
+        return {
+            "connected": self._ws is not None,
+            "connects": self.connect_count,
+            "errors": self.error_count,
+            "messages": self.message_count,
+            "updates": self.book.update_count,
+        }
@@ -0,0 +1,117 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+from dto import EventClassDto
+
+import threading
+
+
+class Registry:
+    """
+    In-memory copy of the small, rarely changing tables: event classes and public keys.
+    Each is loaded on first use, and indexed: classes by ID and by definition (sorted by create time),
+    public keys by key. Inserts go through the storage, which then invalidates the table here,
+    the next read reloads it (write-through invalidation).
+    Changes made by other processes are not seen.
+    Thread-safe.
+    """
+
+    def __init__(self, load_event_classes_fn, load_pubkeys_fn):
+        # () -> list[EventClassDto], in insertion order
+        self._load_event_classes_fn = load_event_classes_fn
+        # () -> list[tuple[int, str]], (ID, pubkey)
+        self._load_pubkeys_fn = load_pubkeys_fn
+        self._lock = threading.Lock()
+        self._classes: list[EventClassDto] | None = None
+        self._classes_by_id: dict[str, EventClassDto] = {}
+        self._classes_by_def: dict[str, list[EventClassDto]] = {}
+        self._pubkey_ids: dict[str, int] | None = None
+        self.class_loads = 0
+        self.pubkey_loads = 0
+
+    # The lock must be held
+    def _ensure_classes_locked(self):
+        if self._classes is not None:
+            return
+        classes = self._load_event_classes_fn()
+        by_def = {}
+        for ec in classes:
+            by_def.setdefault(ec.definition, []).append(ec)
+        for def_classes in by_def.values():
+            # Stable, same create time stays in insertion order
+            def_classes.sort(key=lambda ec: ec.create_time)
+        self._classes = classes
+        self._classes_by_id = {ec.id: ec for ec in classes}
+        self._classes_by_def = by_def
+        self.class_loads += 1
+
+    # The lock must be held
+    def _ensure_pubkeys_locked(self):
+        if self._pubkey_ids is not None:
+            return
+        self._pubkey_ids = {pubkey: id for id, pubkey in self._load_pubkeys_fn()}
+        self.pubkey_loads += 1
+
+    def invalidate_event_classes(self):
+        with self._lock:
+            self._classes = None
+
+    def invalidate_pubkeys(self):
+        with self._lock:
+            self._pubkey_ids = None
+
+    def invalidate_all(self):
+        with self._lock:
+            self._classes = None
+            self._pubkey_ids = None
+
+    def event_classes_len(self) -> int:
+        with self._lock:
+            self._ensure_classes_locked()
+            return len(self._classes)
+
+    def event_classes_get_all(self) -> list[EventClassDto]:
+        with self._lock:
+            self._ensure_classes_locked()
+            return list(self._classes)
+
+    def event_classes_get_by_id(self, id: str) -> EventClassDto | None:
+        with self._lock:
+            self._ensure_classes_locked()
+            return self._classes_by_id.get(id)
+
+    def event_classes_get_by_ids(self, ids: list[str]) -> dict[str, EventClassDto]:
+        with self._lock:
+            self._ensure_classes_locked()
+            return {id: self._classes_by_id[id] for id in ids if id in self._classes_by_id}
+
+    # In case there are multiple, the latest (with highest create_time)
+    def event_classes_get_latest_by_def(self, definition: str) -> EventClassDto | None:
+        with self._lock:
+            self._ensure_classes_locked()
+            def_classes = self._classes_by_def.get(definition, [])
+            if len(def_classes) == 0:
+                return None
+            return def_classes[-1]
+
+    # All of a definition, sorted by create time
+    def event_classes_get_all_by_def(self, definition: str) -> list[EventClassDto]:
+        with self._lock:
+            self._ensure_classes_locked()
+            return list(self._classes_by_def.get(definition, []))
+
+    # ID of a public key, None if not present
+    def pubkey_id(self, pubkey: str) -> int | None:
+        with self._lock:
+            self._ensure_pubkeys_locked()
+            return self._pubkey_ids.get(pubkey)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "event_classes": -1 if self._classes is None else len(self._classes),
+                "pubkeys": -1 if self._pubkey_ids is None else len(self._pubkey_ids),
+                "class_loads": self.class_loads,
+                "pubkey_loads": self.pubkey_loads,
+            }
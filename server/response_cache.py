@@ -0,0 +1,129 @@
+# Copyright (c) 2025-present Cadena Bitcoin
+# Distributed under the MIT software license, see the accompanying
+# file COPYING or http://www.opensource.org/licenses/mit-license.php.
+
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+
+# Optional, faster JSON encoder
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+RESPONSE_STORE_MAX_BYTES_DEFAULT: int = 64 * 1024 * 1024
+
+# Responses of settled events never change, any cache can keep them
+CACHE_CONTROL_SETTLED = "public, max-age=31536000, immutable"
+# Responses that may change (e.g. no outcome yet), caches have to revalidate them (with the ETag)
+CACHE_CONTROL_UNSETTLED = "no-cache"
+
+
+# JSON encoding to bytes, compact, UTF-8 (as FastAPI's), with orjson if available
+def json_dumps_bytes(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+# Strong ETag of a response body
+def etag_of(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+# Whether an If-None-Match header value matches the ETag (weak comparison, as specified for If-None-Match)
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+class SerializedResponse:
+    """A JSON response body, serialized once, with its ETag and Cache-Control header value."""
+
+    def __init__(self, body: bytes, etag: str, cache_control: str):
+        self.body = body
+        self.etag = etag
+        self.cache_control = cache_control
+
+    def new(value, settled: bool):
+        body = json_dumps_bytes(value)
+        return SerializedResponse(body, etag_of(body), CACHE_CONTROL_SETTLED if settled else CACHE_CONTROL_UNSETTLED)
+
+
+class SerializedResponseStore:
+    """
+    Bounded LRU store of serialized responses, keyed by event ID.
+    Only for responses that never change (settled events), so entries are never expired,
+    only evicted when over the size limit, or cleared when the storage is reset.
+    Thread-safe.
+    """
+
+    def __init__(self, max_bytes: int = RESPONSE_STORE_MAX_BYTES_DEFAULT):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, SerializedResponse] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> SerializedResponse | None:
+        with self._lock:
+            resp = self._entries.get(key)
+            if resp is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return resp
+
+    def put(self, key: str, resp: SerializedResponse):
+        if len(resp.body) > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = resp
+            self._bytes += len(resp.body)
+            while self._bytes > self.max_bytes:
+                _k, r = self._entries.popitem(last=False)
+                self._bytes -= len(r.body)
+                self.evictions += 1
+
+    def remove(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    # The lock must be held
+    def _remove(self, key: str):
+        resp = self._entries.pop(key, None)
+        if resp is not None:
+            self._bytes -= len(resp.body)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "encoder": "orjson" if orjson is not None else "json",
+            }
@@ -3,6 +3,7 @@ from test_common import PriceSourceMockConstant, prepare_test_secret_for_cryptli
 
 from datetime import datetime, UTC
 from fastapi.testclient import TestClient
+import json
 import os
 import unittest
 
@@ -119,6 +120,50 @@ class ServerApiTestClass(unittest.TestCase):
         self.assertEqual(len(c), 5000)
 
 
+    # Walk all events of a definition (more than one page), with the cursors, and streamed
+    def test_event_ids_pages(self):
+        pages = []
+        after = ""
+        while after is not None:
+            response = self.client.get(f"/api/v0/event/event_ids?definition=btcusd{after and '&after=' + after}")
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.json())
+            after = response.headers.get("X-Next-Cursor")
+        self.assertEqual(len(pages[0]), 5000)
+        walked = [eid for page in pages for eid in page]
+        self.assertGreater(len(walked), 5000)
+        self.assertEqual(len(set(walked)), len(walked))
+        self.assertEqual(walked, sorted(walked))
+
+        response = self.client.get("/api/v0/event/event_ids?definition=btcusd&format=ndjson")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        self.assertEqual(list(map(json.loads, response.text.splitlines())), walked)
+
+        response = self.client.get(f"/api/v0/event/events?definition=btcusd&after={walked[99]}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(map(lambda e: e["event_id"], response.json())), walked[100:200])
+        self.assertEqual(response.headers["X-Next-Cursor"], walked[199])
+        response = self.client.get(f"/api/v0/event/events?definition=btcusd&after={walked[-150]}&format=ndjson")
+        self.assertEqual(list(map(lambda line: json.loads(line)["event_id"], response.text.splitlines())), walked[-149:])
+
+        response = self.client.get("/api/v0/event/event_ids?after=btcusd1")
+        self.assertEqual(response.status_code, 400)
+
+    def test_events_by_id(self):
+        now = round(datetime.now(UTC).timestamp())
+        event_ids = self.client.get(f"/api/v0/event/event_ids?start_time={now - 86400}&end_time={now + 86400}&definition=btcusd").json()
+        self.assertGreater(len(event_ids), 100)
+
+        response = self.client.post("/api/v0/event/events_by_id", json=event_ids[:100] + ["btcusd0"])
+        self.assertEqual(response.status_code, 200)
+        c = response.json()
+        self.assertEqual(list(map(lambda e: e["event_id"], c)), event_ids[:100])
+        self.assertEqual(c[3], self.client.get(f"/api/v0/event/event/{event_ids[3]}").json())
+
+        response = self.client.post("/api/v0/event/events_by_id", json=["btcusd0"] * 1001)
+        self.assertEqual(response.status_code, 400)
+
     def test_next_event(self):
         response = self.client.get("/api/v0/event/event_classes")
         self.assertEqual(response.status_code, 200)
@@ -153,6 +198,17 @@ class ServerApiTestClass(unittest.TestCase):
         # print(c2)
         self.assertEqual(c2, c)
 
+        # No outcome yet, has to be revalidated, conditional request
+        etag = response.headers["etag"]
+        self.assertEqual(response.headers["cache-control"], "no-cache")
+        response = self.client.get(f"/api/v0/event/event/{event_id}", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response.headers["etag"], etag)
+        response = self.client.get(f"/api/v0/event/event/{event_id}", headers={"If-None-Match": '"other"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), c)
+
     # Note: depends on network, remote server
     def test_price(self):
         response = self.client.get("/api/v0/price/current/btcusd")
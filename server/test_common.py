@@ -3,8 +3,14 @@ from price_common import PriceInfoSingle
 import dlcplazacryptlib
 
 from datetime import datetime, UTC
-import sqlite3
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import asyncio
+import json
 import os
+import sqlite3
+import threading
+import time
+from websockets.asyncio.server import serve as ws_serve
 
 
 DUMMY_ENTROPY = "01010101010101010101010101010101"
@@ -54,3 +60,126 @@ class PriceSourceMockConstant:
         rate = self.const_price * relative_rate
         return PriceInfoSingle(rate, symbol, now - pref_max_age/2, now - pref_max_age/2, "MockConstant")
 
+    async def get_price_info_async(self, symbol: str, pref_max_age: float = 0) -> PriceInfoSingle:
+        return self.get_price_info(symbol, pref_max_age)
+
+    def get_symbols(self) -> list[str]:
+        return list(self.symbol_rates.keys())
+
+    # No price history
+    def get_price_at(self, symbol: str, time: float, twap_window: float = 0) -> float | None:
+        return None
+
+    def start_history_sampling(self, interval: float):
+        return
+
+    def get_stats(self) -> dict:
+        return {}
+
+
+
+# A local stand-in for the price APIs of the exchanges (Bitstamp, Binance, Kraken), for testing.
+# Serves a constant price in the format of each exchange, with keep-alive (HTTP/1.1).
+# Paths: /bitstamp/<symbol>, /binance?symbol=<symbol>, /kraken?pair=<pair>
+class PriceStubServer:
+    def __init__(self, price: float = 98765, delay: float = 0):
+        self.price = price
+        # Artificial response delay, in seconds
+        self.delay = delay
+        self.request_count = 0
+        self.connection_count = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                stub.connection_count += 1
+
+            def do_GET(self):
+                stub.request_count += 1
+                if stub.delay > 0:
+                    time.sleep(stub.delay)
+                p = str(stub.price)
+                if self.path.startswith("/bitstamp/"):
+                    body = {"last": p, "timestamp": str(round(time.time()))}
+                elif self.path.startswith("/binance"):
+                    body = {"symbol": "BTCUSDT", "price": p}
+                elif self.path.startswith("/kraken"):
+                    body = {"error": [], "result": {"XXBTZUSD": {"c": [p, "0.001"]}, "XXBTZEUR": {"c": [p, "0.001"]}}}
+                else:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                return
+
+        class Server(ThreadingHTTPServer):
+            # Clients may drop the connection (e.g. on timeout), ignore that
+            def handle_error(self, request, client_address):
+                return
+
+        self.server = Server(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# A local stand-in for the WebSocket ticker stream of an exchange, for testing.
+# After the client subscribes, replays the given (recorded) messages, then keeps the connection open.
+class PriceStreamStub:
+    def __init__(self, messages: list[dict], interval: float = 0.01):
+        self.messages = messages
+        self.interval = interval
+        self.received = []
+        self.connection_count = 0
+        self._loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        async def handler(ws):
+            self.connection_count += 1
+            self.received.append(json.loads(await ws.recv()))
+            for m in self.messages:
+                await ws.send(json.dumps(m))
+                await asyncio.sleep(self.interval)
+            await ws.wait_closed()
+
+        async def start():
+            self._server = await ws_serve(handler, "127.0.0.1", 0)
+            port = list(self._server.sockets)[0].getsockname()[1]
+            self.url = f"ws://127.0.0.1:{port}"
+            started.set()
+
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(start(), self._loop)
+        started.wait(5)
+
+    def stop(self):
+        async def close():
+            self._server.close()
+            await self._server.wait_closed()
+        asyncio.run_coroutine_threadsafe(close(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+
+
+# Recorded stream messages, by source ID
+def load_recorded_ticks() -> dict[str, list[dict]]:
+    with open(os.path.join(os.path.dirname(__file__), "testdata", "price_ticks.json")) as f:
+        return json.load(f)
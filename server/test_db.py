@@ -1,8 +1,13 @@
 from db import EventStorageDb
+import db as db_module
 from dto import EventClassDto, EventDto, DigitOutcome, Nonce, OutcomeDto
 from test_common import recreate_empty_db_file
 
 import math
+import os
+import sqlite3
+import sys
+import threading
 import unittest
 
 
@@ -32,6 +37,30 @@ class EventStorageTestClass(unittest.TestCase):
         self.assertEqual(db.event_classes_len(), 0)
         self.assertEqual(db.events_len(), 0)
 
+    def test_connection_settings(self):
+        db = self.create_db()
+        with db._cursor_ro() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchall()[0][0], "wal")
+        with db._conn_rw() as conn:
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchall()[0][0], 1)
+            self.assertEqual(conn.execute("PRAGMA foreign_keys").fetchall()[0][0], 1)
+
+        # Reads from several threads share the pooled connections
+        def reader():
+            for _i in range(10):
+                db.events_len()
+        threads = [threading.Thread(target=reader) for _i in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        stats = db.get_pool_stats()
+        self.assertLessEqual(stats["ro"]["open"], stats["ro"]["max_size"])
+        self.assertEqual(stats["ro"]["in_use"], 0)
+        self.assertEqual(stats["rw"]["in_use"], 0)
+        db.print_stats()
+
     def test_add_some(self):
         db = self.create_db()
         db.print_stats()
@@ -177,6 +206,357 @@ class EventStorageTestClass(unittest.TestCase):
         db.print_stats()
 
 
+    def test_bulk_insert(self):
+        db = self.create_db()
+        event_class = self.default_event_class
+        db.event_classes_insert_if_missing(event_class)
+
+        # Small write chunks, to have several commits
+        orig_chunk_size = db_module.DB_WRITE_CHUNK_SIZE
+        db_module.DB_WRITE_CHUNK_SIZE = 16
+        try:
+            events = []
+            nonces = []
+            for i in range(37):
+                event_id = f"ev_btcusd_03_{i:03}"
+                time = event_class.repeat_first_time + i * event_class.repeat_period
+                events.append(EventDto(event_id, class_id=event_class.id, definition=event_class.definition, time=time, string_template="template", signer_public_key_id=-1))
+                for d in range(event_class.range_digits):
+                    nonces.append(Nonce(event_id, digit_index=d, nonce_pub=f"nonce_pub_{i}_{d}", nonce_sec=f"nonce_sec_{i}_{d}"))
+
+            self.assertEqual(db.events_append_if_missing(events[:20], "signer_pubkey_001"), 20)
+            # Existing ones are skipped
+            self.assertEqual(db.events_append_if_missing(events, "signer_pubkey_001"), 17)
+            self.assertEqual(db.events_append_if_missing(events, "signer_pubkey_001"), 0)
+            self.assertEqual(db.events_len(), 37)
+            self.assertEqual(db.events_get_by_id("ev_btcusd_03_036")[0].__dict__, events[36].__dict__)
+
+            db.nonces_insert(nonces)
+            self.assertEqual(db.nonces_get_by_ids(["ev_btcusd_03_000", "ev_btcusd_03_036"])["ev_btcusd_03_036"][6].__dict__, nonces[-1].__dict__)
+            self.assertEqual(len(db.nonces_get_by_ids(list(map(lambda e: e.event_id, events)))), 37)
+
+            # Failing chunk (unknown event) is not left behind
+            bad_nonces = [Nonce("ev_btcusd_03_000", 7, "np", "ns"), Nonce("no_such_event", 0, "np", "ns")]
+            self.assertRaises(Exception, db.nonces_insert, bad_nonces)
+            self.assertEqual(len(db.nonces_get("ev_btcusd_03_000")), event_class.range_digits)
+            db.outcomes_insert(OutcomeDto("ev_btcusd_03_001", 100, self.start_time))
+            self.assertEqual(len(db.nonces_get("ev_btcusd_03_000")), event_class.range_digits)
+
+            # Outcomes with digit outcomes in one transaction, nothing stored if one fails
+            def outcome_with_digits(event_id: str):
+                return (OutcomeDto(event_id, 100, self.start_time), [DigitOutcome(event_id, d, 0, "n", "s", "m") for d in range(2)])
+            listened = []
+            db.add_outcome_listener(lambda event_id: listened.append(event_id))
+            self.assertRaises(Exception, db.outcomes_insert_multi, [outcome_with_digits("ev_btcusd_03_002"), outcome_with_digits("no_such_event")])
+            self.assertIsNone(db.outcomes_get("ev_btcusd_03_002"))
+            self.assertEqual(db.digitoutcomes_get("ev_btcusd_03_002"), [])
+            db.outcomes_insert_multi([outcome_with_digits("ev_btcusd_03_002"), outcome_with_digits("ev_btcusd_03_003")])
+            self.assertEqual(len(db.outcomes_get_by_ids(["ev_btcusd_03_001", "ev_btcusd_03_002", "ev_btcusd_03_003"])), 3)
+            self.assertEqual(len(db.digitoutcomes_get("ev_btcusd_03_003")), 2)
+            self.assertEqual(listened, ["ev_btcusd_03_002", "ev_btcusd_03_003"])
+        finally:
+            db_module.DB_WRITE_CHUNK_SIZE = orig_chunk_size
+
+
+    def test_registry(self):
+        db = self.create_db()
+        ec1 = self.default_event_class
+        ec2 = EventClassDto("btcusd02", ec1.create_time + 100, "BTCUSD", self.digits, 0, ec1.event_string_template, ec1.repeat_first_time, 600, 0, ec1.repeat_last_time, "signer_pubkey_001")
+        ec0 = EventClassDto("btcusd00", ec1.create_time - 100, "BTCUSD", self.digits, 0, ec1.event_string_template, ec1.repeat_first_time, 60, 0, ec1.repeat_last_time, "signer_pubkey_001")
+        db.event_classes_insert_if_missing(ec1)
+        db.event_classes_insert_if_missing(ec2)
+        for _i in range(10):
+            self.assertEqual(db.event_classes_get_by_id("btcusd02").__dict__, ec2.__dict__)
+            self.assertEqual(db.event_classes_get_latest_by_def("BTCUSD").id, "btcusd02")
+        self.assertEqual(db.get_registry_stats()["class_loads"], 1)
+        # Insert invalidates
+        db.event_classes_insert_if_missing(ec0)
+        self.assertEqual(db.event_classes_insert_if_missing(ec0), 0)
+        self.assertEqual(list(map(lambda ec: ec.id, db.event_classes_get_all_by_def("BTCUSD"))), ["btcusd00", "btcusd01", "btcusd02"])
+        # In insertion order, not by create time
+        self.assertEqual(list(map(lambda ec: ec.id, db.event_classes_get_all())), ["btcusd01", "btcusd02", "btcusd00"])
+        self.assertEqual(list(db.event_classes_get_by_ids(["btcusd00", "missing"]).keys()), ["btcusd00"])
+        self.assertIsNone(db.event_classes_get_latest_by_def("BTCEUR"))
+        self.assertEqual(db.event_classes_len(), 3)
+        self.assertEqual(db.get_registry_stats()["class_loads"], 2)
+
+        # Public key inserted once, then taken from the registry
+        for i in range(5):
+            e = EventDto(f"ev_{i}", class_id=ec1.id, definition=ec1.definition, time=ec1.repeat_first_time + i * 3600, string_template="template", signer_public_key_id=-1)
+            db.events_insert_if_missing(e, "signer_pubkey_001")
+        db.events_append_if_missing([EventDto("ev_9", ec1.id, ec1.definition, ec1.repeat_first_time, "template", -1)], "signer_pubkey_002")
+        self.assertEqual(db.events_get_by_id("ev_4")[1], "signer_pubkey_001")
+        self.assertEqual(db.events_get_by_id("ev_9")[1], "signer_pubkey_002")
+        self.assertEqual(db.get_registry_stats()["pubkey_loads"], 2)
+        self.assertEqual(db.get_registry_stats()["pubkeys"], -1)
+        db.events_insert_if_missing(EventDto("ev_8", ec1.id, ec1.definition, ec1.repeat_first_time, "template", -1), "signer_pubkey_002")
+        self.assertEqual(db.get_registry_stats()["pubkeys"], 2)
+
+        db.delete_all_contents()
+        self.assertEqual(db.event_classes_len(), 0)
+
+    def test_counters(self):
+        db = self.create_db()
+        ec = self.default_event_class
+        db.event_classes_insert_if_missing(ec)
+        events = [EventDto(f"ev_{i}", ec.id, ec.definition, ec.repeat_first_time + i * 3600, "template", -1) for i in range(20)]
+        db.events_append_if_missing(events[:10], "signer_pubkey_001")
+        self.assertEqual(db.events_len(), 10)
+        self.assertEqual(db.events_count_future(ec.repeat_first_time + 4 * 3600), 5)
+        # Partly existing, the event times are reloaded
+        db.events_append_if_missing(events[5:15], "signer_pubkey_001")
+        self.assertEqual(db.events_count_future(ec.repeat_first_time + 4 * 3600), 10)
+        self.assertEqual(db.get_counters_stats()["time_loads"], 2)
+        # Earlier than the existing ones, inserted in order
+        db.events_insert_if_missing(EventDto("ev_early", ec.id, ec.definition, ec.repeat_first_time - 3600, "template", -1), "signer_pubkey_002")
+        self.assertEqual(db.events_count_future(ec.repeat_first_time - 1), 15)
+        db.nonces_insert([Nonce("ev_0", d, "np", "ns") for d in range(self.digits)])
+        db.outcomes_insert_multi([(OutcomeDto("ev_0", 100, self.start_time), [DigitOutcome("ev_0", d, 0, "n", "s", "m") for d in range(3)])])
+        self.assertRaises(Exception, db.outcomes_insert, OutcomeDto("no_such_event", 100, self.start_time))
+
+        # Counters match the recount, without reloads
+        db.stats_recount = True
+        db.print_stats()
+        self.assertEqual(db.verify_counters(), {})
+        self.assertEqual(db._counters.get_counts(), {"evcl": 1, "pkey": 2, "nonce": self.digits, "ev": 16, "diou": 3, "outcome": 1})
+        self.assertEqual(db.get_counters_stats()["count_loads"], 1)
+        self.assertEqual(db.events_count_future(0), 16)
+
+        # Changes behind the back of the storage are found by the recount
+        with db._conn_rw() as conn:
+            conn.execute("DELETE FROM NONCE")
+            conn.commit()
+        self.assertEqual(db.verify_counters(), {"nonce": (self.digits, 0)})
+        self.assertEqual(db._counters.get("nonce"), 0)
+
+        db.delete_all_contents()
+        self.assertEqual(db.events_len(), 0)
+        self.assertEqual(db.events_count_future(0), 0)
+
+    def test_key_format(self):
+        db = self.create_db()
+        self.assertEqual(db.key_format, "hex")
+        ec = self.default_event_class
+        db.event_classes_insert_if_missing(ec)
+        pubkey = "03" + "ab" * 32
+        nonce_pub = "02" + "11" * 32
+        db.events_append_if_missing([EventDto(f"ev_{i}", ec.id, ec.definition, ec.repeat_first_time + i * 3600, "template", -1) for i in range(3)], pubkey)
+        db.nonces_insert([Nonce("ev_0", 0, nonce_pub, "22" * 32), Nonce("ev_0", 1, "not_hex", "ABCD")])
+        db.outcomes_insert_multi([(OutcomeDto("ev_0", 100, self.start_time), [DigitOutcome("ev_0", 0, 1, nonce_pub, "33" * 64, "m")])])
+        db.close()
+
+        # To blobs, values read back unchanged, except the non-hex ones are kept as text
+        with sqlite3.connect("/tmp/ora.db") as conn:
+            self.assertEqual(db_module.db_convert_key_format(conn, "blob"), 4)
+            self.assertEqual(conn.execute("SELECT typeof(NoncePub), typeof(NonceSec) FROM NONCE ORDER BY DigitIndex").fetchall(), [("blob", "blob"), ("text", "text")])
+            self.assertEqual(conn.execute("SELECT length(Signature) FROM DIGITOUTCOME").fetchall(), [(64,)])
+        conn.close()
+        db = EventStorageDb(data_dir="/tmp")
+        self.assertEqual(db.key_format, "blob")
+        self.assertEqual(list(map(lambda n: (n.nonce_pub, n.nonce_sec), db.nonces_get("ev_0"))), [(nonce_pub, "22" * 32), ("not_hex", "ABCD")])
+        self.assertEqual(db.digitoutcomes_get("ev_0")[0].signature, "33" * 64)
+        self.assertEqual(db.events_get_by_id("ev_1")[1], pubkey)
+        # Written as blobs, the existing public key is found
+        db.events_insert_if_missing(EventDto("ev_9", ec.id, ec.definition, ec.repeat_first_time, "template", -1), pubkey)
+        db.nonces_insert([Nonce("ev_1", 0, nonce_pub, "44" * 32)])
+        self.assertEqual(db.nonces_get("ev_1")[0].nonce_sec, "44" * 32)
+        self.assertEqual(db._counters.get("pkey"), 1)
+        db.close()
+
+        # Back to hex
+        with sqlite3.connect("/tmp/ora.db") as conn:
+            self.assertEqual(db_module.db_convert_key_format(conn, "hex"), 4)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM NONCE WHERE typeof(NoncePub) == 'blob'").fetchall(), [(0,)])
+        conn.close()
+        db = EventStorageDb(data_dir="/tmp")
+        self.assertEqual(db.key_format, "hex")
+        self.assertEqual(db.nonces_get("ev_1")[0].nonce_sec, "44" * 32)
+        self.assertEqual(db.events_get_by_id("ev_9")[1], pubkey)
+        db.close()
+
+    # Helper to create a v1 DB with a few events, nonces, and a duplicate outcome
+    def create_db_v1(self, dbfile: str) -> sqlite3.Connection:
+        if os.path.exists(dbfile):
+            os.remove(dbfile)
+        conn = sqlite3.connect(dbfile)
+        db_module.db_setup_from_to(conn, 0, 1)
+        cursor = conn.cursor()
+        ec = self.default_event_class
+        db_module.db_eventclass_insert_if_missing(cursor, ec)
+        pubkey_id = db_module.db_pubkey_insert_if_missing(cursor, "signer_pubkey_001")
+        for i in range(3):
+            db_module.db_event_insert_if_missing(cursor, EventDto(f"ev_{i}", ec.id, ec.definition, ec.repeat_first_time + i * 3600, "template", pubkey_id))
+            db_module.db_nonce_insert_many(cursor, [Nonce(f"ev_{i}", d, f"np_{i}_{d}", f"ns_{i}_{d}") for d in range(self.digits)])
+        db_module.db_digitoutcome_insert_list(cursor, "ev_0", [DigitOutcome("ev_0", d, d, "n", "s", "m") for d in range(self.digits)])
+        # Duplicate outcome, possible in v1
+        cursor.execute("INSERT INTO OUTCOME (EventId, Value, CreatedTime) VALUES ('ev_0', 100, ?), ('ev_0', 101, ?)", (self.start_time, self.start_time + 1))
+        conn.commit()
+        cursor.close()
+        return conn
+
+    def test_migration(self):
+        conn = self.create_db_v1("/tmp/ora_v1.db")
+        cursor = conn.cursor()
+        ec = self.default_event_class
+        db_module.db_setup_from_to(conn, 1, db_module.LATEST_DB_VERSION)
+        self.assertEqual(cursor.execute("SELECT Version FROM VERSION").fetchall(), [(db_module.LATEST_DB_VERSION,)])
+        self.assertEqual(db_module.db_event_count(cursor), 3)
+        self.assertEqual(db_module.db_nonce_count(cursor), 3 * self.digits)
+        self.assertEqual(db_module.db_nonce_get_all_by_id(cursor, "ev_2")[6].nonce_pub, "np_2_6")
+        self.assertEqual(len(db_module.db_digitoutcome_get_all_by_id(cursor, "ev_0")), self.digits)
+        # The first outcome is kept, no more duplicates
+        self.assertEqual(db_module.db_outcome_count(cursor), 1)
+        self.assertEqual(db_module.db_outcome_get_by_id(cursor, "ev_0").value, 100)
+        self.assertRaises(sqlite3.IntegrityError, db_module.db_outcome_insert, cursor, OutcomeDto("ev_0", 102, self.start_time))
+        self.assertRaises(sqlite3.IntegrityError, db_module.db_nonce_insert_one, cursor, Nonce("ev_0", 0, "np", "ns"))
+        # Pending outcomes, the existing outcome is taken into account, new ones are maintained
+        self.assertEqual(db_module.db_event_get_past_no_outcome(cursor, self.start_time), ["ev_1", "ev_2"])
+        db_module.db_outcome_insert_many(cursor, [OutcomeDto("ev_1", 100, self.start_time)])
+        self.assertEqual(db_module.db_event_get_no_outcome_since(cursor, 0), [("ev_2", ec.repeat_first_time + 2 * 3600)])
+        self.assertEqual(db_module.db_event_get_earliest_time_without_outcome(cursor, 0), ec.repeat_first_time + 2 * 3600)
+        conn.rollback()
+        cursor.close()
+        conn.close()
+
+    # Without versions in the args, the DB is updated from its own version, through all the steps
+    def test_migration_default_versions(self):
+        argv = sys.argv
+        sys.argv = ["__setup_db.py"]
+        try:
+            conn = self.create_db_v1("/tmp/ora_v1.db")
+            self.assertEqual(db_module.db_get_version(conn), 1)
+            db_module.db_setup(conn)
+            self.assertEqual(db_module.db_get_version(conn), db_module.LATEST_DB_VERSION)
+            # Up to date, nothing to do
+            db_module.db_setup(conn)
+            conn.close()
+            # Empty: created
+            recreate_empty_db_file("/tmp/ora_new.db")
+            conn = sqlite3.connect(":memory:")
+            self.assertEqual(db_module.db_get_version(conn), 0)
+            db_module.db_setup(conn)
+            self.assertEqual(db_module.db_get_version(conn), db_module.LATEST_DB_VERSION)
+            conn.close()
+        finally:
+            sys.argv = argv
+
+        # Same schema as a newly created DB
+        def schema(dbfile: str) -> list:
+            conn = sqlite3.connect(dbfile)
+            rows = conn.execute("SELECT type, name, tbl_name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%' ORDER BY type, name").fetchall()
+            columns = {r[2]: list(map(lambda c: c[1:], conn.execute(f"PRAGMA table_info({r[2]})").fetchall())) for r in rows}
+            conn.close()
+            return [rows, sorted(columns.items())]
+        self.assertEqual(schema("/tmp/ora_v1.db"), schema("/tmp/ora_new.db"))
+        conn = sqlite3.connect("/tmp/ora_v1.db")
+        self.assertEqual(db_module.db_event_get_past_no_outcome(conn.cursor(), self.start_time), ["ev_1", "ev_2"])
+        self.assertEqual(db_module.db_get_key_format(conn.cursor()), db_module.DB_KEY_FORMAT_HEX)
+        conn.close()
+
+    # Keys of a DB updated from v1 (through the default setup path) converted to blobs and back
+    def test_key_format_updated_from_v1(self):
+        conn = self.create_db_v1("/tmp/ora.db")
+        pubkey_id = db_module.db_pubkey_insert_if_missing(conn.cursor(), "03" + "ab" * 32)
+        ec = self.default_event_class
+        db_module.db_event_insert_if_missing(conn.cursor(), EventDto("ev_5", ec.id, ec.definition, ec.repeat_first_time + 5 * 3600, "template", pubkey_id))
+        db_module.db_nonce_insert_many(conn.cursor(), [Nonce("ev_5", 0, "02" + "11" * 32, "22" * 32)])
+        conn.commit()
+        # Not convertible before updated
+        self.assertRaises(Exception, db_module.db_convert_key_format, conn, "blob")
+        argv = sys.argv
+        sys.argv = ["__setup_db.py"]
+        try:
+            db_module.db_setup(conn)
+        finally:
+            sys.argv = argv
+
+        # All rows with text values, the non-hex ones are kept as they are
+        self.assertEqual(db_module.db_convert_key_format(conn, "blob"), 2 + 3 * self.digits + 1 + self.digits)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM NONCE WHERE typeof(NoncePub) == 'blob'").fetchall(), [(1,)])
+        self.assertEqual(conn.execute("SELECT typeof(NoncePub), typeof(NonceSec) FROM NONCE WHERE EventId == 'ev_5'").fetchall(), [("blob", "blob")])
+        conn.execute("VACUUM")
+        conn.close()
+        db = EventStorageDb(data_dir="/tmp")
+        self.assertEqual(db.key_format, "blob")
+        self.assertEqual(db.nonces_get("ev_5")[0].nonce_pub, "02" + "11" * 32)
+        self.assertEqual(db.nonces_get("ev_1")[0].nonce_pub, "np_1_0")
+        self.assertEqual(db.events_get_by_id("ev_5")[1], "03" + "ab" * 32)
+        self.assertEqual(db.events_get_past_no_outcome(self.start_time + 5 * 3600), ["ev_1", "ev_2", "ev_5"])
+        db.close()
+
+        with sqlite3.connect("/tmp/ora.db") as conn:
+            self.assertEqual(db_module.db_convert_key_format(conn, "hex"), 2)
+        conn.close()
+        db = EventStorageDb(data_dir="/tmp")
+        self.assertEqual(db.key_format, "hex")
+        self.assertEqual(db.nonces_get("ev_5")[0].nonce_sec, "22" * 32)
+        db.close()
+
+    # An older DB is not opened, it has to be updated first
+    def test_open_old_version(self):
+        conn = self.create_db_v1("/tmp/ora.db")
+        db_module.db_setup_from_to(conn, 1, db_module.LATEST_DB_VERSION - 1)
+        conn.close()
+        with self.assertRaises(Exception) as cm:
+            EventStorageDb(data_dir="/tmp")
+        self.assertIn(f"DB version v{db_module.LATEST_DB_VERSION - 1} is older", str(cm.exception))
+
+        conn = sqlite3.connect("/tmp/ora.db")
+        db_module.db_setup_from_to(conn, db_module.LATEST_DB_VERSION - 1, db_module.LATEST_DB_VERSION)
+        conn.close()
+        db = EventStorageDb(data_dir="/tmp")
+        self.assertEqual(db.events_len(), 3)
+        self.assertEqual(db.events_get_past_no_outcome(self.start_time), ["ev_1", "ev_2"])
+        db.close()
+
+    # The query plans of the statements executed by fn(cursor, *args)
+    def query_plans(self, conn: sqlite3.Connection, fn, *args) -> list[str]:
+        statements = []
+        conn.set_trace_callback(statements.append)
+        try:
+            fn(conn.cursor(), *args)
+        finally:
+            conn.set_trace_callback(None)
+        plans = []
+        for st in statements:
+            rows = conn.execute("EXPLAIN QUERY PLAN " + st).fetchall()
+            plans.append("; ".join(map(lambda r: r[3], rows)))
+        return plans
+
+    def test_query_plans(self):
+        db = self.create_db()
+        t = self.start_time
+        # Hot queries, with the index they have to use. No full scans, no sorting
+        cases = [
+            (db_module.db_event_get_by_id, ("ev_0",), "SEARCH EVENT USING INDEX sqlite_autoindex_EVENT_1 (EventId=?)"),
+            (db_module.db_event_get_by_ids, (["ev_0", "ev_1"],), "SEARCH EVENT USING INDEX sqlite_autoindex_EVENT_1 (EventId=?)"),
+            (db_module.db_event_get_filter_time_definition, (t, t + 86400, "BTCUSD", 100), "SEARCH EVENT USING INDEX EvDefinitionTime (Definition=? AND Time>? AND Time<?)"),
+            (db_module.db_event_get_filter_time_definition, (t, 0, "BTCUSD", 1), "SEARCH EVENT USING INDEX EvDefinitionTime (Definition=? AND Time>?)"),
+            (db_module.db_event_get_filter_time_definition, (t, t + 86400, None, 100), "SEARCH EVENT USING INDEX EvTime (Time>? AND Time<?)"),
+            (db_module.db_event_get_latest_time_for_def, ("BTCUSD",), "SEARCH EVENT USING COVERING INDEX EvDefinitionTime (Definition=?)"),
+            (db_module.db_event_get_no_outcome_since, (t,), "SEARCH EVENT USING COVERING INDEX EvPendingTime (Time>?)"),
+            (db_module.db_event_get_past_no_outcome, (t,), "SEARCH EVENT USING COVERING INDEX EvPendingTime (Time<?)"),
+            (db_module.db_event_get_earliest_time_without_outcome, (t,), "SEARCH EVENT USING COVERING INDEX EvPendingTime (Time>?)"),
+            (db_module.db_nonce_get_all_by_id, ("ev_0",), "SEARCH NONCE USING PRIMARY KEY (EventId=?)"),
+            (db_module.db_nonce_get_all_by_ids, (["ev_0", "ev_1"],), "SEARCH NONCE USING PRIMARY KEY (EventId=?)"),
+            (db_module.db_digitoutcome_get_all_by_id, ("ev_0",), "SEARCH DIGITOUTCOME USING PRIMARY KEY (EventId=?)"),
+            (db_module.db_digitoutcome_get_all_by_ids, (["ev_0", "ev_1"],), "SEARCH DIGITOUTCOME USING PRIMARY KEY (EventId=?)"),
+            (db_module.db_outcome_get_by_id, ("ev_0",), "SEARCH OUTCOME USING INDEX OutcEventIdUnique (EventId=?)"),
+            (db_module.db_outcome_get_by_ids, (["ev_0", "ev_1"],), "SEARCH OUTCOME USING INDEX OutcEventIdUnique (EventId=?)"),
+            (db_module.db_outcome_exists, ("ev_0",), "SEARCH OUTCOME USING COVERING INDEX OutcEventIdUnique (EventId=?)"),
+        ]
+        with db._cursor_ro() as cursor:
+            conn = cursor.connection
+            for fn, args, expected in cases:
+                plans = self.query_plans(conn, fn, *args)
+                self.assertEqual(len(plans), 1, fn.__name__)
+                self.assertIn(expected, plans[0], fn.__name__)
+                self.assertNotIn("SCAN", plans[0], fn.__name__)
+                self.assertNotIn("TEMP B-TREE", plans[0], fn.__name__)
+            # Has to look at all events, but the nonces by the clustered key
+            plans = self.query_plans(conn, db_module.db_event_get_ids_with_no_nonce, 10)
+            self.assertIn("SEARCH NONCE USING PRIMARY KEY (EventId=?)", plans[0])
+
     def test_get_event_by_outcome(self):
         db = self.create_db()
         db.print_stats()
@@ -264,6 +644,24 @@ class EventStorageTestClass(unittest.TestCase):
             "BTCUSD", 2
         )), 2)
 
+        # Batch getters
+        event_ids = list(map(lambda e: e.event_id, events)) + ["missing_event_id"]
+        events_back = db.events_get_by_ids(event_ids)
+        self.assertEqual(len(events_back), 6)
+        self.assertEqual(events_back[events[2].event_id][0].__dict__, events[2].__dict__)
+        self.assertEqual(events_back[events[2].event_id][1], "signer_pubkey_001")
+        nonces_back = db.nonces_get_by_ids(event_ids)
+        self.assertEqual(len(nonces_back), 6)
+        self.assertEqual(list(map(lambda n: n.__dict__, nonces_back[events[4].event_id])), list(map(lambda n: n.__dict__, db.nonces_get(events[4].event_id))))
+        outcomes_back = db.outcomes_get_by_ids(event_ids)
+        self.assertEqual(sorted(outcomes_back.keys()), sorted(["ev_btcusd_01_005", "ev_btcusd_01_006", "ev_btcusd_01_007"]))
+        self.assertEqual(outcomes_back["ev_btcusd_01_006"].__dict__, db.outcomes_get("ev_btcusd_01_006").__dict__)
+        dos_back = db.digitoutcomes_get_by_ids(event_ids)
+        self.assertEqual(len(dos_back), 3)
+        self.assertEqual(list(map(lambda d: d.__dict__, dos_back["ev_btcusd_01_007"])), list(map(lambda d: d.__dict__, db.digitoutcomes_get("ev_btcusd_01_007"))))
+        self.assertEqual(list(db.event_classes_get_by_ids([event_class.id, "missing"]).keys()), [event_class.id])
+        self.assertEqual(db.events_get_by_ids([]), {})
+
         db.print_stats()
 
 
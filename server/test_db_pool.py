@@ -0,0 +1,95 @@
+from db_pool import ConnectionPool
+
+import sqlite3
+import threading
+import time
+import unittest
+
+
+class ConnectionPoolTestClass(unittest.TestCase):
+    def open_fn(self):
+        return sqlite3.connect(":memory:", check_same_thread=False)
+
+    def test_reuse(self):
+        p = ConnectionPool("test", self.open_fn, 2)
+        with p.connection() as c1:
+            pass
+        with p.connection() as c2:
+            self.assertIs(c1, c2)
+        stats = p.get_stats()
+        self.assertEqual(stats["open"], 1)
+        self.assertEqual(stats["idle"], 1)
+        self.assertEqual(stats["in_use"], 0)
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertEqual(stats["opened"], 1)
+
+    def test_bounded(self):
+        p = ConnectionPool("test", self.open_fn, 2)
+        in_use = 0
+        max_in_use = 0
+        lock = threading.Lock()
+
+        def worker():
+            nonlocal in_use, max_in_use
+            for _i in range(20):
+                with p.connection() as c:
+                    with lock:
+                        in_use += 1
+                        max_in_use = max(max_in_use, in_use)
+                    c.execute("SELECT 1").fetchall()
+                    time.sleep(0.001)
+                    with lock:
+                        in_use -= 1
+
+        threads = [threading.Thread(target=worker) for _i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        stats = p.get_stats()
+        self.assertLessEqual(max_in_use, 2)
+        self.assertLessEqual(stats["opened"], 2)
+        self.assertEqual(stats["checkouts"], 160)
+        self.assertGreater(stats["waits"], 0)
+        self.assertEqual(stats["in_use"], 0)
+
+    def test_reap_idle(self):
+        p = ConnectionPool("test", self.open_fn, 4, idle_seconds=0.05)
+        with p.connection() as _c1:
+            with p.connection() as _c2:
+                pass
+        self.assertEqual(p.get_stats()["idle"], 2)
+        time.sleep(0.1)
+        with p.connection() as _c3:
+            pass
+        stats = p.get_stats()
+        self.assertEqual(stats["reaped"], 2)
+        self.assertEqual(stats["open"], 1)
+        self.assertEqual(stats["opened"], 3)
+
+    def test_rollback_on_return(self):
+        p = ConnectionPool("test", self.open_fn, 1)
+        with p.connection() as c:
+            c.execute("CREATE TABLE T (A INTEGER)")
+            c.commit()
+            c.execute("INSERT INTO T VALUES (1)")
+        with p.connection() as c:
+            self.assertEqual(c.execute("SELECT COUNT(*) FROM T").fetchall(), [(0,)])
+
+    def test_close(self):
+        p = ConnectionPool("test", self.open_fn, 2)
+        with p.connection() as c1:
+            with p.connection() as _c2:
+                pass
+            p.close()
+            self.assertEqual(p.get_stats()["open"], 1)
+        # Connection in use at close is closed when returned
+        self.assertEqual(p.get_stats()["open"], 0)
+        self.assertRaises(sqlite3.ProgrammingError, c1.execute, "SELECT 1")
+        # Still usable
+        with p.connection() as c3:
+            self.assertEqual(c3.execute("SELECT 1").fetchall(), [(1,)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -228,6 +228,15 @@ class NoncesTestCase(unittest.TestCase):
         self.assertEqual(nonces[3].digit_index, 3)
         self.assertEqual(len(nonces[3].nonce_sec), 64)
 
+    def test_generate_multi(self):
+        noncess = Nonces.generate_multi([("event001", 9), ("event002", 7), ("event003", 4)])
+        self.assertEqual(list(map(lambda n: len(n), noncess)), [9, 7, 4])
+        self.assertEqual(noncess[1][5].event_id, "event002")
+        self.assertEqual(noncess[1][5].digit_index, 5)
+        # Same as one-by-one
+        self.assertEqual(list(map(lambda n: n.__dict__, noncess[0])), list(map(lambda n: n.__dict__, Nonces.generate("event001", 9))))
+        self.assertEqual(Nonces.generate_multi([]), [])
+
 
 class OutcomeTestCase(unittest.TestCase):
     @classmethod
@@ -279,6 +288,27 @@ class OutcomeTestCase(unittest.TestCase):
         self.assertRaises(Exception, Outcome.create, outcome_value="non_numeric_88000", event_id=event_id, event_desc=desc, created_time=2019600000, nonces=nonces)
 
 
+    def test_create_multi(self):
+        desc = EventDescription("BTCUSD", 7, 0, "signer_key1")
+        requests = []
+        for i in range(3):
+            event_id = f"event12{i}"
+            requests.append((str(88000 + i), event_id, desc, self.public_key, Nonces.generate(event_id, 7)))
+        outcomes = Outcome.create_multi(requests, 2019600000)
+        self.assertEqual(len(outcomes), 3)
+        # Same as one-by-one
+        for i in range(3):
+            o1 = Outcome.create(requests[i][0], requests[i][1], desc, 2019600000, self.public_key, requests[i][4])
+            self.assertEqual(outcomes[i].dto.__dict__, o1.dto.__dict__)
+            self.assertEqual(list(map(lambda d: d.to_info(), outcomes[i].digits)), list(map(lambda d: d.to_info(), o1.digits)))
+        self.assertEqual(outcomes[2].digits[6].value, 2)
+        self.assertEqual(Outcome.create_multi([], 2019600000), [])
+
+        # Wrong signer key
+        requests[1] = (requests[1][0], requests[1][1], desc, "signer_key1", requests[1][4])
+        self.assertRaises(Exception, Outcome.create_multi, requests, 2019600000)
+
+
 class EventTestCase(unittest.TestCase):
     def test_new(self):
         class_id = "btcusd1"
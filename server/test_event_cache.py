@@ -0,0 +1,79 @@
+from event_cache import EventInfoCache, estimate_size
+
+import unittest
+
+
+class EventInfoCacheTestClass(unittest.TestCase):
+    def info(self, event_id: str, has_outcome: bool = False):
+        return {"event_id": event_id, "has_outcome": has_outcome, "nonces": ["02" + "ab" * 32] * 7}
+
+    def test_get_put(self):
+        c = EventInfoCache(max_entries=10)
+        self.assertIsNone(c.get("ev1"))
+        c.put("ev1", self.info("ev1"), c.get_generation())
+        self.assertEqual(c.get("ev1"), self.info("ev1"))
+        stats = c.get_stats()
+        self.assertEqual(stats["entries"], 1)
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["bytes"], estimate_size(self.info("ev1")))
+
+    def test_returns_copy(self):
+        c = EventInfoCache()
+        c.put("ev1", self.info("ev1"), c.get_generation())
+        i1 = c.get("ev1")
+        del i1["nonces"]
+        self.assertEqual(c.get("ev1"), self.info("ev1"))
+
+    def test_invalidate(self):
+        c = EventInfoCache()
+        c.put("ev1", self.info("ev1"), c.get_generation())
+        c.put("ev2", self.info("ev2"), c.get_generation())
+        c.invalidate("ev1")
+        self.assertIsNone(c.get("ev1"))
+        self.assertIsNotNone(c.get("ev2"))
+        self.assertEqual(c.get_stats()["invalidations"], 1)
+
+    def test_put_after_invalidation_ignored(self):
+        c = EventInfoCache()
+        # Generation taken before reading the data, outcome is inserted meanwhile
+        generation = c.get_generation()
+        c.invalidate("ev1")
+        c.put("ev1", self.info("ev1", False), generation)
+        self.assertIsNone(c.get("ev1"))
+        c.put("ev1", self.info("ev1", True), c.get_generation())
+        self.assertTrue(c.get("ev1")["has_outcome"])
+
+    def test_lru_max_entries(self):
+        c = EventInfoCache(max_entries=3)
+        for i in range(3):
+            c.put(f"ev{i}", self.info(f"ev{i}"), c.get_generation())
+        # touch ev0, so ev1 is the least recently used
+        self.assertIsNotNone(c.get("ev0"))
+        c.put("ev3", self.info("ev3"), c.get_generation())
+        self.assertIsNone(c.get("ev1"))
+        self.assertIsNotNone(c.get("ev0"))
+        self.assertIsNotNone(c.get("ev3"))
+        self.assertEqual(c.get_stats()["entries"], 3)
+        self.assertEqual(c.get_stats()["evictions"], 1)
+
+    def test_max_bytes(self):
+        size = estimate_size(self.info("ev0"))
+        c = EventInfoCache(max_entries=100, max_bytes=int(2.5 * size))
+        for i in range(5):
+            c.put(f"ev{i}", self.info(f"ev{i}"), c.get_generation())
+        self.assertEqual(c.get_stats()["entries"], 2)
+        self.assertLessEqual(c.get_stats()["bytes"], c.max_bytes)
+        self.assertIsNotNone(c.get("ev4"))
+        self.assertIsNone(c.get("ev0"))
+
+    def test_clear(self):
+        c = EventInfoCache()
+        c.put("ev1", self.info("ev1"), c.get_generation())
+        c.clear()
+        self.assertIsNone(c.get("ev1"))
+        self.assertEqual(c.get_stats()["bytes"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main() # run all tests
@@ -1,6 +1,10 @@
-from oracle import EventClass, EventDescription, Oracle
+from oracle import EventClass, EventDescription, EventResolver, Nonces, Oracle
+from price_history import PriceHistory
+from response_cache import CACHE_CONTROL_SETTLED, CACHE_CONTROL_UNSETTLED
 from test_common import PriceSourceMockConstant, initialize_cryptlib_direct, recreate_empty_db_file
 
+import asyncio
+import json
 import math
 import unittest
 
@@ -126,6 +130,22 @@ class OracleTestClass(unittest.TestCase):
         })
         o.close()
 
+    def test_fill_nonces(self):
+        o = self.create_oracle()
+        o.load_event_classes(self.event_classes, defer_nonces=True)
+        self.assertEqual(len(o.db.events_get_ids_with_no_nonce(1000)), 76)
+
+        cnt = o.create_nonces(50)
+        self.assertEqual(cnt, 50)
+        self.assertEqual(len(o.db.events_get_ids_with_no_nonce(1000)), 26)
+        o.fill_nonces_all()
+        self.assertEqual(len(o.db.events_get_ids_with_no_nonce(1000)), 0)
+
+        nonces = o.db.nonces_get('btceur1762970400')
+        self.assertEqual(len(nonces), 7)
+        self.assertEqual(list(map(lambda n: n.__dict__, nonces)), list(map(lambda n: n.__dict__, Nonces.generate('btceur1762970400', 7))))
+        o.close()
+
     def test_filter(self):
         o = self.create_oracle()
         o.load_event_classes(self.event_classes)
@@ -140,12 +160,12 @@ class OracleTestClass(unittest.TestCase):
         # No definition given
         filtered = o.get_event_ids_filter(self.now - 20000, self.now + 20000, None)
         self.assertEqual(len(filtered), 22)
-        self.assertEqual(filtered[0], 'btcusd1762970400')
+        self.assertEqual(filtered[0], 'btceur1762970400')
         # self.assertEqual(filtered[10], 'btcusd1763006400')
         # self.assertEqual(filtered[11], 'btceur1762970400')
-        self.assertEqual(filtered[10], 'btcusd1762988400')
-        self.assertEqual(filtered[11], 'btceur1762988400')
-        self.assertEqual(filtered[len(filtered)-1], 'btceur1763006400')
+        self.assertEqual(filtered[10], 'btceur1762988400')
+        self.assertEqual(filtered[11], 'btcusd1762988400')
+        self.assertEqual(filtered[len(filtered)-1], 'btcusd1763006400')
 
         # No end time given
         filtered = o.get_event_ids_filter(self.now - 20000, 0, 'btcusd')
@@ -187,6 +207,148 @@ class OracleTestClass(unittest.TestCase):
 
         o.close()
 
+    # Events resolved from the event classes match the DB
+    def test_event_resolver(self):
+        o = self.create_oracle()
+        o.load_event_classes(self.event_classes)
+        last_time = self.event_classes[0].dto.repeat_last_time
+        # Horizon extension, past the last time of the classes
+        o.horizon_days = 1
+        cnt, _next = o._create_future_events(self.now + 86400, max_count=10)
+        self.assertEqual(cnt, 10)
+        self.assertEqual(o.event_resolver.latest_time("BTCUSD"), last_time + 10 * 3600)
+
+        # Same-time events (of different definitions) in event ID order
+        def listing_order(event_ids):
+            return sorted(event_ids, key=lambda eid: (int(eid[6:]), eid))
+        all_ids = listing_order(o.db.events_get_ids_filter(0, 0, None, 0))
+        self.assertEqual(len(all_ids), 86)
+        for resolver in [o.resolver(), EventResolver()]:
+            if not resolver.loaded:
+                # Freshly loaded from the DB
+                o.event_resolver = resolver
+                resolver = o.resolver()
+            self.assertEqual(resolver.list_event_ids(0, 0, None, 0), all_ids)
+            for start_time, end_time, definition, limit in [(self.now - 20000, self.now + 20000, None, 0), (self.now, 0, "BTCUSD", 0), (0, self.now, "BTCEUR", 5), (last_time, 0, None, 0)]:
+                self.assertEqual(resolver.list_event_ids(start_time, end_time, definition, limit), listing_order(o.db.events_get_ids_filter(start_time, end_time, definition, limit)))
+            for eid in all_ids:
+                e = resolver.resolve(eid)
+                e_dto, pubkey = o.db.events_get_by_id(eid)
+                self.assertEqual(e.dto.__dict__ | {"signer_public_key_id": 0}, e_dto.__dict__ | {"signer_public_key_id": 0})
+                self.assertEqual(e.signer_public_key, pubkey)
+            for eid in ["btcusd1762970401", "btcusd01762970400", "btcusd", "xbtusd1762970400", "btcusd" + str(last_time + 11 * 3600), "btceur" + str(last_time + 3600)]:
+                self.assertIsNone(resolver.resolve(eid))
+
+        # Next event, also past the last time of the class
+        self.assertEqual(o._get_next_event_with_time("BTCUSD", last_time + 1)["time_utc"], last_time + 3600)
+        self.assertEqual(o._get_next_event_with_time("BTCEUR", last_time + 1), {})
+        o.close()
+
+    # Keyset pagination, and the streamed listings, match the full listing
+    def test_listing_pages(self):
+        o = self.create_oracle()
+        o.load_event_classes(self.event_classes)
+        o._create_past_outcomes_time(self.now, event_too_old_threshold=100_000_000)
+        resolver = o.resolver()
+        all_ids = resolver.list_event_ids(0, 0, None, 0)
+        self.assertEqual(len(all_ids), 76)
+
+        for definition, page_size in [(None, 1), (None, 7), ("BTCEUR", 5), (None, 100)]:
+            expected = resolver.list_event_ids(0, 0, definition, 0)
+            walked = []
+            after = None
+            while True:
+                page = resolver.list_event_ids(0, 0, definition, page_size, after)
+                walked.extend(page)
+                after = Oracle.next_cursor(page, page_size)
+                if after is None:
+                    break
+            self.assertEqual(walked, expected)
+            self.assertEqual(list(resolver.list_event_ids_iter(0, 0, definition, None, page_size)), expected)
+
+        # Cursor with a time range, and from another definition
+        ranged = resolver.list_event_ids(self.now - 20000, self.now + 20000, None, 0)
+        self.assertEqual(resolver.list_event_ids(self.now - 20000, self.now + 20000, None, 0, ranged[5]), ranged[6:])
+        self.assertEqual(resolver.list_event_ids(self.now - 20000, self.now + 20000, None, 0, all_ids[0]), ranged)
+        self.assertEqual(resolver.list_event_ids(0, 0, "BTCUSD", 3, "btceur" + all_ids[10][6:]), list(filter(lambda eid: eid.startswith("btcusd"), all_ids[11:]))[:3])
+        with self.assertRaises(Exception):
+            resolver.list_event_ids(0, 0, None, 0, "btcusd1762970401")
+        self.assertFalse(o.is_valid_cursor("btcusd1762970401"))
+        self.assertTrue(o.is_valid_cursor(all_ids[3]))
+
+        self.assertEqual(o.get_event_ids_filter(0, 0, None, all_ids[40]), all_ids[41:])
+        self.assertEqual(o.get_events_filter(0, 0, "btcusd", 10, all_ids[40]), o.get_events_by_ids(list(filter(lambda eid: eid.startswith("btcusd"), all_ids[41:]))[:10]))
+
+        # Streamed, one per line
+        lines = b"".join(o.iter_event_ids_ndjson(0, 0, None, all_ids[1])).split(b"\n")
+        self.assertEqual(lines[-1], b"")
+        self.assertEqual(list(map(json.loads, lines[:-1])), all_ids[2:])
+        lines = b"".join(o.iter_events_ndjson(0, 0, "btceur")).split(b"\n")
+        self.assertEqual(list(map(json.loads, lines[:-1])), o.get_events_by_ids(list(filter(lambda eid: eid.startswith("btceur"), all_ids))))
+        self.assertEqual(list(o.iter_events_ndjson(self.now + 10**6, 0, None)), [])
+        o.close()
+
+    # Same-time events in event ID order; a cursor handed out before a class is inserted stays in place
+    def test_listing_pages_class_inserted(self):
+        o = self.create_oracle()
+        o.load_event_classes(self.event_classes[1:])
+        resolver = o.resolver()
+        o.load_event_classes(self.event_classes[:1])
+        all_ids = resolver.list_event_ids(0, 0, None, 0)
+        self.assertEqual(all_ids[:2], ["btceur1762963200", "btcusd1762963200"])
+
+        walked = []
+        after = None
+        for _i in range(3):
+            page = resolver.list_event_ids(0, 0, None, 7, after)
+            walked.extend(page)
+            after = Oracle.next_cursor(page, 7)
+        # A class of a new definition, ordered before the others by event ID, and a new class of an existing one
+        ec = self.event_classes[0]
+        o.load_event_classes([
+            EventClass.new("btcaud01", self.now, "BTCAUD", 7, 0, ec.dto.repeat_first_time, 3600, ec.dto.repeat_last_time, self.test_public_key),
+            EventClass.new("btceur02", self.now, "BTCEUR", 7, 0, ec.dto.repeat_last_time + 1800, 1800, ec.dto.repeat_last_time + 20 * 3600, self.test_public_key),
+        ])
+        self.assertEqual(list(resolver._classes.keys())[0], "BTCEUR")
+        rest = list(resolver.list_event_ids_iter(0, 0, None, after, 7))
+        walked.extend(rest)
+        self.assertEqual(len(walked), len(set(walked)))
+        self.assertEqual(list(filter(lambda eid: eid in all_ids, walked)), all_ids)
+        all_after = resolver.list_event_ids(0, 0, None, 0)
+        self.assertEqual(rest, all_after[all_after.index(after) + 1:])
+
+        # Same order and cursor positions whatever the order of the classes, e.g. loaded after a restart
+        class_dtos = o.db.event_classes_get_all()
+        latest_times = {dto.definition: o.db.events_get_latest_time_for_def(dto.definition) for dto in class_dtos}
+        reloaded = EventResolver()
+        reloaded.load(list(reversed(class_dtos)), latest_times)
+        self.assertEqual(reloaded.list_event_ids(0, 0, None, 0), all_after)
+        self.assertEqual(reloaded.list_event_ids(0, 0, None, 0, after), rest)
+        o.close()
+
+    def test_horizon_extension(self):
+        o = self.create_oracle()
+        o.load_event_classes(self.event_classes)
+        last_time = self.event_classes[0].dto.repeat_last_time
+        o.horizon_days = 2
+        current_time = self.now + 86400
+        # Limited
+        cnt, _next = o._create_future_events(current_time, max_count=5)
+        self.assertEqual(cnt, 5)
+        # Rest, up to the first slot at or after the horizon
+        horizon_slot = math.ceil((current_time + 2 * 86400) / 3600) * 3600
+        cnt, next_time = o._create_future_events(current_time)
+        self.assertEqual(cnt, 2 * (horizon_slot - last_time) // 3600 - 5)
+        self.assertEqual(next_time, horizon_slot + 3600)
+        self.assertEqual(o.db.events_len(), 76 + 2 * (horizon_slot - last_time) // 3600)
+        self.assertEqual(o.db.events_get_ids_filter(0, 0, "BTCEUR", 0)[-1], "btceur" + str(horizon_slot))
+        # With nonces, scheduled
+        self.assertEqual(o.db.events_get_ids_with_no_nonce(), [])
+        self.assertEqual(len(o.outcome_scheduler), 76 + 2 * (horizon_slot - last_time) // 3600)
+        # Nothing more to do
+        self.assertEqual(o._create_future_events(current_time)[0], 0)
+        o.close()
+
     # Next event with multiple event classes per definition
     def test_with_multiple_event_classes(self):
         o = self.create_oracle()
@@ -246,10 +408,198 @@ class OracleTestClass(unittest.TestCase):
         cnt, _next_time = o._create_past_outcomes_time(self.now, event_too_old_threshold=100_000_000)
         self.assertEqual(cnt, 16)
 
-        # get the event, should have outcome
+        # get the event, should have outcome (cached info without outcome is invalidated)
         e2 = o.get_event_by_id(event_id)
         self.assert_event_has_outcome(e2, 88888.5)
 
+        # From the cache now
+        hits = o.get_event_info_cache_stats()['hits']
+        e3 = o.get_event_by_id(event_id)
+        self.assertEqual(e3, e2)
+        self.assertEqual(o.get_event_info_cache_stats()['hits'], hits + 1)
+        self.assertGreaterEqual(o.get_event_info_cache_stats()['invalidations'], 16)
+
+        # Settled, serialized once, then served from the response store
+        resp = o.get_event_response_by_id(event_id)
+        self.assertEqual(json.loads(resp.body), e2)
+        self.assertEqual(resp.cache_control, CACHE_CONTROL_SETTLED)
+        self.assertIs(o.get_event_response_by_id(event_id), resp)
+        self.assertEqual(o.get_event_info_cache_stats()['response_store']['hits'], 1)
+        # Not settled, not stored
+        resp2 = o.get_event_response_by_id('btcusd1763053200')
+        self.assertEqual(resp2.cache_control, CACHE_CONTROL_UNSETTLED)
+        self.assertEqual(o.get_event_info_cache_stats()['response_store']['entries'], 1)
+        o.delete_all_contents()
+        self.assertEqual(o.get_event_info_cache_stats()['response_store']['entries'], 0)
+
+        o.close()
+
+    # Committed outcomes are pushed to the feed subscribers, same infos as served by the API
+    def test_outcome_feed(self):
+        o = self.create_oracle()
+        o.load_event_classes(self.event_classes)
+
+        async def run():
+            sub = o.outcome_feed.subscribe("BTCEUR")
+            cnt, _next_time = o._create_past_outcomes_time(self.now, event_too_old_threshold=100_000_000)
+            self.assertEqual(cnt, 16)
+            return await sub.get(1)
+        items = asyncio.run(run())
+        self.assertEqual(len(items), 8)
+        event_id, body = items[0]
+        self.assertTrue(event_id.startswith("btceur"))
+        self.assertEqual(json.loads(body), o.get_event_by_id(event_id))
+        self.assert_event_has_outcome(json.loads(body), 88888.5)
+        # Stored for the polling clients as well
+        self.assertIs(o.get_event_response_by_id(event_id).body, body)
+        self.assertEqual(o.outcome_feed.get_stats()["published"], 16)
+        o.close()
+
+    def test_outcome_price_history(self):
+        o = self.create_oracle()
+        o.load_event_classes(self.event_classes)
+        event_time = 1762970400
+        # Price history: ticks around one event time, the mock serves from it
+        history = PriceHistory(max_distance=30)
+        for dt, price in [(-20, 77000), (-10, 77700), (4, 77777), (12, 78000)]:
+            history.record("BTCEUR", event_time + dt, price)
+        o.price_source.get_price_at = history.get_price_at
+
+        cnt, _next_time = o._create_past_outcomes_time(self.now, event_too_old_threshold=100_000_000)
+        self.assertEqual(cnt, 16)
+        # Nearest tick to the event time
+        self.assert_event_has_outcome(o.get_event_by_id("btceur1762970400"), 77777)
+        # No tick near the event time: current price
+        self.assert_event_has_outcome(o.get_event_by_id("btceur1762966800"), 88888.5)
+        self.assert_event_has_outcome(o.get_event_by_id("btcusd1762970400"), 98765)
+        o.close()
+
+    def test_outcome_scheduler(self):
+        o = self.create_oracle()
+        o.load_event_classes(self.event_classes[:1])
+        o.load_outcome_schedule(self.now, event_too_old_threshold=100_000_000)
+        self.assertEqual(len(o.outcome_scheduler), 38)
+        # Newly inserted events get scheduled
+        o.load_event_classes(self.event_classes[1:])
+        self.assertEqual(len(o.outcome_scheduler), 76)
+
+        cnt = o._create_due_outcomes(self.now)
+        self.assertEqual(cnt, 16)
+        self.assert_event_has_outcome(o.get_event_by_id("btceur1762970400"), 88888.5)
+        self.assertEqual(len(o.outcome_scheduler), 60)
+        self.assertEqual(o.outcome_scheduler.get_latency_stats()["count"], 16)
+        # Nothing due until the next event time plus the settle delay
+        next_deadline = 1762988400 + 3600 + o.outcome_scheduler.settle_secs
+        self.assertEqual(o.outcome_scheduler.next_deadline(), next_deadline)
+        self.assertEqual(o._create_due_outcomes(next_deadline - 0.1), 0)
+        self.assertEqual(o._create_due_outcomes(next_deadline), 2)
+        o.close()
+
+    # Deleting the contents drops the scheduled deadlines, the schedule is loaded again
+    def test_outcome_scheduler_delete_all(self):
+        o = self.create_oracle()
+        o.load_event_classes(self.event_classes)
+        o.load_outcome_schedule(self.now, event_too_old_threshold=100_000_000)
+        self.assertEqual(len(o.outcome_scheduler), 76)
+        o.delete_all_contents()
+        self.assertEqual(len(o.outcome_scheduler), 0)
+        self.assertFalse(o.outcome_scheduler.loaded)
+        self.assertEqual(o.outcome_scheduler.pop_due(self.now + 100 * 86400), [])
+        self.assertEqual(o._create_due_outcomes(self.now), 0)
+
+        o.load_event_classes(self.event_classes[:1])
+        o.load_outcome_schedule(self.now, event_too_old_threshold=100_000_000)
+        self.assertEqual(len(o.outcome_scheduler), 38)
+        self.assertEqual(o._create_due_outcomes(self.now), 8)
+        o.close()
+
+    def test_outcome_batch(self):
+        o = self.create_oracle()
+        o.load_event_classes(self.event_classes, defer_nonces=True)
+        price_calls = []
+        get_price_info = o.price_source.get_price_info
+        o.price_source.get_price_info = lambda symbol, pref_max_age = 0: price_calls.append(symbol) or get_price_info(symbol, pref_max_age)
+
+        events = o.get_event_objs_by_ids(o.db.events_get_past_no_outcome(self.now))
+        self.assertEqual(len(events), 16)
+        # One with a signer key not matching
+        events[3].signer_public_key = "02" + "00" * 32
+        created, failed = o._create_outcomes_batch(events, self.now)
+        self.assertEqual(len(created), 15)
+        self.assertEqual(list(map(lambda e: e.dto.event_id, failed)), [events[3].dto.event_id])
+        # Price fetched once per definition
+        self.assertEqual(sorted(price_calls), ["BTCEUR", "BTCUSD"])
+        # Missing nonces were generated
+        self.assertEqual(len(o.db.nonces_get(events[3].dto.event_id)), 7)
+        self.assert_event_has_outcome(o.get_event_by_id("btceur1762970400"), 88888.5)
+        self.assertEqual(o.get_event_by_id(events[3].dto.event_id)["has_outcome"], False)
+        self.assertEqual(len(o.db.events_get_past_no_outcome(self.now)), 1)
+        o.close()
+
+    # Only the outcomes actually created are counted
+    def test_past_outcomes_failed(self):
+        o = self.create_oracle()
+        o.load_event_classes(self.event_classes)
+        get_prices_for_events = o.get_prices_for_events
+
+        def get_prices_failing(definition, times):
+            if definition == "BTCEUR":
+                raise Exception("No price")
+            return get_prices_for_events(definition, times)
+        o.get_prices_for_events = get_prices_failing
+
+        cnt, _next_time = o._create_past_outcomes_time(self.now, event_too_old_threshold=100_000_000)
+        self.assertEqual(cnt, 8)
+        self.assertEqual(o.get_event_by_id("btceur1762970400")["has_outcome"], False)
+        # None created
+        o.get_prices_for_events = lambda definition, times: get_prices_failing("BTCEUR", times)
+        cnt, _next_time = o._create_past_outcomes_time(self.now, event_too_old_threshold=100_000_000)
+        self.assertEqual(cnt, 0)
+        o.get_prices_for_events = get_prices_for_events
+        cnt, _next_time = o._create_past_outcomes_time(self.now, event_too_old_threshold=100_000_000)
+        self.assertEqual(cnt, 8)
+        o.close()
+
+    def test_get_events_by_ids(self):
+        o = self.create_oracle()
+        o.load_event_classes(self.event_classes)
+        cnt, _next_time = o._create_past_outcomes_time(self.now, event_too_old_threshold=100_000_000)
+        self.assertEqual(cnt, 16)
+
+        event_ids = o.get_event_ids_filter(0, 0, None)
+        self.assertEqual(len(event_ids), 76)
+        # Include a nonexistent ID too
+        event_ids_with_missing = event_ids[:10] + ['btceur1762970407'] + event_ids[10:]
+
+        # Batch result should be identical to individual lookups
+        batch = o.get_events_by_ids(event_ids_with_missing)
+        individual = list(map(lambda eid: o.get_event_by_id(eid), event_ids))
+        self.assertEqual(len(batch), 76)
+        self.assertEqual(batch, individual)
+        self.assertEqual(len(list(filter(lambda e: e['has_outcome'], batch))), 16)
+
+        self.assertEqual(o.get_events_by_ids([]), [])
+
+        o.close()
+
+    def test_get_events_response_by_ids(self):
+        o = self.create_oracle()
+        o.load_event_classes(self.event_classes)
+        o._create_past_outcomes_time(self.now, event_too_old_threshold=100_000_000)
+        event_ids = o.get_event_ids_filter(0, 0, None)
+
+        # Settled ones stored on first use, then reused; repeated and missing IDs skipped
+        request_ids = event_ids[:20] + ['btceur1762970407'] + event_ids[:5]
+        body = o.get_events_response_by_ids(request_ids)
+        self.assertEqual(json.loads(body), o.get_events_by_ids(event_ids[:20]))
+        settled_count = len(list(filter(lambda e: e['has_outcome'], json.loads(body))))
+        self.assertGreater(settled_count, 0)
+        self.assertEqual(o.get_event_info_cache_stats()['response_store']['entries'], settled_count)
+        hits = o.get_event_info_cache_stats()['response_store']['hits']
+        self.assertEqual(o.get_events_response_by_ids(request_ids), body)
+        self.assertEqual(o.get_event_info_cache_stats()['response_store']['hits'], hits + settled_count)
+
+        self.assertEqual(o.get_events_response_by_ids([]), b"[]")
         o.close()
 
 
@@ -0,0 +1,149 @@
+from oracle import EventClass, Oracle
+from oracle_async import AsyncOracle
+from response_cache import CACHE_CONTROL_SETTLED
+from test_common import PriceSourceMockConstant, initialize_cryptlib_direct, recreate_empty_db_file
+
+import asyncio
+import json
+import math
+import threading
+import unittest
+
+
+# The parts of the app used by the facade
+class OracleAppStub:
+    def __init__(self, oracle: Oracle):
+        self.oracle = oracle
+
+    def get_price_stats(self):
+        return self.oracle.price_source.get_stats()
+
+
+class AsyncOracleTestClass(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _xpub, cls.public_key = initialize_cryptlib_direct()
+        repeat_time = 3600
+        cls.now = 1762988557
+        test_public_key = "0323423d31a856d8d8c8f7fe46ca984ee2cdddcd8506b805417e9c382f637149fd"
+        repeat_first_time = int(math.floor(cls.now / repeat_time)) * repeat_time - 7 * repeat_time
+        repeat_last_time = repeat_first_time + 37 * repeat_time
+        cls.event_classes = [
+            EventClass.new("btcusd01", cls.now, "BTCUSD", 7, 0, repeat_first_time, repeat_time, repeat_last_time, test_public_key),
+            EventClass.new("btceur01", cls.now, "BTCEUR", 7, 0, repeat_first_time, repeat_time, repeat_last_time, test_public_key),
+        ]
+
+    def setUp(self):
+        datadir = "/tmp"
+        recreate_empty_db_file(datadir + "/ora.db")
+        self.oracle = Oracle(self.public_key, data_dir_override=datadir, price_source_override=PriceSourceMockConstant(98765))
+        self.oracle.load_event_classes(self.event_classes, defer_nonces=False)
+        self.ao = AsyncOracle(OracleAppStub(self.oracle), reader_count=2)
+
+    def tearDown(self):
+        self.ao.close()
+        self.oracle.close()
+
+    def test_reads(self):
+        async def run():
+            self.assertEqual(self.ao.get_oracle_info(), self.oracle.get_oracle_info())
+            self.assertEqual((await self.ao.get_oracle_status())["total_event_count"], 2 * 38)
+            self.assertEqual(await self.ao.get_event_classes(), self.oracle.get_event_classes())
+            ids = await self.ao.get_event_ids_filter(self.now - 86400, self.now + 86400, "btcusd")
+            self.assertEqual(ids, self.oracle.get_event_ids_filter(self.now - 86400, self.now + 86400, "btcusd"))
+            events = await self.ao.get_events_filter(self.now - 86400, self.now + 86400, "btcusd")
+            self.assertEqual(list(map(lambda e: e["event_id"], events)), ids)
+            self.assertEqual(await self.ao.get_next_event("btcusd", 60), self.oracle.get_next_event("btcusd", 60))
+        asyncio.run(run())
+        stats = self.ao.get_stats()
+        self.assertEqual(stats["readers"], 2)
+        self.assertEqual(stats["reads"], 5)
+        self.assertEqual(stats["direct"], 1)
+
+    def test_event_response(self):
+        event_id = 'btceur1762970400'
+        self.oracle._create_past_outcomes_time(self.now, event_too_old_threshold=100_000_000)
+
+        async def run():
+            resp = await self.ao.get_event_response_by_id(event_id)
+            self.assertEqual(resp.cache_control, CACHE_CONTROL_SETTLED)
+            self.assertEqual(json.loads(resp.body), self.oracle.get_event_by_id(event_id))
+            # Stored now, served on the loop
+            self.assertIs(await self.ao.get_event_response_by_id(event_id), resp)
+        asyncio.run(run())
+        self.assertEqual(self.ao.get_stats()["reads"], 1)
+        self.assertEqual(self.ao.get_stats()["direct"], 1)
+        store_stats = self.ao.get_event_info_cache_stats()["response_store"]
+        self.assertEqual(store_stats["hits"], 1)
+        self.assertEqual(store_stats["misses"], 1)
+
+    def test_prices(self):
+        async def run():
+            self.assertEqual(await self.ao.get_current_price("btcusd"), 98765)
+            self.assertEqual((await self.ao.get_current_price_info("BTCEUR")).price, 98765 * 0.9)
+            self.assertEqual(await self.ao.get_current_prices(), {"BTCUSD": 98765, "BTCEUR": 98765 * 0.9})
+        asyncio.run(run())
+
+    # New outcomes pushed as Server-Sent Events, until the client goes away
+    def test_outcome_stream(self):
+        async def run():
+            sub = self.ao.subscribe_outcomes("btcusd")
+            stream = self.ao.iter_outcomes_sse(sub)
+            self.assertEqual(await stream.__anext__(), b": subscribed\n\n")
+            next_chunk = asyncio.ensure_future(stream.__anext__())
+            await asyncio.sleep(0.01)
+            self.assertFalse(next_chunk.done())
+            # Created on another thread, as by the outcome loop
+            await asyncio.get_running_loop().run_in_executor(None, self.oracle._create_past_outcomes_time, self.now, 100_000_000)
+            chunk = await next_chunk
+            while chunk.count(b"event: outcome") < 8:
+                chunk += await stream.__anext__()
+            self.assertEqual(self.oracle.outcome_feed.get_stats()["subscribers"], 1)
+            await stream.aclose()
+            self.assertEqual(self.oracle.outcome_feed.get_stats()["subscribers"], 0)
+            return chunk
+        chunk = asyncio.run(run())
+        messages = chunk.decode().split("\n\n")[:-1]
+        self.assertEqual(len(messages), 8)
+        event_id_line, event_line, data_line = messages[0].split("\n")
+        event_id = event_id_line[len("id: "):]
+        self.assertTrue(event_id.startswith("btcusd"))
+        self.assertEqual(event_line, "event: outcome")
+        self.assertEqual(json.loads(data_line[len("data: "):]), self.oracle.get_event_by_id(event_id))
+
+    # DB reads run on the reader threads, at most reader_count at a time, the loop is not blocked
+    def test_readers(self):
+        active = 0
+        max_active = 0
+        thread_names = set()
+        lock = threading.Lock()
+        release = threading.Event()
+        get_event_classes = self.oracle.get_event_classes
+
+        def slow_get_event_classes():
+            nonlocal active, max_active
+            with lock:
+                active += 1
+                max_active = max(max_active, active)
+                thread_names.add(threading.current_thread().name)
+            release.wait(5)
+            with lock:
+                active -= 1
+            return get_event_classes()
+        self.oracle.get_event_classes = slow_get_event_classes
+
+        async def run():
+            tasks = [asyncio.ensure_future(self.ao.get_event_classes()) for _i in range(6)]
+            # The loop keeps serving while the reads wait
+            await asyncio.sleep(0.1)
+            self.assertEqual(self.ao.get_oracle_info()["main_public_key"], self.oracle.public_key)
+            release.set()
+            return await asyncio.gather(*tasks)
+        results = asyncio.run(run())
+        self.assertEqual(len(results), 6)
+        self.assertEqual(max_active, 2)
+        self.assertTrue(all(map(lambda n: n.startswith("db-reader"), thread_names)))
+
+
+if __name__ == "__main__":
+    unittest.main() # run all tests
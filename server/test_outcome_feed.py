@@ -0,0 +1,87 @@
+from outcome_feed import OutcomeFeed
+
+import asyncio
+import threading
+import time
+import unittest
+
+
+class OutcomeFeedTestClass(unittest.TestCase):
+    def item(self, event_id: str, definition: str = "BTCUSD") -> tuple[str, str, bytes]:
+        return (event_id, definition, b'{"event_id":"' + event_id.encode() + b'"}')
+
+    def test_publish(self):
+        feed = OutcomeFeed()
+
+        async def run():
+            sub_all = feed.subscribe()
+            sub_def = feed.subscribe("BTCEUR")
+            sub_ids = feed.subscribe(None, ["btcusd2", "btceur3"])
+            self.assertTrue(feed.has_subscribers())
+            # Idle: nothing until the timeout
+            self.assertEqual(await sub_all.get(0.01), [])
+
+            # Published from another thread, the waiting consumer is woken up
+            def publisher():
+                time.sleep(0.05)
+                feed.publish([self.item("btcusd1"), self.item("btcusd2")])
+                feed.publish([self.item("btceur3", "BTCEUR")])
+            th = threading.Thread(target=publisher)
+            th.start()
+            t0 = time.perf_counter()
+            items = await sub_all.get(5)
+            self.assertLess(time.perf_counter() - t0, 1)
+            th.join()
+            # Later ones are queued too
+            while len(items) < 3:
+                items.extend(await sub_all.get(5))
+            self.assertEqual(list(map(lambda it: it[0], items)), ["btcusd1", "btcusd2", "btceur3"])
+            self.assertEqual(items[0][1], b'{"event_id":"btcusd1"}')
+            self.assertEqual(list(map(lambda it: it[0], await sub_def.get(5))), ["btceur3"])
+            self.assertEqual(list(map(lambda it: it[0], await sub_ids.get(5))), ["btcusd2", "btceur3"])
+
+            feed.unsubscribe(sub_def)
+            self.assertIsNone(await sub_def.get(5))
+            feed.publish([self.item("btceur4", "BTCEUR")])
+            self.assertEqual(feed.get_stats()["subscribers"], 2)
+            self.assertEqual(feed.get_stats()["published"], 4)
+            self.assertEqual(feed.get_stats()["delivered"], 3 + 1 + 2 + 1)
+        asyncio.run(run())
+
+    # A consumer falling behind by more than the queue size is dropped, the others are not affected
+    def test_overflow(self):
+        feed = OutcomeFeed(queue_max=5)
+
+        async def run():
+            slow = feed.subscribe()
+            fast = feed.subscribe()
+            for i in range(4):
+                feed.publish([self.item(f"btcusd{i}")])
+                self.assertEqual(len(await fast.get(1)), 1)
+            feed.publish([self.item("btcusd4"), self.item("btcusd5")])
+            self.assertTrue(slow.overflowed)
+            self.assertIsNone(await slow.get(1))
+            self.assertEqual(len(await fast.get(1)), 2)
+            stats = feed.get_stats()
+            self.assertEqual(stats["subscribers"], 1)
+            self.assertEqual(stats["overflows"], 1)
+        asyncio.run(run())
+        # Its loop is gone, dropped on the next publish
+        feed.publish([self.item("btcusd6")])
+        self.assertEqual(feed.get_stats()["subscribers"], 0)
+        self.assertEqual(feed.get_stats()["overflows"], 1)
+
+    def test_max_subscribers(self):
+        feed = OutcomeFeed(max_subscribers=2)
+
+        async def run():
+            sub1 = feed.subscribe()
+            self.assertIsNotNone(feed.subscribe())
+            self.assertIsNone(feed.subscribe())
+            feed.unsubscribe(sub1)
+            self.assertIsNotNone(feed.subscribe())
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main() # run all tests
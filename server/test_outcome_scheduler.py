@@ -0,0 +1,74 @@
+from outcome_scheduler import OutcomeScheduler
+
+import threading
+import time
+import unittest
+
+
+class OutcomeSchedulerTestClass(unittest.TestCase):
+    def test_pop_due(self):
+        s = OutcomeScheduler(settle_secs=2)
+        s.load([("e30", 30), ("e10", 10), ("e20", 20)])
+        self.assertTrue(s.loaded)
+        self.assertEqual(len(s), 3)
+        self.assertEqual(s.next_deadline(), 12)
+        # Already scheduled
+        self.assertFalse(s.add("e20", 20))
+        self.assertEqual(s.pop_due(11.9), [])
+        self.assertEqual(s.pop_due(22), [("e10", 10), ("e20", 20)])
+        self.assertEqual(s.next_deadline(), 32)
+        self.assertTrue(s.add("e15", 15))
+        self.assertEqual(s.pop_due(100, max_count=1), [("e15", 15)])
+        self.assertEqual(s.pop_due(100), [("e30", 30)])
+        self.assertIsNone(s.next_deadline())
+        self.assertEqual(s.get_stats()["popped"], 4)
+
+    def test_retry_remove(self):
+        s = OutcomeScheduler(settle_secs=0)
+        s.add_many([("e10", 10), ("e20", 20)])
+        self.assertEqual(s.pop_due(10), [("e10", 10)])
+        s.retry("e10", 10, 25)
+        self.assertEqual(s.pop_due(24), [("e20", 20)])
+        self.assertEqual(s.pop_due(25), [("e10", 10)])
+        s.add("e40", 40)
+        s.remove("e40")
+        self.assertEqual(len(s), 0)
+        self.assertIsNone(s.next_deadline())
+
+    def test_clear(self):
+        s = OutcomeScheduler(settle_secs=0)
+        s.load([("e10", 10), ("e20", 20)])
+        s.clear()
+        self.assertFalse(s.loaded)
+        self.assertEqual(len(s), 0)
+        self.assertEqual(s.pop_due(100), [])
+        self.assertTrue(s.add("e10", 10))
+        self.assertEqual(s.pop_due(100), [("e10", 10)])
+
+    def test_wait_woken_by_earlier(self):
+        s = OutcomeScheduler(settle_secs=0)
+        s.add("e_late", time.time() + 3600)
+        th = threading.Timer(0.1, lambda: s.add("e_soon", time.time()))
+        th.start()
+        t0 = time.monotonic()
+        s.wait(10)
+        self.assertLess(time.monotonic() - t0, 5)
+        self.assertEqual(len(s.pop_due(time.time())), 1)
+        th.join()
+
+    def test_latency_stats(self):
+        s = OutcomeScheduler(latency_window=100)
+        self.assertEqual(s.get_latency_stats()["count"], 0)
+        for i in range(200):
+            s.record_latency(1000, 1000 + i / 10)
+        # Only the last 100 are kept
+        ls = s.get_latency_stats()
+        self.assertEqual(ls["count"], 100)
+        self.assertEqual(ls["p50"], 15)
+        self.assertEqual(ls["p90"], 19)
+        self.assertEqual(ls["p99"], 19.9)
+        self.assertEqual(ls["max"], 19.9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,231 @@
+from price import PriceSource
+from price_binance import BinancePriceSource
+from price_bitstamp import BitstampPriceSource
+from price_fetcher import AsyncPriceFetcher
+from price_kraken import KrakenPriceSource
+from price_stream import PRICE_STREAM_MAX_AGE_SECS
+from test_common import PriceStreamStub, PriceStubServer, load_recorded_ticks
+
+import asyncio
+import threading
+import time
+import unittest
+
+
+# Percentile of a sorted list, nearest rank
+def percentile(sorted_values: list[float], p: float) -> float:
+    idx = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+class PriceSourceTestClass(unittest.TestCase):
+    def setUp(self):
+        # One stub server per exchange, so there are separate hosts (connection pools)
+        self.stubs = [PriceStubServer(98760), PriceStubServer(98770), PriceStubServer(98780)]
+        self.fetcher = AsyncPriceFetcher(timeout=2)
+
+    def tearDown(self):
+        self.fetcher.close()
+        for s in self.stubs:
+            s.stop()
+
+    def create_sources(self, fetcher):
+        return [
+            BitstampPriceSource(fetcher, url_root=self.stubs[0].url + "/bitstamp/"),
+            BinancePriceSource(False, fetcher, url_root_override=self.stubs[1].url + "/binance?symbol="),
+            KrakenPriceSource(fetcher, url_root_override=self.stubs[2].url + "/kraken?pair="),
+        ]
+
+    def clear_caches(self, ps: PriceSource):
+        for src in ps.sources:
+            src.cache = {}
+
+    def test_aggregate(self):
+        ps = PriceSource(self.fetcher, self.create_sources)
+        pi = ps.get_price_info_internal("btcusd")
+        self.assertIsNone(pi.error)
+        self.assertEqual(pi.price, 98770)
+        self.assertEqual(pi.symbol, "BTCUSD")
+        self.assertEqual(pi.source, "Multi{cnt:3,good:[Bitstamp,BinanceUS,Kraken]}")
+
+        # BTCEUR not supported by BinanceUS
+        pi = ps.get_price_info_internal("btceur")
+        self.assertEqual(pi.price, 98770)
+        self.assertEqual(pi.source, "Multi{cnt:2,good:[Bitstamp,Kraken];bad:[BinanceUS]}")
+
+        # Sync API of a single source
+        self.assertEqual(ps.sources[0].get_price_info("BTCUSD").price, 98760)
+
+    def test_latency_keepalive(self):
+        ps = PriceSource(self.fetcher, self.create_sources)
+        n = 200
+        latencies = []
+        for _i in range(n):
+            self.clear_caches(ps)
+            t0 = time.perf_counter()
+            pi = ps.get_price_info_internal("BTCUSD")
+            latencies.append(time.perf_counter() - t0)
+            self.assertEqual(pi.price, 98770)
+        latencies.sort()
+        p50 = percentile(latencies, 50)
+        p99 = percentile(latencies, 99)
+        print(f"Price fetch latency, 3 sources, {n} fetches: p50 {round(p50 * 1000, 2)} ms  p99 {round(p99 * 1000, 2)} ms")
+        self.assertLess(p99, 1.0)
+
+        # All requests done, over reused (keep-alive) connections
+        for s in self.stubs:
+            self.assertEqual(s.request_count, n)
+            self.assertLessEqual(s.connection_count, 2)
+        stats = self.fetcher.get_stats()
+        self.assertEqual(stats["hosts"], 3)
+        self.assertEqual(stats["requests"], 3 * n)
+        self.assertEqual(stats["errors"], 0)
+
+    def test_timeout(self):
+        fetcher = AsyncPriceFetcher(timeout=0.2)
+        self.stubs[2].delay = 1.5
+        ps = PriceSource(fetcher, self.create_sources)
+        t0 = time.perf_counter()
+        pi = ps.get_price_info_internal("BTCUSD")
+        elapsed = time.perf_counter() - t0
+        fetcher.close()
+        # Slow source is dropped, not waited for
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(pi.price, 98765)
+        self.assertEqual(pi.source, "Multi{cnt:2,good:[Bitstamp,BinanceUS];bad:[Kraken]}")
+        self.assertTrue(pi.aggr_sources[2].error.startswith("Timeout getting price"))
+        self.assertEqual(fetcher.get_stats()["timeouts"], 1)
+
+    def test_coalesce(self):
+        for s in self.stubs:
+            s.delay = 0.2
+        ps = PriceSource(self.fetcher, self.create_sources)
+        n = 10
+        results = [None] * n
+
+        def worker(i):
+            results[i] = ps.get_price_info_internal("BTCUSD")
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        for pi in results:
+            self.assertEqual(pi.price, 98770)
+        # One upstream fetch per source, all other callers waited for it
+        for s in self.stubs:
+            self.assertEqual(s.request_count, 1)
+        stats = ps.get_stats()
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["coalesced"], 3 * (n - 1))
+        self.assertEqual(stats["in_flight"], 0)
+
+    # From the loop of another thread (e.g. the API server): awaited, concurrent calls share the fetches
+    def test_async_other_loop(self):
+        for s in self.stubs:
+            s.delay = 0.2
+        ps = PriceSource(self.fetcher, self.create_sources)
+        n = 10
+
+        async def run():
+            return await asyncio.gather(*[ps.get_price_info_async("BTCUSD") for _i in range(n)])
+        t0 = time.perf_counter()
+        results = asyncio.run(run())
+        elapsed = time.perf_counter() - t0
+
+        self.assertLess(elapsed, 1.0)
+        for pi in results:
+            self.assertEqual(pi.price, 98770)
+        for s in self.stubs:
+            self.assertEqual(s.request_count, 1)
+        self.assertEqual(ps.get_stats()["coalesced"], 3 * (n - 1))
+
+    def test_prefetch_dedup(self):
+        ps = PriceSource(self.fetcher, self.create_sources)
+        self.assertEqual(ps.get_price_info("BTCUSD").price, 98770)
+        # Make cached values old, but acceptable
+        for src in ps.sources:
+            for _symbol, pi in src.cache.items():
+                pi.retrieve_time -= 30
+        for s in self.stubs:
+            s.delay = 0.3
+
+        # Several reads, only one prefetch per symbol
+        for _i in range(5):
+            pi = ps.get_price_info("BTCUSD", pref_max_age=60)
+            self.assertEqual(pi.price, 98770)
+        stats = ps.get_stats()
+        self.assertEqual(stats["prefetch_started"], 1)
+        self.assertEqual(stats["prefetch_skipped"], 4)
+        self.assertEqual(stats["prefetch_outstanding"], 1)
+
+        time.sleep(0.6)
+        stats = ps.get_stats()
+        self.assertEqual(stats["prefetch_outstanding"], 0)
+        for s in self.stubs:
+            self.assertEqual(s.request_count, 2)
+        # Refreshed by the prefetch, no new prefetch
+        ps.get_price_info("BTCUSD", pref_max_age=60)
+        self.assertEqual(ps.get_stats()["prefetch_started"], 1)
+
+    def wait_for(self, cond, timeout: float = 5):
+        deadline = time.monotonic() + timeout
+        while not cond():
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def test_streaming(self):
+        ticks = load_recorded_ticks()
+        ws_stubs = dict(map(lambda kv: (kv[0], PriceStreamStub(kv[1])), ticks.items()))
+        ps = PriceSource(self.fetcher, self.create_sources)
+        ps.start_streaming(dict(map(lambda kv: (kv[0], kv[1].url), ws_stubs.items())))
+        try:
+            # Wait for all recorded ticks to be replayed
+            self.assertTrue(self.wait_for(lambda: all(map(lambda st: st["updates"] >= 3, ps.get_stats()["streams"].values()))))
+            self.assertEqual(ws_stubs["Bitstamp"].received, [{"event": "bts:subscribe", "data": {"channel": "live_trades_btcusd"}}])
+            self.assertEqual(ws_stubs["BinanceUS"].received, [{"method": "SUBSCRIBE", "params": ["btcusdt@trade"], "id": 1}])
+            self.assertEqual(ws_stubs["Kraken"].received, [{"method": "subscribe", "params": {"channel": "ticker", "symbol": ["BTC/USD", "BTC/EUR"]}}])
+
+            # Served from the streamed last prices, no REST requests
+            pi = ps.get_price_info_internal("BTCUSD")
+            self.assertEqual(list(map(lambda p: p.price, pi.aggr_sources)), [98760, 98770, 98770])
+            self.assertEqual(pi.aggr_sources[0].claimed_time, 1762988403)
+            self.assertEqual(pi.aggr_sources[1].claimed_time, 1762988403.014)
+            pi = ps.get_price_info_internal("BTCEUR")
+            self.assertEqual(pi.aggr_sources[0].price, 84012)
+            self.assertEqual(pi.aggr_sources[2].price, 84010.5)
+            for s in self.stubs:
+                self.assertEqual(s.request_count, 0)
+
+            # Stale stream: fall back to REST
+            ps.sources[2].stream_book._prices["BTCUSD"].retrieve_time -= PRICE_STREAM_MAX_AGE_SECS + 1
+            pi = ps.get_price_info_internal("BTCUSD")
+            self.assertEqual(list(map(lambda p: p.price, pi.aggr_sources)), [98760, 98770, 98780])
+            self.assertEqual(self.stubs[2].request_count, 1)
+        finally:
+            ps.stop_streaming()
+            for st in ws_stubs.values():
+                st.stop()
+        # After stopping, REST only
+        ps.sources[0].cache = {}
+        self.assertEqual(ps.get_price_info_internal("BTCUSD").aggr_sources[0].price, 98760)
+        self.assertEqual(self.stubs[0].request_count, 1)
+
+    def test_history_sampling(self):
+        ps = PriceSource(self.fetcher, self.create_sources)
+        ps.start_history_sampling(0.05)
+        try:
+            self.assertTrue(self.wait_for(lambda: ps.get_stats()["history"]["symbols"] == 2))
+        finally:
+            ps.stop_history_sampling()
+        now = time.time()
+        self.assertEqual(ps.get_price_at("BTCUSD", now), 98770)
+        self.assertEqual(ps.get_price_at("BTCEUR", now), 98770)
+        self.assertIsNone(ps.get_price_at("BTCUSD", now - 3600))
+
+
+if __name__ == "__main__":
+    unittest.main() # run all tests
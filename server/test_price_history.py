@@ -0,0 +1,77 @@
+from price_history import PriceHistory, TickRingBuffer
+
+import unittest
+
+
+class TickRingBufferTestClass(unittest.TestCase):
+    def test_append_wrap(self):
+        b = TickRingBuffer(4)
+        self.assertIsNone(b.nearest(100))
+        for t in range(10):
+            self.assertTrue(b.append(100 + t, 1000 + t))
+        # Only the last 4 are kept
+        self.assertEqual(len(b), 4)
+        self.assertEqual(list(map(lambda i: b.time_at(i), range(4))), [106, 107, 108, 109])
+        self.assertEqual(b.memory_bytes(), 4 * 16)
+        # Older than the latest is dropped, same time overwrites
+        self.assertFalse(b.append(105, 1))
+        self.assertTrue(b.append(109, 2009))
+        self.assertEqual(len(b), 4)
+        self.assertEqual(b.nearest(200), (109, 2009))
+
+    def test_nearest(self):
+        b = TickRingBuffer(8)
+        for t, p in [(100, 1), (110, 2), (120, 3), (130, 4)]:
+            b.append(t, p)
+        self.assertEqual(b.nearest(50), (100, 1))
+        self.assertEqual(b.nearest(100), (100, 1))
+        self.assertEqual(b.nearest(104), (100, 1))
+        self.assertEqual(b.nearest(105), (100, 1))
+        self.assertEqual(b.nearest(106), (110, 2))
+        self.assertEqual(b.nearest(129), (130, 4))
+        self.assertEqual(b.nearest(1000), (130, 4))
+        # After wrapping around
+        for t in range(140, 200, 10):
+            b.append(t, t)
+        self.assertEqual(b.nearest(111), (120, 3))
+        self.assertEqual(b.nearest(174), (170, 170))
+
+    def test_twap(self):
+        b = TickRingBuffer(8)
+        for t, p in [(100, 10), (110, 20), (120, 40)]:
+            b.append(t, p)
+        # Price of the tick holds until the next tick
+        self.assertEqual(b.twap(100, 120), 15)
+        self.assertEqual(b.twap(105, 115), 15)
+        self.assertEqual(b.twap(110, 130), 30)
+        self.assertEqual(b.twap(112, 118), 20)
+        self.assertEqual(b.twap(115, 115), 20)
+        # Partially before the first tick: only the covered part
+        self.assertEqual(b.twap(90, 110), 10)
+        self.assertIsNone(b.twap(50, 90))
+        self.assertEqual(b.twap(200, 210), 40)
+
+
+class PriceHistoryTestClass(unittest.TestCase):
+    def test_get_price_at(self):
+        h = PriceHistory(capacity=100, max_distance=5)
+        self.assertIsNone(h.get_price_at("BTCUSD", 100))
+        for t in range(100, 200, 2):
+            h.record("btcusd", t, 1000 + t)
+        h.record("BTCEUR", 150, 900)
+        self.assertEqual(h.get_price_at("BTCUSD", 151), 1150)
+        self.assertEqual(h.get_price_at("BTCUSD", 151.5), 1152)
+        self.assertEqual(h.get_price_at("BTCUSD", 150, twap_window=4), 1147)
+        self.assertEqual(h.get_price_at("BTCEUR", 153), 900)
+        # Too far from any tick
+        self.assertIsNone(h.get_price_at("BTCUSD", 204))
+        self.assertIsNone(h.get_price_at("BTCEUR", 156))
+        self.assertEqual(h.get_price_at("BTCEUR", 155), 900)
+        stats = h.get_stats()
+        self.assertEqual(stats["symbols"], 2)
+        self.assertEqual(stats["ticks"], 51)
+        self.assertEqual(stats["bytes"], 2 * 100 * 16)
+
+
+if __name__ == "__main__":
+    unittest.main() # run all tests
@@ -0,0 +1,59 @@
+from response_cache import CACHE_CONTROL_SETTLED, CACHE_CONTROL_UNSETTLED, SerializedResponse, SerializedResponseStore, etag_matches, etag_of, json_dumps_bytes
+
+import json
+import unittest
+
+
+class ResponseCacheTestClass(unittest.TestCase):
+    def test_json_dumps(self):
+        value = {"event_id": "btcusd1762970400", "has_outcome": True, "outcome_value": 98765.5, "nonces": ["02ab", "03cd"], "unit": "€"}
+        body = json_dumps_bytes(value)
+        self.assertEqual(json.loads(body), value)
+        # Compact, same as FastAPI's
+        self.assertEqual(body, json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    def test_etag(self):
+        etag = etag_of(b'{"a":1}')
+        self.assertEqual(etag, etag_of(b'{"a":1}'))
+        self.assertNotEqual(etag, etag_of(b'{"a":2}'))
+        self.assertTrue(etag.startswith('"') and etag.endswith('"'))
+        self.assertTrue(etag_matches(etag, etag))
+        self.assertTrue(etag_matches(f'"x", W/{etag}', etag))
+        self.assertTrue(etag_matches("*", etag))
+        self.assertFalse(etag_matches(None, etag))
+        self.assertFalse(etag_matches('"x"', etag))
+
+    def test_response(self):
+        r1 = SerializedResponse.new({"a": 1}, True)
+        self.assertEqual(r1.body, b'{"a":1}')
+        self.assertEqual(r1.etag, etag_of(b'{"a":1}'))
+        self.assertEqual(r1.cache_control, CACHE_CONTROL_SETTLED)
+        self.assertEqual(SerializedResponse.new({"a": 1}, False).cache_control, CACHE_CONTROL_UNSETTLED)
+
+    def test_store(self):
+        s = SerializedResponseStore(max_bytes=100)
+        self.assertIsNone(s.get("ev1"))
+        r1 = SerializedResponse.new({"v": "1" * 30}, True)
+        s.put("ev1", r1)
+        self.assertIs(s.get("ev1"), r1)
+        s.put("ev2", SerializedResponse.new({"v": "2" * 30}, True))
+        # ev1 is more recent, ev2 is evicted
+        s.get("ev1")
+        s.put("ev3", SerializedResponse.new({"v": "3" * 30}, True))
+        self.assertIsNone(s.get("ev2"))
+        self.assertIsNotNone(s.get("ev1"))
+        stats = s.get_stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["evictions"], 1)
+        self.assertLessEqual(stats["bytes"], 100)
+        # Too large
+        s.put("ev4", SerializedResponse.new({"v": "4" * 200}, True))
+        self.assertIsNone(s.get("ev4"))
+        s.remove("ev1")
+        self.assertIsNone(s.get("ev1"))
+        s.clear()
+        self.assertEqual(s.get_stats()["bytes"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main() # run all tests